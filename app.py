@@ -1,9 +1,8 @@
 import streamlit as st
 import threading
 import pandas as pd
-import joblib
 import numpy as np
-import plotly.graph_objects as go
+import io
 import json 
 import sys
 import os
@@ -13,11 +12,24 @@ from dotenv import load_dotenv
 # Cargar variables de entorno desde .env
 load_dotenv()
 
-# Añadir src al path para poder importar
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-from src.telegram_bot import send_telegram_alert, run_listener
-from src.vision_module import analyze_water_turbidity, get_ntu_interpretation
-from src.chatbot_llm import create_chatbot_widget
+# Añadir src al path para poder importar. Los módulos de src/ se importan por su nombre,
+# igual que entre ellos: con el prefijo src. se cargaría una segunda copia de cada módulo
+# (p. ej. src.metrics junto a metrics) con su propio estado, constantes y clases
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+from telegram_bot import send_telegram_alert, run_listener
+from vision_module import analyze_water_turbidity, get_ntu_interpretation
+from chatbot_llm import create_chatbot_widget
+from ui_utils import inject_css, timed_render, render_timing_rows
+from explain import ForestExplainer, load_metadata
+from whatif import WhatIfEngine
+from score import prediction_labels, INVALID_LABEL
+from validation import validate, SchemaError, ISSUE_COLUMN
+from drift import DriftMonitor, load_reference
+import artifacts
+import comparison
+import export
+import metrics
+import risk
 
 @st.cache_resource
 def iniciar_bot_en_background():
@@ -34,6 +46,17 @@ def iniciar_bot_en_background():
 # Llamamos a la función inmediatamente
 iniciar_bot_en_background()
 
+@st.cache_resource
+def iniciar_endpoint_metricas():
+    """Sirve /metrics (formato Prometheus) una sola vez por proceso si SIPCA_METRICS=1"""
+    try:
+        return metrics.start_metrics_server()
+    except OSError as e:
+        print(f"No se pudo iniciar el endpoint de métricas: {e}")
+        return None
+
+iniciar_endpoint_metricas()
+
 # Configuración inicial
 st.set_page_config(
     page_title="SIPCA",
@@ -41,226 +64,82 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# CSS personalizado
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Space+Grotesk:wght@300..700&display=swap');
-    @import url('https://fonts.googleapis.com/css2?family=Material+Symbols+Outlined:wght,FILL@100..700,0..1&display=swap');
-    
-    :root {
-        --primary: var(--primary-color, #0c67a3);
-        --accent: #11a4d4;
-        --background: var(--background-color, #f0f4f8);
-        --card: var(--secondary-background-color, #ffffff);
-        --text-primary: var(--text-color, #101d22);
-        --text-secondary: #5a6e79;
-        --border-color: #e2e8f0;
-    }
-    
-    /* Estilos generales */
-    .stApp {
-        font-family: 'Space Grotesk', sans-serif;
-    }
-    
-    /* Iconos Material Symbols */
-    .material-symbols-outlined {
-        font-variation-settings: 'FILL' 1, 'wght' 400, 'GRAD' 0, 'opsz' 24;
-        vertical-align: middle;
-    }
-    
-    /* Tarjeta de resultado personalizada */
-    .result-card {
-        background: rgba(255, 255, 255, 0.6);
-        border-radius: 1rem;
-        border: 1px solid var(--border-color);
-        padding: 3rem;
-        text-align: center;
-        box-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.05);
-        margin: 2rem 0;
-    }
-    
-    .result-icon {
-        width: 96px;
-        height: 96px;
-        margin: 0 auto 1rem;
-        border-radius: 50%;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-size: 60px;
-    }
-    
-    .result-icon.potable {
-        background: rgba(34, 197, 94, 0.1);
-        color: #22c55e;
-    }
-    
-    .result-icon.no-potable {
-        background: rgba(239, 68, 68, 0.1);
-        color: #ef4444;
-    }
-    
-    .result-title {
-        font-size: 2.5rem;
-        font-weight: bold;
-        margin: 0.5rem 0;
-    }
-    
-    .result-title.potable {
-        color: #22c55e;
-    }
-    
-    .result-title.no-potable {
-        color: #ef4444;
-    }
-    
-    .result-confidence {
-        color: var(--text-secondary);
-        font-size: 1.125rem;
-    }
-
-    /* Sliders: Thumb (círculo) blanco con borde azul */
-    div[data-baseweb="slider"] div[role="slider"] {
-        background-color: #ffffff !important;
-        border: 2px solid var(--primary) !important;
-        box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-        height: 18px !important; 
-        width: 18px !important;
-    }
-    
-    /* Sliders: Track Fill (Barra rellena) - Forzar color */
-    div[data-baseweb="slider"] > div > div > div > div {
-        background-color: var(--primary) !important;
-    }
-    
-    /* Botón Secundario (Reset): Fondo gris claro */
-    button[kind="secondary"] {
-        background-color: #f1f5f9 !important;
-        border: 1px solid transparent !important;
-        color: var(--text-secondary) !important;
-        transition: all 0.2s;
-    }
-    button[kind="secondary"]:hover {
-        background-color: #e2e8f0 !important;
-        color: var(--text-primary) !important;
-    }
-    
-    /* Botón Primario (Analizar): Azul con hover */
-    button[kind="primary"] {
-        background-color: var(--primary) !important;
-        border: none !important;
-        color: white !important;
-        transition: all 0.2s;
-    }
-    button[kind="primary"]:hover {
-        background-color: var(--accent) !important;
-        box-shadow: 0 4px 12px rgba(12, 103, 163, 0.2);
-    }
-
-    /* Ocultar menú de Streamlit y footer */
-    /*
-    [data-testid="stToolbar"] {
-        visibility: hidden;
-    }
-    footer {
-        visibility: hidden;
-    }
-    */
-
-    /* --- NAVEGACIÓN SIDEBAR CON ICONOS --- */
-    
-    /* Ajuste del texto para alinear con el icono */
-    section[data-testid="stSidebar"] div[role="radiogroup"] label p {
-        font-size: 1rem;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem; /* Espacio entre icono y texto */
-    }
-
-    /* INYECCIÓN DE ICONOS MATERIAL SYMBOLS */
-    
-    /* 1. Dashboard General */
-    section[data-testid="stSidebar"] div[role="radiogroup"] label:nth-of-type(1) p::before {
-        content: "dashboard";
-        font-family: 'Material Symbols Outlined';
-        font-size: 20px;
-        font-weight: normal;
-        font-variation-settings: 'FILL' 0;
-    }
-    /* Relleno cuando está activo */
-    section[data-testid="stSidebar"] div[role="radiogroup"] label:nth-of-type(1):has(input:checked) p::before {
-        font-variation-settings: 'FILL' 1;
-        color: var(--primary);
-    }
-    
-    /* 2. Visión por Computadora */
-    section[data-testid="stSidebar"] div[role="radiogroup"] label:nth-of-type(2) p::before {
-        content: "image_search";
-        font-family: 'Material Symbols Outlined';
-        font-size: 20px;
-        font-weight: normal;
-        font-variation-settings: 'FILL' 0;
-    }
-    section[data-testid="stSidebar"] div[role="radiogroup"] label:nth-of-type(2):has(input:checked) p::before {
-        font-variation-settings: 'FILL' 1;
-        color: var(--primary);
-    }
-    
-    /* 3. Monitoreo de Cámaras */
-    section[data-testid="stSidebar"] div[role="radiogroup"] label:nth-of-type(3) p::before {
-        content: "videocam";
-        font-family: 'Material Symbols Outlined';
-        font-size: 20px;
-        font-weight: normal;
-        font-variation-settings: 'FILL' 0;
-    }
-    section[data-testid="stSidebar"] div[role="radiogroup"] label:nth-of-type(3):has(input:checked) p::before {
-        font-variation-settings: 'FILL' 1;
-        color: var(--primary);
-    }
-    
-    /* 4. AI Assistant */
-    section[data-testid="stSidebar"] div[role="radiogroup"] label:nth-of-type(4) p::before {
-        content: "smart_toy";
-        font-family: 'Material Symbols Outlined';
-        font-size: 20px;
-        font-weight: normal;
-        font-variation-settings: 'FILL' 0;
-    }
-    section[data-testid="stSidebar"] div[role="radiogroup"] label:nth-of-type(4):has(input:checked) p::before {
-        font-variation-settings: 'FILL' 1;
-        color: var(--primary);
-    }
-    
-</style>
-""", unsafe_allow_html=True)
-
+# CSS personalizado (se lee del disco una sola vez por proceso)
+inject_css("style.css")
 
 
 # Configuración de rutas
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_PATH = os.path.join(BASE_DIR, "models/water_potability_model.pkl")
-SCALER_PATH = os.path.join(BASE_DIR, "models/scaler.pkl")
 # Cargar modelos y escalador
 
 @st.cache_resource
+def _started_watchers():
+    """Watcher ya creado (lo registra get_model_watcher), para consultarlo sin cargar el modelo"""
+    return {}
+
+@st.cache_resource
+def get_model_watcher():
+    """
+    Versión activa del modelo compartida por todas las sesiones. Un hilo revisa
+    models/CURRENT y carga las versiones que publica model_train.py sin reiniciar
+    el dashboard (la primera carga ocurre al abrir el Dashboard).
+    """
+    watcher = artifacts.ArtifactWatcher()
+    watcher.refresh()
+    _started_watchers()['model'] = watcher
+    return watcher.start()
+
+def loaded_model_version():
+    """Versión del modelo ya cargado, o None si aún no se abrió el Dashboard (no dispara la carga)"""
+    watcher = _started_watchers().get('model')
+    bundle = watcher.current() if watcher is not None else None
+    return bundle.version if bundle is not None else None
+
 def load_artifacts():
-    """Carga el modelo y el escalador"""
-    try:
-        model = joblib.load(MODEL_PATH)
-        scaler = joblib.load(SCALER_PATH)
-        return model, scaler
-    except Exception:
-        st.error("Error: No se encontró el modelo o el escalador. Por favor, asegúrese de que los archivos existen en la ruta especificada.")
-        return None, None
+    """
+    (modelo, escalador, versión) activos. Cada ejecución toma el trío una sola vez,
+    así una recarga en caliente nunca mezcla el modelo de una versión con el
+    escalador de otra. La versión sirve de clave a las cachés que dependen del modelo.
+    """
+    bundle = get_model_watcher().current()
+    if bundle is None:
+        return None, None, None
+    return bundle.model, bundle.scaler, bundle.version
+
+@st.cache_resource(max_entries=2)
+def get_drift_monitor(version=None):
+    """
+    Monitor de deriva de una versión del modelo, compartido por todas las sesiones
+    (None si no hay referencia). Cada versión trae su propia referencia (train_incremental
+    la extiende), así que tras una recarga en caliente se usa un monitor nuevo.
+    """
+    reference = load_reference(artifacts.artifact_path(artifacts.DRIFT_REFERENCE_FILE, version))
+    return DriftMonitor(reference) if reference else None
+
+def active_drift_monitor():
+    """Monitor de la versión del modelo cargado (None si todavía no se cargó ninguno)"""
+    version = loaded_model_version()
+    return get_drift_monitor(version) if version is not None else None
+
+def track_drift(df, source, version=None):
+    """Registra muestras analizadas en el monitor de deriva de la versión que las puntuó"""
+    monitor = get_drift_monitor(version)
+    if monitor is not None:
+        monitor.update(df, source)
 
-model, scaler = load_artifacts()
+@st.cache_data(max_entries=2)
+def load_model_metadata(version=None):
+    """Metadatos guardados por model_train.py (importancias globales, métricas)"""
+    return load_metadata(artifacts.artifact_path(artifacts.METADATA_FILE, version))
 
-# Lista ordenada de variables por importancia
-FEATURES_IMPORTANCE_ORDER = [
-    'Sulfate', 'ph', 'Solids', 'Hardness', 'Chloramines',
-    'Trihalomethanes', 'Turbidity', 'Conductivity', 'Organic_carbon',
-]
+@st.cache_resource(max_entries=2)
+def load_explainer(_model, feature_names, version=None):
+    """Precalcula las contribuciones por nodo del bosque (una vez por modelo cargado)"""
+    return ForestExplainer(_model, feature_names)
+
+def model_feature_names(scaler):
+    """Orden de variables con el que se entrenó el escalador (y el modelo)"""
+    return tuple(getattr(scaler, 'feature_names_in_', SAMPLE_PARAMS))
 
 # Sidebar con iconos Material Symbols
 st.sidebar.markdown("""
@@ -281,169 +160,395 @@ options = ["Dashboard General", "Análisis de Imágenes", "Monitoreo de Cámaras
 selection = st.sidebar.radio("Navegación", options, label_visibility="collapsed")
 st.sidebar.markdown('---')
 
-def tab_dashboard():
-    # Definir los sliders con valores realistas o promedio
-    def user_input_features():
-        """Función para capturar los inputs del usuario a través de sliders"""
-        st.sidebar.markdown('### Parámetros de la Muestra')
-        
-        # Agrupar parámetros para ahorrar espacio
-        with st.sidebar.expander("Parámetros Básicos", expanded=True):
-            ph = st.slider('pH', 0.0, 14.0, 7.0, 0.1)
-            hardness = st.slider('Dureza (mg/L)', 50.0, 350.0, 196.0, 1.0)
-            solids = st.slider('Sólidos (ppm)', 300.0, 60000.0, 22000.0, 100.0)
-            chloramines = st.slider('Cloraminas (ppm)', 0.0, 14.0, 7.1, 0.1)
-
-        with st.sidebar.expander("Parámetros Avanzados", expanded=False):
-            sulfate = st.slider('Sulfato (mg/L)', 100.0, 500.0, 333.0, 1.0)
-            conductivity = st.slider('Conductividad (µS/cm)', 100.0, 800.0, 420.0, 1.0)
-            organic_carbon = st.slider('Carbono Orgánico (ppm)', 0.0, 30.0, 14.5, 0.1)
-            trihalomethanes = st.slider('Trihalometanos', 0.0, 125.0, 66.0, 0.1)
-            turbidity = st.slider('Turbidez', 1.0, 7.0, 3.9, 0.1)
-
-        data = {
-            'ph': ph,
-            'Hardness': hardness,
-            'Solids': solids,
-            'Chloramines': chloramines,
-            'Sulfate': sulfate,
-            'Conductivity': conductivity,
-            'Organic_carbon': organic_carbon,
-            'Trihalomethanes': trihalomethanes,
-            'Turbidity': turbidity
-        }
-        
-        return pd.DataFrame([data], index=['Your Sample'])
+# Parámetros de la muestra: (etiqueta, mínimo, máximo, valor por defecto, paso)
+SAMPLE_PARAMS = {
+    'ph': ('pH', 0.0, 14.0, 7.0, 0.1),
+    'Hardness': ('Dureza (mg/L)', 50.0, 350.0, 196.0, 1.0),
+    'Solids': ('Sólidos (ppm)', 300.0, 60000.0, 22000.0, 100.0),
+    'Chloramines': ('Cloraminas (ppm)', 0.0, 14.0, 7.1, 0.1),
+    'Sulfate': ('Sulfato (mg/L)', 100.0, 500.0, 333.0, 1.0),
+    'Conductivity': ('Conductividad (µS/cm)', 100.0, 800.0, 420.0, 1.0),
+    'Organic_carbon': ('Carbono Orgánico (ppm)', 0.0, 30.0, 14.5, 0.1),
+    'Trihalomethanes': ('Trihalometanos', 0.0, 125.0, 66.0, 0.1),
+    'Turbidity': ('Turbidez', 1.0, 7.0, 3.9, 0.1),
+}
+BASIC_PARAMS = ['ph', 'Hardness', 'Solids', 'Chloramines']
+ADVANCED_PARAMS = ['Sulfate', 'Conductivity', 'Organic_carbon', 'Trihalomethanes', 'Turbidity']
 
-    input_df = user_input_features()
+def reset_sample_params():
+    """Restablece los sliders de la muestra a sus valores por defecto"""
+    for feature, (_, _, _, default, _) in SAMPLE_PARAMS.items():
+        st.session_state[f"param_{feature}"] = default
 
-    st.sidebar.markdown('---')
-    with st.sidebar.expander("🔔 Conectar Alertas", expanded=True):
-        # Enlace directo a tu bot
-        bot_name = "AquaAlert_ec_Bot" # Pon el nombre real de tu bot sin @
-        st.markdown(f"1. [Abrir Bot en Telegram](https://t.me/{bot_name}) y dar **/start**")
-        
-        if st.button("🔄 Sincronizar con Bot"):
-            try:
-                with open("telegram_connection.json", "r") as f:
-                    data = json.load(f)
-                
-                # Guardar en sesión
-                st.session_state['tg_id'] = data['chat_id']
-                st.session_state['tg_name'] = data['name']
-                st.success(f"Conectado: {data['name']}")
-            except FileNotFoundError:
-                st.warning("Primero ve a Telegram y usa /start")
-                
-        # Estado actual
-        if 'tg_id' in st.session_state:
-            st.caption(f"✅ Enviando a: {st.session_state['tg_name']}")
-        else:
-            st.caption("🔴 No conectado")
+@st.cache_resource(max_entries=2)
+def load_whatif_engine(_model, _scaler, version=None):
+    """Motor what-if compartido entre sesiones: curvas ICE cacheadas por muestra cuantizada"""
+    specs = {
+        feature: (SAMPLE_PARAMS[feature][1], SAMPLE_PARAMS[feature][2], SAMPLE_PARAMS[feature][4])
+        for feature in model_feature_names(_scaler)
+    }
+    return WhatIfEngine(_model, _scaler, specs)
+
+def engine_values(engine, values):
+    """Reordena una tupla en el orden de SAMPLE_PARAMS al orden de variables del modelo"""
+    by_name = dict(zip(SAMPLE_PARAMS, values))
+    return [by_name[feature] for feature in engine.features]
+
+def predict_sample(model, scaler, values, version=None):
+    """
+    Predicción de la muestra de los sliders.
+    values es una tupla en el orden de SAMPLE_PARAMS. La primera vez se
+    calculan en un lote todas las curvas what-if de la muestra; al mover
+    un slider la probabilidad se lee de esas curvas sin invocar el modelo.
+    """
+    engine = load_whatif_engine(model, scaler, version)
+    return engine.predict(engine_values(engine, values))
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def explain_sample(_model, _scaler, values, version=None):
+    """Contribución de cada variable a P(potable) para una combinación de parámetros"""
+    input_df = pd.DataFrame([values], columns=list(SAMPLE_PARAMS))
+    input_scaled = _scaler.transform(input_df)
+    explainer = load_explainer(_model, model_feature_names(_scaler), version)
+    with metrics.timer("explain", mode="sample"):
+        return explainer.explain_one(input_scaled[0])
+
+def user_input_features():
+    """Función para capturar los inputs del usuario a través de sliders"""
+    def slider(feature):
+        label, min_value, max_value, default, step = SAMPLE_PARAMS[feature]
+        # El valor inicial vive en session_state para que "Restablecer" pueda sobrescribirlo
+        st.session_state.setdefault(f"param_{feature}", default)
+        return st.slider(label, min_value, max_value, step=step, key=f"param_{feature}")
+    
+    # Agrupar parámetros para ahorrar espacio
+    with st.expander("Parámetros Básicos", expanded=True):
+        data = {feature: slider(feature) for feature in BASIC_PARAMS}
+
+    with st.expander("Parámetros Avanzados", expanded=False):
+        data.update({feature: slider(feature) for feature in ADVANCED_PARAMS})
+
+    return pd.DataFrame([data], columns=list(SAMPLE_PARAMS), index=['Your Sample'])
+
+BATCH_PAGE_ROWS = 100
+BATCH_RESULT_KEY = 'batch_result'
+
+def score_batch(batch_df, model, scaler, version):
+    """
+    Valida y puntúa un lote; agrega a batch_df las columnas de resultado.
+    P(potable) se calcula una sola vez y de ella salen, vectorizadas, la
+    etiqueta, la confianza, la banda de riesgo y las alertas (risk.py).
+    """
+    # Columnas por nombre, un solo bloque float y filas inválidas marcadas (no abortan el lote)
+    with metrics.timer("validate", mode="batch"):
+        batch = validate(batch_df, model_feature_names(scaler))
+    proba = np.full(len(batch_df), np.nan)
+    if batch.valid.any():
+        valid_df = batch.frame()
+        with metrics.timer("scale", mode="batch"):
+            batch_scaled = scaler.transform(valid_df)
+        with metrics.timer("predict", mode="batch"):
+            proba = batch.expand(risk.positive_probability(model, batch_scaled), np.nan)
+        metrics.inc("rows_scored", len(valid_df), mode="batch")
+        track_drift(valid_df, "batch", version)
+    batch_df['Potability_Prediction'] = prediction_labels(proba)
+    batch_df['Potability_Probability'] = proba
+    if batch.valid.any():
+        # Variable que más pesó en cada predicción (un solo recorrido vectorizado del bosque)
+        with metrics.timer("explain", mode="batch"):
+            explainer = load_explainer(model, model_feature_names(scaler), version)
+            batch_df['Factor_Principal'] = batch.expand(explainer.top_factors(explainer.explain(batch_scaled)), '')
+    with metrics.timer("postprocess", mode="batch"):
+        assessment = risk.assess(proba, batch.X[:, batch.features.index('ph')])
+        for column in assessment.columns:
+            batch_df[column] = assessment[column].to_numpy()
+        summary = risk.summarize(proba, assessment)
+    batch_df[ISSUE_COLUMN] = batch.issues()
+    if batch.n_invalid:
+        metrics.inc("rows_invalid", batch.n_invalid, mode="batch")
+    summary['invalid'] = batch.n_invalid
+    return summary
+
+def render_batch_summary(summary):
+    """Agregados del lote: clases, alertas, pH fuera de norma, confianza y bandas de riesgo"""
+    scored = max(summary['scored'], 1)
+    cols = st.columns(5)
+    cols[0].metric("Filas puntuadas", f"{summary['scored']:,}", help=f"De {summary['rows']:,} filas del archivo")
+    cols[1].metric("Potables", f"{summary['potable'] / scored:.0%}", help=f"{summary['potable']:,} filas")
+    cols[2].metric("Alertas", f"{summary['alerts']:,}", help="NO POTABLE o pH fuera de 6.5 - 8.5")
+    cols[3].metric("pH fuera de norma", f"{summary['ph_out_of_range']:,}")
+    mean_confidence = summary['mean_confidence']
+    cols[4].metric("Confianza media", f"{mean_confidence:.1f}%" if mean_confidence is not None else "-")
+    bands = summary['bands']
+    st.caption("Riesgo por P(potable): " + " · ".join(f"**{name}** {n:,}" for name, n in bands.items())
+               + " (MEDIO agrupa las predicciones cercanas al umbral, conviene revisarlas)")
+
+def send_batch_alert(summary, file_name):
+    """Una alerta de Telegram por lote (no una por fila) si hay filas que la disparan"""
+    chat_id = st.session_state.get('tg_id')
+    if not summary['alerts'] or not chat_id:
+        return
+    msg = (
+        f"🚨 *ALERTA DE CALIDAD DE AGUA (LOTE)*\n\n"
+        f"**Archivo:** {file_name}\n"
+        f"**Filas con alerta:** {summary['alerts']:,} de {summary['rows']:,}\n"
+        f"**NO POTABLE:** {summary['not_potable']:,} · **pH fuera de norma:** {summary['ph_out_of_range']:,}"
+    )
+    ok, status = send_telegram_alert(msg, chat_id)
+    if ok:
+        st.toast(f"Alerta del lote enviada a {st.session_state['tg_name']}", icon="📲")
+    else:
+        st.error(f"Fallo Telegram: {status}")
+
+def open_export(path):
+    """Archivo de una exportación para la descarga (se abre al hacer clic, no en cada rerun)"""
+    return open(path, 'rb')
+
+def render_batch_results(result):
+    """Vista previa acotada (página o muestra) y descarga, ambas leídas del archivo exportado"""
+    store = result['exports'][export.STORE_FORMAT]
+    n_rows = result['summary']['rows']
+    st.subheader("Preview de Resultados")
+    if not os.path.exists(store):
+        st.warning("Los resultados de este lote expiraron; vuelve a ejecutar la predicción.")
+        return
+    col_mode, col_page = st.columns([2, 1])
+    with col_mode:
+        mode = st.radio("Vista", ["Páginas", "Muestra aleatoria"], horizontal=True, key="batch_preview_mode")
+    if mode == "Páginas":
+        pages = export.page_count(n_rows, BATCH_PAGE_ROWS)
+        with col_page:
+            number = st.number_input(f"Página (de {pages:,})", min_value=1, max_value=pages, value=1, key="batch_page")
+        view = export.page(store, number, BATCH_PAGE_ROWS, n_rows)
+    else:
+        view = export.sample(store, BATCH_PAGE_ROWS, n_rows)
+    st.dataframe(view)
+    st.caption(f"Mostrando {len(view):,} de {n_rows:,} filas.")
+
+    # Los otros formatos se convierten por bloques desde el archivo del lote, una vez por formato
+    fmt = st.selectbox("Formato de descarga", export.available_formats(),
+                       format_func=lambda f: export.FORMATS[f][0], key="batch_export_format")
+    path = result['exports'].get(fmt)
+    if path is None or not os.path.exists(path):
+        with metrics.timer("export", mode="batch"):
+            path = result['exports'][fmt] = export.export(export.read_chunks(store), fmt)
+    size_mb = os.path.getsize(path) / 2 ** 20
+    st.download_button(
+        label=f"Descargar Resultados ({export.FORMATS[fmt][0]}, {size_mb:,.1f} MB)",
+        data=lambda: open_export(path),
+        file_name=export.download_name(path),
+        mime=export.FORMATS[fmt][1]
+    )
+
+@st.fragment
+def batch_analysis():
+    """Análisis por lotes. Como fragmento, subir un CSV no recalcula la muestra individual."""
+    model, scaler, version = load_artifacts()
+    with timed_render("Dashboard · Lotes"):
+        # Bloque de análisis por lotes con icono Material Symbols
+        with st.container(border=True):
+            col_icon, col_text = st.columns([1, 15])
+            with col_icon:
+                st.markdown('<span class="material-symbols-outlined" style="font-size: 32px; color: var(--primary);">csv</span>', unsafe_allow_html=True)
+            with col_text:
+                st.markdown("### Análisis por lotes")
+                st.caption("Sube un archivo CSV para realizar predicciones masivas. (Asegúrate de que las columnas coincidan con las esperadas a la muestra.)")
             
-    # Botones de la barra lateral
-    # st.sidebar.markdown('---')
-    analyze_button = st.sidebar.button("Analizar Muestra", type="primary", width="stretch")
-    st.sidebar.button("Restablecer Parámetros", type="secondary", width="stretch")
-
-    # Área principal
-    # st.title("Dashboard")
-
-    # Bloque de análisis por lotes con icono Material Symbols
-    with st.container(border=True):
-        col_icon, col_text = st.columns([1, 15])
-        with col_icon:
-            st.markdown('<span class="material-symbols-outlined" style="font-size: 32px; color: var(--primary);">csv</span>', unsafe_allow_html=True)
-        with col_text:
-            st.markdown("### Análisis por lotes")
-            st.caption("Sube un archivo CSV para realizar predicciones masivas. (Asegúrate de que las columnas coincidan con las esperadas a la muestra.)")
-        
-        csv_file = st.file_uploader(" ", type=["csv"], label_visibility="collapsed")
+            csv_file = st.file_uploader(" ", type=["csv"], label_visibility="collapsed")
 
-    if csv_file is not None:
-        batch_df = pd.read_csv(csv_file)
-        st.subheader("Preview de Archivo CSV")
-        st.dataframe(batch_df.head())
-        
-        # Predicción de lotes
-        if st.button("Ejecutar Predicción por Lotes", type="primary"):
-            try:
-                batch_scaled = scaler.transform(batch_df)
-                predictions = model.predict(batch_scaled)
-                batch_df['Potability_Prediction'] = np.where(predictions == 1, 'POTABLE', 'NO POTABLE')
-                
+        # Los resultados viven en session_state mientras el archivo siga cargado
+        result = st.session_state.get(BATCH_RESULT_KEY)
+        if result is not None and (csv_file is None or result['file_id'] != csv_file.file_id):
+            export.remove(result['exports'].values())
+            del st.session_state[BATCH_RESULT_KEY]
+            result = None
+
+        if csv_file is not None:
+            # Para la vista previa basta con las primeras filas; el archivo completo se lee al puntuar
+            csv_file.seek(0)
+            st.subheader("Preview de Archivo CSV")
+            st.dataframe(pd.read_csv(csv_file, nrows=5))
+            
+            # Predicción de lotes
+            if st.button("Ejecutar Predicción por Lotes", type="primary", disabled=model is None):
+                try:
+                    csv_file.seek(0)
+                    batch_df = pd.read_csv(csv_file)
+                    summary = score_batch(batch_df, model, scaler, version)
+                    if result is not None:
+                        export.remove(result['exports'].values())
+                    # Solo el archivo exportado queda en session_state; el DataFrame se libera al terminar
+                    with metrics.timer("export", mode="batch"):
+                        stored = export.export(batch_df, export.STORE_FORMAT)
+                    del batch_df
+                    result = {'file_id': csv_file.file_id, 'summary': summary,
+                              'exports': {export.STORE_FORMAT: stored}}
+                    st.session_state[BATCH_RESULT_KEY] = result
+                    send_batch_alert(summary, csv_file.name)
+                except SchemaError as e:
+                    metrics.record_error("batch_analysis", type(e).__name__)
+                    st.error(str(e))
+                except Exception as e:
+                    metrics.record_error("batch_analysis", type(e).__name__)
+                    st.error(f"Error al procesar el lote: {e}. Asegurate de que las columnas coinciden con las esperadas.")
+
+            if result is not None:
+                if result['summary']['invalid']:
+                    st.warning(f"{result['summary']['invalid']:,} de {result['summary']['rows']:,} filas tienen valores vacíos, no numéricos "
+                               f"o fuera de rango: quedan como {INVALID_LABEL} (motivo en la columna {ISSUE_COLUMN}).")
                 st.success("Análisis por lotes completado.")
-                
-                st.subheader("Preview de Resultados")
-                st.dataframe(batch_df)
+                render_batch_summary(result['summary'])
+                try:
+                    render_batch_results(result)
+                except Exception as e:
+                    metrics.record_error("batch_export", type(e).__name__)
+                    st.error(f"Error al exportar los resultados: {e}")
 
-                st.download_button(
-                    label="Descargar Resultados como CSV",
-                    data=batch_df.to_csv(index=False).encode('utf-8'),
-                    file_name='water_potability_results.csv',
-                    mime='text/csv'
-                )
-            except Exception as e:
-                st.error(f"Error al procesar el lote: {e}. Asegurate de que las columnas coinciden con las esperadas.")
+COMPARISON_VIEWS = ["Coordenadas paralelas", "Mapa de calor"]
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def build_comparison(data, _model, _scaler, version=None):
+    """Puntúa todas las muestras del archivo en una llamada y precalcula la matriz normalizada"""
+    ranges = {feature: (spec[1], spec[2]) for feature, spec in SAMPLE_PARAMS.items()}
+    with metrics.timer("compare", mode="batch"):
+        return comparison.build(pd.read_csv(io.BytesIO(data)), _model, _scaler, model_feature_names(_scaler), ranges)
+
+@st.fragment
+def comparison_analysis():
+    """
+    Comparación de varias muestras (etapas de tratamiento). Como fragmento,
+    cambiar el filtro o la vista no vuelve a puntuar: solo se indexan las
+    matrices ya calculadas.
+    """
+    model, scaler, version = load_artifacts()
+    with timed_render("Dashboard · Comparación"):
+        with st.container(border=True):
+            col_icon, col_text = st.columns([1, 15])
+            with col_icon:
+                st.markdown('<span class="material-symbols-outlined" style="font-size: 32px; color: var(--primary);">compare_arrows</span>', unsafe_allow_html=True)
+            with col_text:
+                st.markdown("### Comparación de muestras")
+                st.caption("Sube un CSV con una fila por muestra o etapa de tratamiento (columna opcional `Etapa` o `Muestra` con el nombre) para compararlas juntas.")
+            stages_file = st.file_uploader("Muestras a comparar", type=["csv"], label_visibility="collapsed",
+                                           key="comparison_file")
+
+        if stages_file is None or model is None:
+            return
+        try:
+            cs = build_comparison(stages_file.getvalue(), model, scaler, version)
+        except SchemaError as e:
+            metrics.record_error("comparison", type(e).__name__)
+            st.error(str(e))
+            return
+        except Exception as e:
+            metrics.record_error("comparison", type(e).__name__)
+            st.error(f"Error al procesar las muestras: {e}")
+            return
 
-    # Predicción y resultados
-    if analyze_button and model:
-        # Preprocesamiento
-        input_scaled = scaler.transform(input_df)
+        col_view, col_filter, col_order = st.columns(3)
+        with col_view:
+            view = st.radio("Vista", COMPARISON_VIEWS, horizontal=True, key="comparison_view")
+        with col_filter:
+            how = st.selectbox("Mostrar", comparison.FILTERS, key="comparison_filter")
+        with col_order:
+            order = st.selectbox("Ordenar por", comparison.ORDERS, key="comparison_order")
+        rows = cs.select(how, order)
+
+        scored = int(cs.valid.sum())
+        cols = st.columns(4)
+        cols[0].metric("Muestras", f"{scored:,}", help=f"De {len(cs):,} filas del archivo")
+        cols[1].metric("Potables", f"{int((cs.proba[cs.valid] > risk.THRESHOLD).sum()):,}")
+        cols[2].metric("Con alerta", f"{int(cs.assessment[risk.ALERT_COLUMN].to_numpy()[cs.valid].sum()):,}")
+        cols[3].metric("Mostradas", f"{len(rows):,}")
+        if scored < len(cs):
+            st.warning(f"{len(cs) - scored:,} filas tienen valores vacíos, no numéricos o fuera de rango y no se comparan.")
+        if not len(rows):
+            st.info("Ninguna muestra cumple el filtro.")
+            return
+
+        labels = {feature: spec[0] for feature, spec in SAMPLE_PARAMS.items()}
+        if view == "Coordenadas paralelas":
+            st.plotly_chart(comparison.parallel_coordinates(cs, rows, labels), width="stretch")
+            st.caption("Cada línea es una muestra, coloreada por P(potable). Arrastra sobre un eje para filtrar un rango.")
+        else:
+            st.plotly_chart(comparison.heatmap(cs, rows, labels), width="stretch")
+            st.caption("Posición de cada valor dentro del rango de su parámetro (más oscuro = más alto).")
+        st.dataframe(cs.table(rows), hide_index=True)
+
+@st.fragment
+def sample_analysis():
+    """
+    Análisis de la muestra individual. Es un fragmento: mover un slider
+    solo vuelve a ejecutar esta función (predicción y gráficos), no el
+    script completo ni las demás secciones.
+    """
+    import plotly.graph_objects as go
+    
+    model, scaler, version = load_artifacts()
+    with timed_render("Dashboard · Muestra"):
+        col_params, col_result = st.columns([1, 2])
         
-        # Predicción
-        prediction = model.predict(input_scaled)[0]
-        proba = model.predict_proba(input_scaled)[0]
-        confidence = proba[prediction] * 100
+        with col_params:
+            st.markdown('### Parámetros de la Muestra')
+            input_df = user_input_features()
+            analyze_button = st.button("Analizar Muestra", type="primary", width="stretch")
+            st.button("Restablecer Parámetros", type="secondary", width="stretch", on_click=reset_sample_params)
+
+        if model is None:
+            return
         
-        prediction = model.predict(input_scaled)[0]
+        # Predicción (cacheada por combinación de parámetros)
+        prediction, confidence = predict_sample(model, scaler, tuple(input_df.iloc[0]), version)
         ph_val = input_df['ph'].iloc[0]
         
-        # === NUEVO: GUARDAR ESTADO PARA EL BOT (/status) ===
-        status_data = {
-            "prediction": "POTABLE" if prediction == 1 else "NO POTABLE",
-            "ph": float(ph_val),
-            "confidence": float(confidence),
-            "timestamp": datetime.datetime.now().strftime("%H:%M:%S")
-        }
-        with open("water_status.json", "w") as f:
-            json.dump(status_data, f)
-        
-        # SISTEMA DE ALERTAS INTEGRADO
-        trigger = False
-        reasons = []
-        
-        # 1. Criterio IA
-        if prediction == 0: # 0 = No Potable
-            trigger = True
-            reasons.append(f"IA detectó riesgo (Confianza: {confidence:.1f}%)")
+        # Registro del análisis y alertas: solo al pulsar "Analizar Muestra"
+        if analyze_button:
+            track_drift(input_df, "sample", version)
             
-        # 2. Criterio Normativo (pH)
-        ph_val = input_df['ph'].iloc[0]
-        if ph_val < 6.5 or ph_val > 8.5:
-            trigger = True
-            reasons.append(f"pH fuera de norma ({ph_val:.1f})")
-
-        # 3. Disparo de Alerta
-        if trigger:
-            # Recuperar ID de la sesión
-            chat_id = st.session_state.get('tg_id')
+            # === NUEVO: GUARDAR ESTADO PARA EL BOT (/status) ===
+            status_data = {
+                "prediction": "POTABLE" if prediction == 1 else "NO POTABLE",
+                "ph": float(ph_val),
+                "confidence": float(confidence),
+                "timestamp": datetime.datetime.now().strftime("%H:%M:%S")
+            }
+            with open("water_status.json", "w") as f:
+                json.dump(status_data, f)
             
-            if chat_id:
-                msg = (
-                    f"🚨 *ALERTA DE CALIDAD DE AGUA*\n\n"
-                    f"**Motivos:** {', '.join(reasons)}\n"
-                    f"**Muestra:** pH {ph_val:.1f}"
-                )
-                # Llamamos a la función que importamos de src/telegram_bot.py
-                ok, status = send_telegram_alert(msg, chat_id)
+            # SISTEMA DE ALERTAS INTEGRADO
+            trigger = False
+            reasons = []
+            
+            # 1. Criterio IA
+            if prediction == 0: # 0 = No Potable
+                trigger = True
+                reasons.append(f"IA detectó riesgo (Confianza: {confidence:.1f}%)")
+                
+            # 2. Criterio Normativo (pH)
+            if risk.ph_out_of_range(ph_val):
+                trigger = True
+                reasons.append(f"pH fuera de norma ({ph_val:.1f})")
+
+            # 3. Disparo de Alerta
+            if trigger:
+                # Recuperar ID de la sesión
+                chat_id = st.session_state.get('tg_id')
                 
-                if ok:
-                    st.toast(f"Alerta enviada a {st.session_state['tg_name']}", icon="📲")
+                if chat_id:
+                    msg = (
+                        f"🚨 *ALERTA DE CALIDAD DE AGUA*\n\n"
+                        f"**Motivos:** {', '.join(reasons)}\n"
+                        f"**Muestra:** pH {ph_val:.1f}"
+                    )
+                    # Llamamos a la función que importamos de src/telegram_bot.py
+                    ok, status = send_telegram_alert(msg, chat_id)
+                    
+                    if ok:
+                        st.toast(f"Alerta enviada a {st.session_state['tg_name']}", icon="📲")
+                    else:
+                        st.error(f"Fallo Telegram: {status}")
                 else:
-                    st.error(f"Fallo Telegram: {status}")
-            else:
-                st.warning("⚠️ Riesgo detectado, pero no has sincronizado el Bot.")
+                    st.warning("⚠️ Riesgo detectado, pero no has sincronizado el Bot.")
         
         # Mostrar resultados con diseño del mockup
         if prediction == 1:
@@ -457,31 +562,62 @@ def tab_dashboard():
             title_text = "NO Potable"
             title_class = "no-potable"
         
-        st.markdown(f"""
-        <div class="result-card">
-            <div class="result-icon {icon_class}">
-                <span class="material-symbols-outlined">{icon_symbol}</span>
+        with col_result:
+            st.markdown(f"""
+            <div class="result-card">
+                <div class="result-icon {icon_class}">
+                    <span class="material-symbols-outlined">{icon_symbol}</span>
+                </div>
+                <h3 class="result-title {title_class}">{title_text}</h3>
+                <p class="result-confidence">{confidence:.1f}% Confianza</p>
             </div>
-            <h3 class="result-title {title_class}">{title_text}</h3>
-            <p class="result-confidence">{confidence:.1f}% Confianza</p>
-        </div>
-        """, unsafe_allow_html=True)
+            """, unsafe_allow_html=True)
         
         # Visualizaciones
         col_feat_imp, col_radar = st.columns([3, 2])
         
-        # Gráfico1: Importancia de características
+        # Gráfico1: Contribución de cada característica (por muestra o global)
         with col_feat_imp:
             st.subheader("Importancia de Características")
+            view = st.radio("Vista", ["Esta muestra", "Global (entrenamiento)"],
+                            horizontal=True, label_visibility="collapsed", key="importance_view")
             
-            importance_values = [0.25, 0.19, 0.10, 0.09, 0.085, 0.08, 0.075, 0.07, 0.07]  # Valores ficticios de importancia
-            df_imp = pd.DataFrame({
-                'Característica': FEATURES_IMPORTANCE_ORDER,
-                'Importancia': importance_values
-            }).sort_values(by='Importancia', ascending=True)
-            
-            # Gráfico de barras horizontales con color accent del diseño
-            st.bar_chart(df_imp, x='Importancia', y='Característica', color='#11a4d4', height=400)
+            if view == "Esta muestra":
+                contributions = explain_sample(model, scaler, tuple(input_df.iloc[0]), version)
+                df_imp = pd.DataFrame({
+                    'Característica': list(contributions),
+                    'Contribución': [v * 100 for v in contributions.values()]
+                }).sort_values(by='Contribución', key=abs, ascending=True)
+                
+                # Verde empuja hacia "potable", rojo hacia "no potable"
+                fig_imp = go.Figure(go.Bar(
+                    x=df_imp['Contribución'],
+                    y=df_imp['Característica'],
+                    orientation='h',
+                    marker_color=np.where(df_imp['Contribución'] >= 0, '#4ade80', '#ef4444'),
+                    hovertemplate='%{y}: %{x:+.1f} pts<extra></extra>'
+                ))
+                fig_imp.update_layout(
+                    height=400,
+                    margin=dict(l=0, r=0, t=10, b=0),
+                    xaxis_title="Puntos de probabilidad de potabilidad",
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    plot_bgcolor='rgba(0,0,0,0)',
+                )
+                st.plotly_chart(fig_imp, width="stretch")
+            else:
+                metadata = load_model_metadata(version)
+                importances = metadata.get('mean_abs_contribution') or metadata.get('feature_importances')
+                if not importances:
+                    # Modelos entrenados antes de guardar metadatos: usar la impureza del bosque
+                    importances = dict(zip(model_feature_names(scaler), model.feature_importances_))
+                df_imp = pd.DataFrame({
+                    'Característica': list(importances),
+                    'Importancia': list(importances.values())
+                }).sort_values(by='Importancia', ascending=True)
+                
+                # Gráfico de barras horizontales con color accent del diseño
+                st.bar_chart(df_imp, x='Importancia', y='Característica', color='#11a4d4', height=400)
 
         # Gráfico Radar Chart
         with col_radar:
@@ -534,8 +670,97 @@ def tab_dashboard():
                 plot_bgcolor='rgba(0,0,0,0)',
             )
             st.plotly_chart(fig, width="stretch")
+        
+        # Análisis What-If: curva ICE del parámetro elegido alrededor de la muestra actual
+        st.subheader("Análisis What-If")
+        engine = load_whatif_engine(model, scaler, version)
+        col_param, col_curve = st.columns([1, 3])
+        with col_param:
+            whatif_feature = st.selectbox(
+                "Parámetro a variar",
+                engine.features,
+                format_func=lambda f: SAMPLE_PARAMS[f][0],
+                key="whatif_feature"
+            )
+            st.caption("Probabilidad de potabilidad al recorrer todo el rango del parámetro, "
+                       "con el resto de la muestra fijo.")
+        
+        with col_curve:
+            values = engine_values(engine, tuple(input_df.iloc[0]))
+            curve = engine.curve(values, whatif_feature)
+            current_value = input_df[whatif_feature].iloc[0]
+            
+            fig_whatif = go.Figure()
+            fig_whatif.add_trace(go.Scatter(
+                x=curve['valor'],
+                y=curve['probabilidad'] * 100,
+                mode='lines',
+                line=dict(color='#11a4d4', width=3, shape='hv'),
+                name='P(potable)',
+                hovertemplate='%{x}: %{y:.1f}%<extra></extra>'
+            ))
+            fig_whatif.add_trace(go.Scatter(
+                x=[current_value],
+                y=[engine.probability(values) * 100],
+                mode='markers',
+                marker=dict(size=12, color='#0f172a'),
+                name='Muestra actual'
+            ))
+            fig_whatif.add_hline(y=50, line_dash='dot', line_color='#ef4444')
+            fig_whatif.update_layout(
+                height=300,
+                margin=dict(l=0, r=0, t=10, b=0),
+                xaxis_title=SAMPLE_PARAMS[whatif_feature][0],
+                yaxis=dict(title="P(potable) %", range=[0, 100]),
+                showlegend=False,
+                paper_bgcolor='rgba(0,0,0,0)',
+                plot_bgcolor='rgba(0,0,0,0)',
+            )
+            st.plotly_chart(fig_whatif, width="stretch")
+
+def tab_dashboard():
+    watcher = get_model_watcher()
+    bundle = watcher.current()
+    if bundle is None:
+        metrics.record_error("model_load", "missing")
+        st.error("Error: No se encontró el modelo o el escalador. Por favor, asegúrese de que los archivos existen en la ruta especificada.")
+    else:
+        st.sidebar.caption(f"🧠 Modelo activo: versión `{bundle.version}` ({bundle.model_format}) · cargado a las "
+                           f"{datetime.datetime.fromtimestamp(bundle.loaded_at):%H:%M:%S}")
+    if bundle is not None and watcher.last_error:
+        st.sidebar.warning(f"No se pudo cargar una versión nueva del modelo ({watcher.last_error}); se mantiene la anterior.")
+    
+    with st.sidebar.expander("🔔 Conectar Alertas", expanded=True):
+        # Enlace directo a tu bot
+        bot_name = "AquaAlert_ec_Bot" # Pon el nombre real de tu bot sin @
+        st.markdown(f"1. [Abrir Bot en Telegram](https://t.me/{bot_name}) y dar **/start**")
+        
+        if st.button("🔄 Sincronizar con Bot"):
+            try:
+                with open("telegram_connection.json", "r") as f:
+                    data = json.load(f)
+                
+                # Guardar en sesión
+                st.session_state['tg_id'] = data['chat_id']
+                st.session_state['tg_name'] = data['name']
+                st.success(f"Conectado: {data['name']}")
+            except FileNotFoundError:
+                st.warning("Primero ve a Telegram y usa /start")
+                
+        # Estado actual
+        if 'tg_id' in st.session_state:
+            st.caption(f"✅ Enviando a: {st.session_state['tg_name']}")
+        else:
+            st.caption("🔴 No conectado")
+
+    # Área principal: cada sección es un fragmento que se vuelve a ejecutar por separado
+    batch_analysis()
+    sample_analysis()
+    comparison_analysis()
 
 def tab_vision():
+    import plotly.graph_objects as go
+    
     st.header("Análisis de Imágenes")
     st.caption("Análisis de turbidez mediante visión por computadora. Sube una imagen de tu muestra de agua.")
     
@@ -835,20 +1060,49 @@ Cumple OMS: {'Sí' if result['meets_who_standards'] else 'No'}
         </div>
         """, unsafe_allow_html=True)
 
+# Segundos entre refrescos automáticos del panel de cámaras
+CAMERA_REFRESH_SECONDS = int(os.getenv("CAMERA_REFRESH_SECONDS", "30"))
+
+@st.cache_data(ttl=CAMERA_REFRESH_SECONDS, show_spinner=False)
+def load_cameras():
+    """Lee cameras/info.json; se vuelve a leer como máximo una vez por intervalo de refresco"""
+    cameras_file = os.path.join(BASE_DIR, "cameras/info.json")
+    with open(cameras_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
 def tab_cameras():
     """Tab de monitoreo de cámaras en tiempo real"""
     st.header("Monitoreo de Cámaras en Tiempo Real")
     st.caption("Sistema de vigilancia inteligente para fuentes de agua en comunidades rurales")
-    
+    camera_monitor()
+
+@st.fragment(run_every=CAMERA_REFRESH_SECONDS)
+def camera_monitor():
+    """
+    Panel y grilla de cámaras. Se refresca solo cada CAMERA_REFRESH_SECONDS
+    y al cambiar los filtros, sin volver a ejecutar el resto de la página.
+    """
+    with timed_render("Cámaras · Grilla"):
+        render_cameras()
+
+def render_cameras():
     # Cargar datos de cámaras
-    cameras_file = os.path.join(BASE_DIR, "cameras/info.json")
     try:
-        with open(cameras_file, 'r', encoding='utf-8') as f:
-            cameras_data = json.load(f)
+        cameras_data = load_cameras()
     except Exception as e:
+        metrics.record_error("cameras_load", type(e).__name__)
         st.error(f"Error al cargar datos de cámaras: {str(e)}")
         return
     
+    # Lecturas de pH y turbidez al monitor de deriva (cada lectura una sola vez). Sin
+    # modelo cargado se usa la referencia de la versión publicada, sin cargar el modelo
+    monitor = get_drift_monitor(loaded_model_version() or artifacts.current_version())
+    if monitor is not None:
+        for cam in cameras_data:
+            quality = cam.get('water_quality', {})
+            reading = pd.DataFrame([{'ph': quality.get('ph'), 'Turbidity': quality.get('turbidity_ntu')}])
+            monitor.update_once(f"{cam['camera_id']}@{cam.get('last_update')}", reading, "cameras")
+    
     # Panel de control superior con estadísticas
     st.markdown("### 📊 Panel de Control")
     
@@ -1112,10 +1366,45 @@ def tab_chatbot():
     st.info("Módulo en desarrollo. Aquí se implementará el chatbot.")
 
 
-if selection == "Dashboard General":
-    tab_dashboard()
-elif selection == "Análisis de Imágenes":
-    tab_vision()
-elif selection == "Monitoreo de Cámaras":
-    tab_cameras()
+# Solo se construye la pestaña seleccionada; el tiempo se registra por pestaña
+with timed_render(selection):
+    if selection == "Dashboard General":
+        tab_dashboard()
+    elif selection == "Análisis de Imágenes":
+        tab_vision()
+    elif selection == "Monitoreo de Cámaras":
+        tab_cameras()
+
+drift_monitor = active_drift_monitor()
+with st.sidebar.expander("📉 Deriva de datos", expanded=False):
+    if loaded_model_version() is None:
+        st.caption("Sin modelo cargado: el monitor se activa al abrir el Dashboard General.")
+    elif drift_monitor is None:
+        st.caption("Sin referencia de entrenamiento. Ejecuta src/model_train.py para generarla.")
+    else:
+        drift_rows = pd.DataFrame(drift_monitor.report())
+        st.dataframe(
+            drift_rows[['feature', 'n', 'psi', 'ks', 'status']].rename(columns={
+                'feature': 'Variable', 'n': 'Filas', 'psi': 'PSI', 'ks': 'KS', 'status': 'Estado'
+            }),
+            hide_index=True, width="stretch"
+        )
+        fuentes = ", ".join(f"{k}: {v:,}" for k, v in drift_monitor.rows_by_source.items()) or "ninguna"
+        st.caption(f"Ventana del {drift_monitor.window_date:%d/%m/%Y} · Filas por origen: {fuentes}")
+
+# Alertas de deriva: una por variable y por hora
+if drift_monitor is not None:
+    for alert in drift_monitor.new_alerts():
+        message = (f"Deriva de datos en {alert['feature']}: PSI {alert['psi']:.2f}, KS {alert['ks']:.2f} "
+                   f"(media {alert['ref_mean']:.1f} → {alert['live_mean']:.1f})")
+        st.toast(message, icon="📉")
+        if st.session_state.get('tg_id'):
+            send_telegram_alert(f"📉 *ALERTA DE DERIVA*\n\n{message}", st.session_state['tg_id'])
+
+with st.sidebar.expander("⏱️ Tiempos de renderizado", expanded=False):
+    timing_rows = render_timing_rows()
+    if timing_rows:
+        st.dataframe(pd.DataFrame(timing_rows), hide_index=True, width="stretch")
+    else:
+        st.caption("Sin mediciones todavía")
 create_chatbot_widget()
\ No newline at end of file
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Balanceo con SMOTE: notebook (imblearn) vs src/balancing.py
+Para datasets sintéticos de distinto tamaño (~39% potable, como el
+original) mide el tiempo y la memoria máxima asignada (tracemalloc) de:
+- imblearn: SMOTE(random_state=42).fit_resample, como 02_limpieza_etl.ipynb
+  (se omite si imbalanced-learn no está instalado)
+- kNN completo: lo mismo que hace imblearn por dentro, vecinos de toda la
+  clase minoritaria con NearestNeighbors y luego la interpolación
+- balancing.py con 1 hilo y con uno por núcleo, y con un tope de memoria bajo
+Verifica además que las clases queden balanceadas y que la media de las
+muestras sintéticas se parezca a la de la clase minoritaria.
+
+Uso: python benchmarks/bench_balancing.py [--rows 100000,1000000] [--max-memory-mb 64]
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+import tracemalloc
+
+# Añadir src al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+import balancing
+import test_data
+
+
+def imblearn_smote(X, y):
+    from imblearn.over_sampling import SMOTE
+    return SMOTE(random_state=42).fit_resample(X, y)
+
+
+def full_knn_smote(X, y, k=5):
+    """Vecinos de todas las muestras minoritarias y luego el sorteo (estrategia de imblearn)"""
+    rng = np.random.default_rng(42)
+    classes, counts = np.unique(y, return_counts=True)
+    minority = classes[counts.argmin()]
+    X_class = X[y == minority]
+    n_new = counts.max() - counts.min()
+    neighbors = NearestNeighbors(n_neighbors=k + 1).fit(X_class).kneighbors(X_class, return_distance=False)[:, 1:]
+    base = rng.integers(0, len(X_class), n_new)
+    chosen = neighbors[base, rng.integers(0, k, n_new)]
+    synthetic = X_class[base] + rng.random(n_new)[:, None] * (X_class[chosen] - X_class[base])
+    return np.vstack([X, synthetic]), np.r_[y, np.full(n_new, minority)]
+
+
+def measure(fn, X, y):
+    tracemalloc.start()
+    start = time.perf_counter()
+    X_res, y_res = fn(X, y)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, np.asarray(X_res), np.asarray(y_res)
+
+
+def run(row_counts, max_memory_mb):
+    cores = os.cpu_count() or 1
+    variants = []
+    if importlib.util.find_spec('imblearn') is not None:
+        variants.append(("imblearn (notebook)", imblearn_smote))
+    else:
+        print("imbalanced-learn no está instalado: se omite la variante del notebook\n")
+    variants += [
+        ("kNN completo", full_knn_smote),
+        ("balancing, 1 hilo", lambda X, y: balancing.smote(X, y, n_jobs=1)),
+    ]
+    if cores > 1:
+        variants.append((f"balancing, {cores} hilos", lambda X, y: balancing.smote(X, y, n_jobs=cores)))
+    variants += [
+        (f"balancing, tope {max_memory_mb:g} MB",
+         lambda X, y: balancing.smote(X, y, n_jobs=cores, max_memory_mb=max_memory_mb)),
+    ]
+
+    print(f"{'Filas':>10} {'Variante':<26} {'Tiempo (s)':>11} {'Memoria máx (MB)':>17} "
+          f"{'Resultado (MB)':>15} {'Clases':>18} {'Dif. media sintética':>21}")
+    for n_rows in row_counts:
+        df = test_data.generate_samples(n_rows, seed=5, with_target=True)
+        X, y = df[test_data.columns].to_numpy(), df['Potability'].to_numpy()
+        minority_mean = X[y == 1].mean(axis=0)
+        for name, fn in variants:
+            elapsed, peak, X_res, y_res = measure(fn, X, y)
+            drift = np.max(np.abs(X_res[len(X):].mean(axis=0) - minority_mean) / X.std(axis=0))
+            print(f"{n_rows:>10,} {name:<26} {elapsed:>11.2f} {peak / 2 ** 20:>17,.0f} "
+                  f"{X_res.nbytes / 2 ** 20:>15,.0f} {str(np.bincount(y_res).tolist()):>18} {drift:>20.3f}σ")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SMOTE: imblearn vs índice espacial por lotes")
+    parser.add_argument("--rows", default="100000,1000000")
+    parser.add_argument("--max-memory-mb", type=float, default=64, help="Tope de memoria de la última variante")
+    args = parser.parse_args()
+    run([int(r) for r in args.rows.split(",")], args.max_memory_mb)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline del tamaño de las solicitudes del chatbot
+Simula una conversación larga y compara el payload enviado con historial
+ilimitado vs. historial acotado por tokens (sin llamar a ninguna API).
+
+Uso: python benchmarks/bench_chat_history.py [--turns 200] [--provider openrouter]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+# Añadir src al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from chatbot_llm import ChatbotLLM
+from chat_history import ConversationHistory, PROVIDER_TOKEN_BUDGETS
+
+QUESTIONS = [
+    "¿Cuál es el rango seguro de pH para agua potable?",
+    "La turbidez de la muestra es 6.2 NTU, ¿qué tratamiento recomiendas?",
+    "¿Qué significa un valor alto de trihalometanos en la planta?",
+    "Explica la diferencia entre dureza y sólidos disueltos totales.",
+    "¿Cómo afectan las cloraminas a la potabilidad del agua?",
+    "Tenemos sulfatos en 410 mg/L, ¿es un riesgo para la salud?",
+]
+
+ANSWER_SENTENCES = [
+    "Según la OMS el valor recomendado se mantiene dentro del rango de referencia.",
+    "Se sugiere revisar la dosificación de coagulante y la operación de los filtros.",
+    "Un valor fuera de norma requiere repetir el análisis en laboratorio.",
+    "Es importante registrar la hora de la toma de muestra y el punto de muestreo.",
+    "La tendencia de los últimos días ayuda a decidir si el problema es puntual.",
+    "Si el valor persiste, conviene notificar al ingeniero de planta.",
+]
+
+
+def fake_answer(rng):
+    """Genera una respuesta sintética de longitud variable"""
+    return " ".join(rng.choice(ANSWER_SENTENCES) for _ in range(rng.randint(4, 12)))
+
+
+def payload_bytes(bot, user_message):
+    """Tamaño en bytes del cuerpo JSON que se enviaría a la API, en el formato del proveedor del bot"""
+    if bot.provider == "google":
+        body = {"model": "benchmark", "contents": bot._build_gemini_prompt(user_message)}
+    elif bot.provider == "anthropic":
+        body = {"model": "benchmark", "system": bot._system_prompt(),
+                "messages": bot._history_messages(user_message)}
+    else:
+        body = {"model": "benchmark", "messages": bot._build_messages(user_message)}
+    return len(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+
+
+def run(turns, provider, budget):
+    # Clave ficticia: el benchmark nunca llama a la API
+    os.environ.setdefault(f"{provider.upper()}_API_KEY", "offline-benchmark")
+    bounded = ChatbotLLM(provider=provider, history_budget=budget)
+    unbounded = ChatbotLLM(provider=provider)
+    unbounded.history = ConversationHistory(budget_tokens=None)
+
+    rng = random.Random(42)
+    rows = []
+    for turn in range(1, turns + 1):
+        question = rng.choice(QUESTIONS)
+        answer = fake_answer(rng)
+        sizes = []
+        for bot in (unbounded, bounded):
+            bot.add_message("user", question)
+            sizes.append(payload_bytes(bot, question))
+            bot.add_message("assistant", answer)
+        rows.append((turn, sizes[0], sizes[1], bounded.history.total_tokens))
+
+    print(f"Proveedor simulado: {provider} | Presupuesto de historial: {budget} tokens\n")
+    print(f"{'Turno':>6} {'Ilimitado (B)':>15} {'Acotado (B)':>13} {'Tokens hist.':>13}")
+    for turn, full, compact, tokens in rows:
+        if turn == 1 or turn % 20 == 0:
+            print(f"{turn:>6} {full:>15,} {compact:>13,} {tokens:>13,}")
+
+    total_full = sum(r[1] for r in rows)
+    total_compact = sum(r[2] for r in rows)
+    print(f"\nTotal enviado en {turns} turnos: {total_full:,} B ilimitado vs {total_compact:,} B acotado "
+          f"({100 * (1 - total_compact / total_full):.1f}% menos)")
+    print(f"Mensajes compactados en el resumen: {bounded.history.compacted_messages}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del historial del chatbot")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--provider", default="openrouter", choices=sorted(PROVIDER_TOKEN_BUDGETS))
+    parser.add_argument("--budget", type=int, default=None, help="Presupuesto de tokens (por defecto el del proveedor)")
+    args = parser.parse_args()
+
+    budget = args.budget if args.budget is not None else PROVIDER_TOKEN_BUDGETS[args.provider]
+    run(args.turns, args.provider, budget)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Carga del modelo: pickle (joblib) vs formato compacto (src/compact_forest.py)
+Entrena un bosque de referencia, lo guarda en ambos formatos y mide en
+procesos nuevos (como un worker o una sesión recién iniciada) el tiempo de
+carga y la memoria residente que agrega: anónima (privada del proceso) y
+respaldada por archivo (páginas compartidas entre procesos). Verifica
+además que las predicciones coincidan con el modelo original.
+
+Uso: python benchmarks/bench_compact_model.py [--trees 100] [--repeat 5] [--rows 100000]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+# Añadir src al path
+sys.path.append(SRC_DIR)
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+import compact_forest
+import test_data
+
+# Se ejecuta en un proceso nuevo: importa las dependencias antes de medir
+# para que solo cuente la carga del modelo y una primera predicción
+LOAD_PROBE = r"""
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+import numpy as np, joblib, sklearn.ensemble
+import compact_forest
+
+def rss_kb():
+    fields = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('RssAnon', 'RssFile'):
+                fields[key] = int(value.split()[0])
+    return fields
+
+before = rss_kb()
+start = time.perf_counter()
+model = joblib.load(sys.argv[3]) if sys.argv[2] == 'pickle' else compact_forest.load(sys.argv[3])
+load_ms = (time.perf_counter() - start) * 1000
+model.predict_proba(np.zeros((1, model.n_features_in_)))
+after = rss_kb()
+print(json.dumps({'load_ms': load_ms, **{k: after.get(k, 0) - before.get(k, 0) for k in after}}))
+"""
+
+
+def probe(kind, path, repeat):
+    """Mediana de carga y memoria agregada en `repeat` procesos nuevos"""
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', LOAD_PROBE, SRC_DIR, kind, path],
+                             capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return {key: float(np.median([r.get(key, 0) for r in runs])) for key in runs[0]}
+
+
+def predict_latency(model, X, repeat):
+    model.predict_proba(X)  # calentamiento
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.predict_proba(X)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(n_trees, repeat, n_rows):
+    train = test_data.generate_samples(3276, seed=7, with_target=True)
+    scaler = StandardScaler().fit(train[test_data.columns])
+    model = RandomForestClassifier(n_estimators=n_trees, random_state=42)
+    model.fit(scaler.transform(train[test_data.columns]), train['Potability'])
+
+    holdout = test_data.generate_samples(n_rows, seed=11, with_target=True)
+    X = scaler.transform(holdout[test_data.columns])
+    y = holdout['Potability'].to_numpy()
+    reference = model.predict_proba(X)
+
+    with tempfile.TemporaryDirectory(prefix="sipca-compact-") as workdir:
+        paths = {
+            'pickle': os.path.join(workdir, 'model.pkl'),
+            'compact': os.path.join(workdir, 'model.forest'),
+        }
+        joblib.dump(model, paths['pickle'])
+        compact_forest.save(model, paths['compact'], test_data.columns)
+        loaded = {'pickle': model, 'compact': compact_forest.load(paths['compact'])}
+
+        print(f"Bosque: {n_trees} árboles, {sum(e.tree_.node_count for e in model.estimators_):,} nodos\n")
+        print(f"{'Formato':<9} {'Archivo (KB)':>13} {'Carga (ms)':>11} {'RSS anón (KB)':>14} "
+              f"{'RSS archivo (KB)':>17} {'1 fila (ms)':>12} {'Lote (ms)':>10} {'Accuracy':>9} "
+              f"{'Dif. máx':>9} {'Discrepancias':>14}")
+        for kind, path in paths.items():
+            stats = probe(kind, path, repeat)
+            proba = loaded[kind].predict_proba(X)
+            accuracy = float(np.mean(loaded[kind].classes_[proba.argmax(axis=1)] == y))
+            mismatches = int(np.sum(proba.argmax(axis=1) != reference.argmax(axis=1)))
+            print(f"{kind:<9} {os.path.getsize(path) / 1024:>13,.0f} {stats['load_ms']:>11.1f} "
+                  f"{stats.get('RssAnon', 0):>14,.0f} {stats.get('RssFile', 0):>17,.0f} "
+                  f"{predict_latency(loaded[kind], X[:1], 50):>12.3f} "
+                  f"{predict_latency(loaded[kind], X, 3):>10.1f} {accuracy:>9.4f} "
+                  f"{np.abs(proba - reference).max():>9.1e} {mismatches:>14,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga del modelo: pickle vs formato compacto")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5, help="Procesos nuevos por formato")
+    parser.add_argument("--rows", type=int, default=100_000, help="Filas para paridad y latencia por lote")
+    args = parser.parse_args()
+    run(args.trees, args.repeat, args.rows)
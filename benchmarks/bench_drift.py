@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Rendimiento y memoria del monitor de deriva (src/drift.py)
+Alimenta el monitor con lotes sintéticos hasta N filas, mide filas/s y el
+tamaño serializado de los resúmenes (que no debe crecer con N), y verifica
+que una deriva inyectada en el pH se detecte.
+
+Uso: python benchmarks/bench_drift.py [--rows 5000000] [--batch 100000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Añadir src al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import test_data
+from drift import DriftMonitor, build_reference
+
+
+def sketch_bytes(monitor):
+    return len(json.dumps({f: s.to_dict() for f, s in monitor.live.items()}))
+
+
+def run(total_rows, batch_rows):
+    reference = build_reference(test_data.generate_samples(3276, seed=1), test_data.columns)
+    monitor = DriftMonitor(reference)
+
+    # Generar los lotes por fuera del cronómetro: se mide solo el monitor
+    batches = [test_data.generate_samples(batch_rows, seed=100 + i) for i in range(4)]
+    elapsed = 0.0
+    seen = 0
+    print(f"{'Filas':>12} {'Filas/s':>14} {'Resúmenes (KB)':>15}")
+    while seen < total_rows:
+        batch = batches[(seen // batch_rows) % len(batches)]
+        start = time.perf_counter()
+        monitor.update(batch, "batch")
+        elapsed += time.perf_counter() - start
+        seen += len(batch)
+        if seen % (batch_rows * 10) == 0 or seen >= total_rows:
+            print(f"{seen:>12,} {seen / elapsed:>14,.0f} {sketch_bytes(monitor) / 1024:>15.1f}")
+
+    start = time.perf_counter()
+    report = monitor.report()
+    print(f"\nReporte (PSI + KS de {len(report)} variables): {(time.perf_counter() - start) * 1000:.1f} ms")
+    print("Estados sin deriva:", sorted({r['status'] for r in report}))
+
+    shifted = test_data.generate_samples(50_000, seed=7)
+    shifted['ph'] += 1.0
+    drifted = DriftMonitor(reference)
+    drifted.update(shifted, "batch")
+    detected = [r['feature'] for r in drifted.report() if r['status'] == 'deriva']
+    print("Deriva inyectada en ph -> detectada en:", detected)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rendimiento del monitor de deriva")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--batch", type=int, default=100_000)
+    args = parser.parse_args()
+    run(args.rows, args.batch)
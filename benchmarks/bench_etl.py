@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+ETL de datos crudos: notebook vs src/etl.py
+Genera un CSV crudo sintético con los faltantes del dataset original (pH
+~15%, sulfato ~24%, trihalometanos ~5%) y lo limpia, cada variante en un
+proceso nuevo:
+- notebook: pd.read_csv del archivo completo + groupby/transform por columna
+  (la celda de imputación de 02_limpieza_etl.ipynb, con mediana)
+- etl: src/etl.py por bloques, con 1 proceso y con uno por núcleo
+Reporta tiempo, filas/s y memoria residente máxima, y la diferencia entre
+los valores de imputación (la mediana del ETL es aproximada, con t-digest).
+
+Uso: python benchmarks/bench_etl.py [--rows 2000000] [--chunk-mb 32]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+# Añadir src al path
+sys.path.append(SRC_DIR)
+
+import numpy as np
+
+import test_data
+
+# Se ejecuta en un proceso nuevo para medir la memoria máxima de cada variante
+PROBE = r"""
+import json, resource, sys, time
+sys.path.insert(0, sys.argv[1])
+import pandas as pd
+import etl
+
+kind, path, output = sys.argv[2], sys.argv[3], sys.argv[4]
+start = time.perf_counter()
+if kind == 'notebook':
+    df = pd.read_csv(path)
+    for col in ['ph', 'Sulfate', 'Trihalomethanes']:
+        df[col] = df[col].fillna(df.groupby('Potability')[col].transform('median'))
+    df.to_parquet(output, index=False)
+    fills = {str(k): v for k, v in df.groupby('Potability')['Sulfate'].median().items()}
+    rows = len(df)
+else:
+    report = etl.run(path, output, workers=int(sys.argv[5]), chunk_bytes=int(sys.argv[6]))
+    fills = {k: v['Sulfate'] for k, v in report['fill_values'].items() if k != etl.ALL}
+    rows = report['rows']
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+print(json.dumps({'seconds': elapsed, 'rows': rows, 'peak_mb': peak / 1024, 'fills': fills}))
+"""
+
+
+def write_raw(path, n_rows, seed=3):
+    """CSV crudo escrito por lotes para no tener todo el archivo en memoria"""
+    rng = np.random.default_rng(seed)
+    batch = 200_000
+    for i, offset in enumerate(range(0, n_rows, batch)):
+        df = test_data.generate_samples(min(batch, n_rows - offset), seed=seed + i, with_target=True)
+        for col, rate in [('ph', 0.15), ('Sulfate', 0.24), ('Trihalomethanes', 0.05)]:
+            df.loc[rng.random(len(df)) < rate, col] = np.nan
+        df.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+
+
+def probe(kind, path, output, workers=1, chunk_bytes=0):
+    out = subprocess.run([sys.executable, '-c', PROBE, SRC_DIR, kind, path, output, str(workers), str(chunk_bytes)],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run(n_rows, chunk_mb):
+    cores = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory(prefix="sipca-etl-") as workdir:
+        raw = os.path.join(workdir, 'raw.csv')
+        write_raw(raw, n_rows)
+        print(f"CSV crudo: {n_rows:,} filas, {os.path.getsize(raw) / 2 ** 20:,.0f} MB; {cores} núcleos\n")
+        variants = [('notebook (pandas)', 'notebook', 1), ('etl, 1 proceso', 'etl', 1)]
+        if cores > 1:
+            variants.append((f'etl, {cores} procesos', 'etl', cores))
+
+        print(f"{'Variante':<20} {'Tiempo (s)':>11} {'Filas/s':>12} {'RSS máx (MB)':>13} {'Dif. mediana sulfato':>21}")
+        reference = None
+        for name, kind, workers in variants:
+            result = probe(kind, raw, os.path.join(workdir, f'{kind}-{workers}.parquet'),
+                           workers, int(chunk_mb * 2 ** 20))
+            reference = reference or result['fills']
+            diff = max(abs(result['fills'][k] - reference[k]) / reference[k] for k in reference)
+            print(f"{name:<20} {result['seconds']:>11.2f} {result['rows'] / result['seconds']:>12,.0f} "
+                  f"{result['peak_mb']:>13,.0f} {diff:>20.4%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ETL de datos crudos: notebook vs etl.py")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunk-mb", type=float, default=32)
+    args = parser.parse_args()
+    run(args.rows, args.chunk_mb)
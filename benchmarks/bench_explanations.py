@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Latencia de las explicaciones por muestra (src/explain.py)
+Entrena un bosque de referencia sobre datos sintéticos, mide el tiempo por
+fila para una muestra y para lotes, y verifica que las contribuciones más
+el sesgo reproduzcan predict_proba.
+
+Uso: python benchmarks/bench_explanations.py [--sizes 1,100,10000,100000] [--trees 100]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Añadir src al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+import test_data
+from explain import ForestExplainer
+
+# Objetivo de latencia por fila
+TARGET_MS_PER_ROW = 5.0
+
+
+def run(sizes, n_trees):
+    train = test_data.generate_samples(3276, seed=7, with_target=True)
+    scaler = StandardScaler().fit(train[test_data.columns])
+    model = RandomForestClassifier(n_estimators=n_trees, random_state=42)
+    model.fit(scaler.transform(train[test_data.columns]), train['Potability'])
+
+    start = time.perf_counter()
+    explainer = ForestExplainer(model, test_data.columns)
+    print(f"Precálculo: {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({explainer.node_contributions.shape[0]:,} nodos)\n")
+
+    print(f"{'Filas':>9} {'Total (ms)':>12} {'ms/fila':>10} {'Error máx':>11}")
+    for n_rows in sizes:
+        X = scaler.transform(test_data.generate_samples(n_rows, seed=n_rows)[test_data.columns])
+        explainer.explain(X[:1])  # calentamiento
+        start = time.perf_counter()
+        contributions = explainer.explain(X)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        error = np.abs(contributions.sum(axis=1) + explainer.bias - model.predict_proba(X)[:, 1]).max()
+        per_row = elapsed_ms / n_rows
+        flag = "" if per_row < TARGET_MS_PER_ROW else "  ❌ sobre el objetivo"
+        print(f"{n_rows:>9,} {elapsed_ms:>12.2f} {per_row:>10.4f} {error:>11.1e}{flag}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latencia de las explicaciones por muestra")
+    parser.add_argument("--sizes", default="1,100,10000,100000")
+    parser.add_argument("--trees", type=int, default=100)
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(",")], args.trees)
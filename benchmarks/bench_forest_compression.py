@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tamaño / accuracy / latencia de la variante comprimida para gateways (src/forest_compression.py)
+Entrena el bosque de referencia y genera variantes con distintas
+profundidades máximas y mínimos de árboles. Para cada una reporta tamaño
+en disco, nodos, accuracy y AUC sobre datos no vistos, y latencia de una
+muestra y de un lote, junto al pickle y al formato compacto sin comprimir.
+
+Uso: python benchmarks/bench_forest_compression.py [--depths 6,8,10,12] [--min-trees 10,20,30]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Añadir src al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.preprocessing import StandardScaler
+
+import compact_forest
+import forest_compression
+import test_data
+
+
+def latency_ms(model, X, repeat):
+    model.predict_proba(X)  # calentamiento
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.predict_proba(X)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def report(name, model, path, X, y, nodes):
+    proba = model.predict_proba(X)[:, list(model.classes_).index(1)]
+    accuracy = float(np.mean((proba > 0.5) == y))
+    print(f"{name:<22} {os.path.getsize(path) / 1024:>12,.1f} {nodes:>9,} {accuracy:>9.4f} "
+          f"{roc_auc_score(y, proba):>7.4f} {latency_ms(model, X[:1], 50):>12.3f} "
+          f"{latency_ms(model, X[:10_000], 3):>16.1f}")
+
+
+def run(depths, min_trees, n_trees):
+    train = test_data.generate_samples(3276, seed=7, with_target=True)
+    scaler = StandardScaler().fit(train[test_data.columns])
+    model = RandomForestClassifier(n_estimators=n_trees, random_state=42)
+    model.fit(scaler.transform(train[test_data.columns]), train['Potability'])
+
+    # Validación para elegir árboles (del tamaño del conjunto de prueba de model_train) y datos no vistos
+    validation = test_data.generate_samples(650, seed=21, with_target=True)
+    holdout = test_data.generate_samples(20_000, seed=22, with_target=True)
+    X_val, y_val = scaler.transform(validation[test_data.columns]), validation['Potability'].to_numpy()
+    X, y = scaler.transform(holdout[test_data.columns]), holdout['Potability'].to_numpy()
+
+    print(f"{'Variante':<22} {'Tamaño (KB)':>12} {'Nodos':>9} {'Accuracy':>9} {'AUC':>7} "
+          f"{'1 fila (ms)':>12} {'10k filas (ms)':>16}")
+    with tempfile.TemporaryDirectory(prefix="sipca-edge-") as workdir:
+        nodes = sum(e.tree_.node_count for e in model.estimators_)
+        pickle_path = os.path.join(workdir, 'model.pkl')
+        joblib.dump(model, pickle_path)
+        report("pickle", model, pickle_path, X, y, nodes)
+        compact_path = os.path.join(workdir, 'model.forest')
+        compact_forest.save(model, compact_path, test_data.columns)
+        report("compacto", compact_forest.load(compact_path), compact_path, X, y, nodes)
+
+        for depth in depths:
+            for minimum in min_trees:
+                path = os.path.join(workdir, f'edge_{depth}_{minimum}.forest')
+                start = time.perf_counter()
+                summary = forest_compression.save_compressed(model, path, X_val, y_val, test_data.columns,
+                                                             max_depth=depth, min_trees=minimum)
+                build_s = time.perf_counter() - start
+                name = f"prof {depth}, {summary['trees']} árboles"
+                report(name, compact_forest.load(path), path, X, y, summary['nodes'])
+        print(f"\n(compresión de cada variante: ~{build_s:.2f} s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tradeoff de la variante comprimida para gateways")
+    parser.add_argument("--depths", default="6,8,10,12")
+    parser.add_argument("--min-trees", default="10,20,30")
+    parser.add_argument("--trees", type=int, default=100, help="Árboles del bosque original")
+    args = parser.parse_args()
+    run([int(d) for d in args.depths.split(",")], [int(t) for t in args.min_trees.split(",")], args.trees)
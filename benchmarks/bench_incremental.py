@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Actualización incremental del modelo (model_train.train_incremental)
+Entrena un modelo sobre un almacén sintético (CSV y Parquet), aplica un
+archivo de resultados de laboratorio y lo vuelve a aplicar. Reporta el
+tiempo de cada actualización y verifica que la segunda no añada filas al
+almacén ni publique una versión nueva (las filas ya ingeridas se omiten
+aunque el CSV no reproduzca los floats hasta el último bit).
+
+Uso: python benchmarks/bench_incremental.py [--rows 3000] [--lab-rows 300]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+# Añadir src al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import artifacts
+import model_train
+import test_data
+
+
+def store_rows(path):
+    return len(model_train.load_store(path))
+
+
+def update(lab_path, store_path):
+    """(segundos, filas añadidas, versión publicada) de una actualización"""
+    before = store_rows(store_path)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model_train.train_incremental(lab_path)
+    elapsed = time.perf_counter() - start
+    return elapsed, store_rows(store_path) - before, artifacts.current_version(model_train.MODELS_DIR)
+
+
+def run(n_rows, lab_rows):
+    base = test_data.generate_samples(n_rows, seed=1, with_target=True)
+    lab = test_data.generate_samples(lab_rows, seed=2, with_target=True)
+
+    print(f"Almacén de {n_rows:,} filas, archivo de laboratorio de {lab_rows:,} filas aplicado dos veces\n")
+    print(f"{'Almacén':<9} {'1ª (s)':>7} {'Filas añadidas':>15} {'2ª (s)':>7} {'Filas añadidas':>15}")
+    for fmt in ('csv', 'parquet'):
+        with tempfile.TemporaryDirectory() as tmp:
+            model_train.MODELS_DIR = os.path.join(tmp, 'models')
+            store_path = os.path.join(tmp, f'store.{fmt}')
+            lab_path = os.path.join(tmp, 'lab.csv')
+            if fmt == 'csv':
+                base.to_csv(store_path, index=False)
+            else:
+                base.to_parquet(store_path, index=False)
+            lab.to_csv(lab_path, index=False)
+            with contextlib.redirect_stdout(io.StringIO()):
+                model_train.train(store_path)
+
+            first_s, first_rows, first_version = update(lab_path, store_path)
+            second_s, second_rows, second_version = update(lab_path, store_path)
+            print(f"{fmt:<9} {first_s:>7.2f} {first_rows:>15,} {second_s:>7.2f} {second_rows:>15,}")
+            if first_rows != lab_rows:
+                raise AssertionError(f"{fmt}: la primera actualización añadió {first_rows} filas (esperadas {lab_rows})")
+            if second_rows or second_version != first_version:
+                raise AssertionError(f"{fmt}: repetir la actualización añadió {second_rows} filas "
+                                     f"o publicó otra versión ({first_version} -> {second_version})")
+    print("\nRepetir el mismo archivo no añade filas ni publica una versión nueva.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Actualización incremental: tiempo e ingesta repetida")
+    parser.add_argument("--rows", type=int, default=3000, help="Filas del almacén de entrenamiento")
+    parser.add_argument("--lab-rows", type=int, default=300, help="Filas del archivo de laboratorio")
+    args = parser.parse_args()
+    run(args.rows, args.lab_rows)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Costo de la instrumentación de src/metrics.py por llamada
+Compara un bloque vacío, metrics.timer() desactivado y activado, y el tiempo
+de generar el texto de Prometheus con el registro poblado.
+
+Uso: python benchmarks/bench_metrics_overhead.py [--calls 200000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Añadir src al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import metrics
+
+
+def ns_per_call(fn, calls):
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter_ns() - start) / calls
+
+
+def baseline():
+    pass
+
+
+def instrumented():
+    with metrics.timer("predict", mode="sample"):
+        pass
+
+
+def run(calls):
+    empty = ns_per_call(baseline, calls)
+
+    metrics.ENABLED = False
+    disabled = ns_per_call(instrumented, calls)
+
+    metrics.ENABLED = True
+    enabled = ns_per_call(instrumented, calls)
+
+    start = time.perf_counter()
+    text = metrics.render_prometheus()
+    render_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{'Llamada vacía':<28} {empty:>8.0f} ns")
+    print(f"{'timer() desactivado':<28} {disabled:>8.0f} ns  (+{disabled - empty:.0f} ns)")
+    print(f"{'timer() activado':<28} {enabled:>8.0f} ns  (+{enabled - empty:.0f} ns)")
+    print(f"{'render_prometheus()':<28} {render_ms:>8.2f} ms  ({len(text.splitlines())} líneas)")
+    print(f"p50/p95/p99 (µs): " + ", ".join(
+        f"{q * 1e6:.2f}" for q in metrics.stage_quantiles("predict", mode="sample").values()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sobrecosto de la instrumentación")
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+    run(args.calls)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Latencia de OpenRouter con fallback secuencial vs. solicitudes cubiertas
+Usa el servidor stub con modelos degradados (lentos, 404, 429) para medir
+cuánto tarda cada modo en obtener una respuesta válida y cómo la
+puntuación de salud reordena los modelos entre solicitudes.
+
+Uso: python benchmarks/bench_openrouter_hedging.py [--requests 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Añadir src y benchmarks al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from stub_llm_server import start_stub_server
+
+
+def run(n_requests):
+    import chatbot_llm
+
+    models = chatbot_llm.OPENROUTER_FALLBACK_MODELS
+    # Primer modelo muy lento, segundo con rate limit, tercero inexistente, resto sanos
+    behaviors = {
+        models[0]: {"delay": 4.0},
+        models[1]: {"status": 429},
+        models[2]: {"status": 404},
+        models[3]: {"delay": 0.8},
+    }
+    server, base_url = start_stub_server(first_token_delay=0.05, token_delay=0.0, model_behaviors=behaviors)
+    chatbot_llm.OPENROUTER_API_URL = f"{base_url}/v1/chat/completions"
+    os.environ["OPENROUTER_API_KEY"] = "stub-key"
+
+    try:
+        for hedge in (False, True):
+            # Cliente nuevo por modo: sin historial de salud previo
+            chatbot_llm._openrouter_requester = None
+            bot = chatbot_llm.ChatbotLLM(provider="openrouter", hedge_openrouter=hedge)
+            print(f"\nModo {'cubierto' if hedge else 'secuencial'}:")
+            for i in range(1, n_requests + 1):
+                start = time.perf_counter()
+                bot.get_response_openrouter("¿Cuál es el rango seguro de pH?")
+                elapsed = time.perf_counter() - start
+                order = chatbot_llm.get_openrouter_requester().tracker.ordered(models)
+                print(f"  Solicitud {i}: {elapsed:6.2f}s | orden siguiente: {', '.join(m.split('/')[0] for m in order[:3])}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fallback secuencial vs. solicitudes cubiertas")
+    parser.add_argument("--requests", type=int, default=5)
+    args = parser.parse_args()
+    run(args.requests)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Latencia de una solicitud de predicción individual ("Analizar Muestra")
+Compara, para una muestra de los sliders (DataFrame de una fila, escalado
+y modelo), lo que hacía el dashboard original contra la API única de
+src/risk.py:
+- antes: predict + predict_proba + predict otra vez (tres recorridos del bosque)
+- predict + predict_proba (dos recorridos)
+- risk.predict_scores: etiqueta, P(potable) y confianza de un solo predict_proba
+La misma comparación se repite con el formato compacto (compact_forest.py).
+Reporta mediana y p95 por solicitud y verifica que las tres variantes den
+la misma etiqueta y confianza.
+
+Uso: python benchmarks/bench_single_prediction.py [--trees 100] [--requests 300]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Añadir src al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+import compact_forest
+import risk
+import test_data
+
+
+def before(model, X):
+    """Manejador original de "Analizar Muestra" """
+    prediction = model.predict(X)[0]
+    proba = model.predict_proba(X)[0]
+    confidence = proba[prediction] * 100
+    prediction = model.predict(X)[0]
+    return int(prediction), float(confidence)
+
+
+def two_calls(model, X):
+    prediction = model.predict(X)[0]
+    return int(prediction), float(model.predict_proba(X)[0][prediction] * 100)
+
+
+def unified(model, X):
+    prediction, _, confidence = risk.predict_scores(model, X)
+    return int(prediction[0]), float(confidence[0])
+
+
+VARIANTS = [
+    ("antes: predict + proba + predict", before),
+    ("predict + predict_proba", two_calls),
+    ("risk.predict_scores", unified),
+]
+
+
+def time_requests(fn, model, scaler, samples):
+    """ms por solicitud (escalado incluido) y los resultados"""
+    times, results = [], []
+    for values in samples:
+        start = time.perf_counter()
+        X = scaler.transform(pd.DataFrame([values], columns=test_data.columns))
+        results.append(fn(model, X))
+        times.append((time.perf_counter() - start) * 1000)
+    return np.array(times), results
+
+
+def run(n_trees, n_requests):
+    train = test_data.generate_samples(3276, seed=7, with_target=True)
+    scaler = StandardScaler().fit(train[test_data.columns])
+    forest = RandomForestClassifier(n_estimators=n_trees, random_state=42)
+    forest.fit(scaler.transform(train[test_data.columns]), train['Potability'])
+    samples = test_data.generate_samples(n_requests, seed=11).to_numpy().tolist()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.forest')
+        compact_forest.save(forest, path, test_data.columns)
+        models = [("sklearn", forest), ("compacto", compact_forest.load(path))]
+
+        print(f"{n_requests} solicitudes de una muestra, bosque de {n_trees} árboles\n")
+        print(f"{'Modelo':<10} {'Variante':<34} {'Mediana (ms)':>13} {'p95 (ms)':>9} {'Aceleración':>12}")
+        for name, model in models:
+            unified(model, scaler.transform(pd.DataFrame([samples[0]], columns=test_data.columns)))  # calentamiento
+            baseline, reference = None, None
+            for label, fn in VARIANTS:
+                times, results = time_requests(fn, model, scaler, samples)
+                median = float(np.median(times))
+                baseline = baseline or median
+                if reference is None:
+                    reference = results
+                elif [p for p, _ in results] != [p for p, _ in reference] or \
+                        not np.allclose([c for _, c in results], [c for _, c in reference]):
+                    raise AssertionError(f"{label} no coincide con el manejador original ({name})")
+                print(f"{name:<10} {label:<34} {median:>13.2f} {np.percentile(times, 95):>9.2f} "
+                      f"{baseline / median:>11.1f}x")
+    print("\nLas tres variantes dan la misma etiqueta y confianza en todas las solicitudes.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latencia de una predicción individual: tres llamadas vs una")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+    run(args.trees, args.requests)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Prueba de streaming del chatbot contra el servidor stub local
+Para cada proveedor compara el tiempo hasta el primer token (streaming)
+con la latencia de la respuesta completa (chat() sin streaming) y verifica
+que el texto recibido por fragmentos sea idéntico.
+
+Uso: python benchmarks/bench_streaming.py [--first-token-delay 0.3] [--token-delay 0.02]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Añadir src y benchmarks al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from stub_llm_server import STUB_RESPONSE, start_stub_server
+
+PROVIDERS = ["openai", "google", "anthropic", "openrouter"]
+
+
+def configure_env(base_url):
+    """Apunta todos los proveedores al stub (debe hacerse antes de importar chatbot_llm)"""
+    os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+    os.environ["OPENROUTER_BASE_URL"] = f"{base_url}/v1"
+    os.environ["ANTHROPIC_BASE_URL"] = base_url
+    os.environ["GOOGLE_GEMINI_BASE_URL"] = base_url
+    for var in ("OPENAI_API_KEY", "GOOGLE_API_KEY", "ANTHROPIC_API_KEY", "OPENROUTER_API_KEY"):
+        os.environ[var] = "stub-key"
+
+
+def run(first_token_delay, token_delay):
+    server, base_url = start_stub_server(first_token_delay=first_token_delay, token_delay=token_delay)
+    configure_env(base_url)
+    from chatbot_llm import ChatbotLLM
+
+    print(f"Stub en {base_url} | retardo primer token {first_token_delay}s, entre tokens {token_delay}s\n")
+    print(f"{'Proveedor':<12} {'Completa (s)':>13} {'TTFT stream (s)':>16} {'Total stream (s)':>17}  Texto")
+
+    failures = 0
+    try:
+        for provider in PROVIDERS:
+            bot = ChatbotLLM(provider=provider)
+
+            start = time.perf_counter()
+            bot.chat("¿Cuál es el rango seguro de pH?")
+            blocking = time.perf_counter() - start
+
+            streamed = "".join(bot.chat_stream("¿Cuál es el rango seguro de pH?"))
+            stats = bot.ttft_log[-1]
+            ok = streamed.strip() == STUB_RESPONSE.strip()
+            failures += not ok
+            ttft = f"{stats['ttft_s']:.3f}" if stats["ttft_s"] is not None else "-"
+            print(f"{provider:<12} {blocking:>13.3f} {ttft:>16} {stats['total_s']:>17.3f}  "
+                  f"{'OK' if ok else 'DIFERENTE: ' + streamed[:60]}")
+    finally:
+        server.shutdown()
+
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming del chatbot contra un stub local")
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    sys.exit(1 if run(args.first_token_delay, args.token_delay) else 0)
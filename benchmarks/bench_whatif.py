@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Movimiento de sliders: predicción directa vs motor what-if (src/whatif.py)
+Simula a un operador que arrastra cada slider por todo su rango y compara
+el tiempo por paso al re-escalar y re-predecir contra leer las curvas
+cacheadas. También reporta el costo del barrido inicial.
+
+Uso: python benchmarks/bench_whatif.py [--steps 40]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Añadir src al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+import test_data
+from whatif import WhatIfEngine
+
+# Rango y paso de los sliders del dashboard
+SLIDER_SPECS = {
+    'ph': (0.0, 14.0, 0.1),
+    'Hardness': (50.0, 350.0, 1.0),
+    'Solids': (300.0, 60000.0, 100.0),
+    'Chloramines': (0.0, 14.0, 0.1),
+    'Sulfate': (100.0, 500.0, 1.0),
+    'Conductivity': (100.0, 800.0, 1.0),
+    'Organic_carbon': (0.0, 30.0, 0.1),
+    'Trihalomethanes': (0.0, 125.0, 0.1),
+    'Turbidity': (1.0, 7.0, 0.1),
+}
+DEFAULT_SAMPLE = [7.0, 196.0, 22000.0, 7.1, 333.0, 420.0, 14.5, 66.0, 3.9]
+
+
+def drag_path(steps):
+    """Secuencia de muestras: cada slider recorre su rango mientras los demás quedan fijos"""
+    path = []
+    for f, (low, high, step) in enumerate(SLIDER_SPECS.values()):
+        for value in np.linspace(low, high, steps):
+            sample = list(DEFAULT_SAMPLE)
+            sample[f] = round(round((value - low) / step) * step + low, 6)
+            path.append(sample)
+    return path
+
+
+def run(steps):
+    train = test_data.generate_samples(3276, seed=7, with_target=True)
+    scaler = StandardScaler().fit(train[test_data.columns])
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model.fit(scaler.transform(train[test_data.columns]), train['Potability'])
+    path = drag_path(steps)
+
+    start = time.perf_counter()
+    direct = [model.predict_proba(scaler.transform(pd.DataFrame([s], columns=test_data.columns)))[0, 1]
+              for s in path]
+    direct_ms = (time.perf_counter() - start) * 1000
+
+    engine = WhatIfEngine(model, scaler, SLIDER_SPECS)
+    start = time.perf_counter()
+    engine.sweep(DEFAULT_SAMPLE)
+    sweep_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    cached = [engine.probability(s) for s in path]
+    cached_ms = (time.perf_counter() - start) * 1000
+
+    mismatches = int(np.sum(np.abs(np.array(direct) - np.array(cached)) > 1e-9))
+    print(f"Pasos de slider simulados: {len(path)}")
+    print(f"Barrido inicial ({sum(len(g) for g in engine.grids)} filas): {sweep_ms:.1f} ms")
+    print(f"Predicción directa:  {direct_ms / len(path):8.3f} ms/paso")
+    print(f"Motor what-if:       {cached_ms / len(path):8.3f} ms/paso "
+          f"(aciertos {engine.hits}, barridos {engine.misses})")
+    print(f"Diferencias con la predicción directa: {mismatches}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predicción directa vs motor what-if")
+    parser.add_argument("--steps", type=int, default=40, help="Posiciones por slider")
+    args = parser.parse_args()
+    run(args.steps)
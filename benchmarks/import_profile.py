@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Reporte del costo de importación por módulo (arranque en frío)
+Importa cada módulo en un proceso nuevo con `python -X importtime`, suma el
+tiempo acumulado de sus importaciones de primer nivel y guarda el resultado
+en benchmarks/results/import_times.jsonl para seguir la evolución entre commits.
+
+Uso: python benchmarks/import_profile.py [--repeat 3] [--no-save] [modulo ...]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_FILE = os.path.join(ROOT_DIR, 'benchmarks', 'results', 'import_times.jsonl')
+
+# Módulos que app.py importa al arrancar y SDKs que deberían cargarse bajo demanda
+DEFAULT_MODULES = [
+    "src.chatbot_llm",
+    "src.vision_module",
+    "src.telegram_bot",
+    "streamlit",
+    "pandas",
+    "plotly.graph_objects",
+    "joblib",
+    "sklearn.ensemble",
+    "openai",
+    "google.genai",
+    "anthropic",
+    "telegram.ext",
+]
+
+# Paquetes que solo deberían importarse al usar su proveedor o pestaña
+HEAVY_PACKAGES = {"openai", "google.genai", "anthropic", "telegram", "plotly", "sklearn"}
+
+# Formato de -X importtime: "import time: self [us] | cumulative | imported package"
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module):
+    """Tiempo (ms) de importar `module` en frío y dependencias pesadas que arrastra"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT_DIR, os.path.join(ROOT_DIR, 'src')]))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=ROOT_DIR, env=env
+    )
+    if proc.returncode != 0:
+        return None, {}
+
+    total_us = 0
+    heavy = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        # Sangría de 1 espacio = importación de primer nivel del proceso
+        if indent == 1:
+            total_us += cumulative
+        if name in HEAVY_PACKAGES and cumulative >= 5000:
+            heavy[name] = round(cumulative / 1000, 1)
+    return total_us / 1000, heavy
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=ROOT_DIR).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def last_record():
+    if not os.path.exists(RESULTS_FILE):
+        return None
+    with open(RESULTS_FILE, encoding="utf-8") as f:
+        lines = [line for line in f if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+
+def run(modules, repeat, save):
+    previous = last_record()
+    record = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "modules": {},
+    }
+
+    print(f"{'Módulo':<24} {'Mediana (ms)':>13} {'Anterior':>10}  SDKs pesados arrastrados")
+    for module in modules:
+        samples, heavy = [], {}
+        for _ in range(repeat):
+            elapsed, heavy = measure(module)
+            if elapsed is None:
+                break
+            samples.append(elapsed)
+        if not samples:
+            print(f"{module:<24} {'no instalado':>13}")
+            continue
+
+        median = round(statistics.median(samples), 1)
+        record["modules"][module] = {"median_ms": median, "heavy_imports_ms": heavy}
+        before = (previous or {}).get("modules", {}).get(module, {}).get("median_ms")
+        before_text = f"{before:.1f}" if before is not None else "-"
+        dragged = ", ".join(f"{k} {v:.0f}ms" for k, v in heavy.items() if not module.startswith(k))
+        print(f"{module:<24} {median:>13.1f} {before_text:>10}  {dragged}")
+
+    if save:
+        os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+        with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"\n-> Resultado añadido a {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Costo de importación por módulo")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por módulo (se usa la mediana)")
+    parser.add_argument("--no-save", action="store_true", help="No guardar en el historial")
+    args = parser.parse_args()
+
+    run(args.modules, args.repeat, save=not args.no_save)
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks de las rutas críticas: predicción, visión y alertas
+Genera datasets sintéticos (esquema de src/test_data.py) de 1 a 10M filas y mide:
+- preprocessing.load_data y preprocessing.scale_data
+- predict_proba de una muestra y por lotes, y el tiempo de carga del modelo
+- post-procesamiento de visión con un cliente OpenAI simulado
+- envío de alertas de Telegram contra el servidor stub local
+
+Los resultados se añaden a benchmarks/results/benchmarks.jsonl y se comparan
+con la última ejecución de la misma máquina usando benchmarks/thresholds.json.
+
+Uso: python benchmarks/run_benchmarks.py [--sizes 1,1000,100000] [--repeat 3] [--check] [--no-save]
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+# Añadir src y benchmarks al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from stub_llm_server import start_stub_server
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_FILE = os.path.join(ROOT_DIR, 'benchmarks', 'results', 'benchmarks.jsonl')
+THRESHOLDS_FILE = os.path.join(ROOT_DIR, 'benchmarks', 'thresholds.json')
+
+DEFAULT_SIZES = [1, 1_000, 100_000, 1_000_000, 10_000_000]
+# A partir de este tamaño cada medición se hace una sola vez
+LARGE_DATASET_ROWS = 1_000_000
+# Filas usadas para entrenar el modelo de referencia cuando no se indica uno
+TRAIN_ROWS = 10_000
+
+# Respuesta simulada de la API de visión (con bloque markdown, como devuelve a veces el modelo)
+VISION_RESPONSE = "```json\n" + json.dumps({
+    "turbidity_ntu": 7.4,
+    "confidence_score": 82,
+    "visual_observations": {
+        "clarity": "Ligeramente turbia con neblina visible a contraluz",
+        "color_tint": "amarillento",
+        "visible_particles": "pocas",
+        "light_transmission": "buena",
+    },
+    "quality_indicators": {
+        "suspended_solids": "medio",
+        "sediment_presence": "mínimo",
+        "organic_matter": "posiblemente presente",
+    },
+    "treatment_recommendations": [
+        "Aplicar filtración rápida en arena antes de la desinfección",
+        "Revisar dosificación de coagulante en el floculador",
+    ],
+    "potential_causes": ["Arrastre de sedimentos por lluvias", "Floculación incompleta"],
+    "image_quality_notes": "Iluminación adecuada, enfoque correcto, leve reflejo en el borde del recipiente",
+}, ensure_ascii=False) + "\n```"
+
+
+def time_call(fn, repeat):
+    """Mediana (ms) de `repeat` ejecuciones de fn y el resultado de la última"""
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def fake_vision_client(content):
+    """Objeto con la forma de OpenAI().chat.completions.create que devuelve `content`"""
+    response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: response)))
+
+
+def build_model(workdir, model_path=None, scaler_path=None):
+    """Usa el modelo indicado o entrena uno de referencia como en model_train.py"""
+    if model_path and scaler_path:
+        return model_path, scaler_path
+
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+    import preprocessing as prep
+    import test_data
+
+    df = test_data.generate_samples(TRAIN_ROWS, seed=7, with_target=True)
+    scaler_path = os.path.join(workdir, 'scaler.pkl')
+    model_path = os.path.join(workdir, 'model.pkl')
+    with contextlib.redirect_stdout(io.StringIO()):
+        X_scaled = prep.train_save_scaler(df[test_data.columns], output_path=scaler_path)
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model.fit(X_scaled, df['Potability'])
+    joblib.dump(model, model_path)
+    return model_path, scaler_path
+
+
+def run_suite(sizes, repeat, model_path=None, scaler_path=None):
+    import joblib
+    import preprocessing as prep
+    import telegram_bot
+    import test_data
+    import vision_module
+
+    results = {}
+
+    def record(name, ms, rows=None):
+        entry = {"median_ms": round(ms, 3)}
+        if rows:
+            entry["rows_per_s"] = round(rows / (ms / 1000)) if ms > 0 else None
+        results[name] = entry
+        throughput = f"{entry['rows_per_s']:>14,} filas/s" if rows else ""
+        print(f"  {name:<34} {ms:>11.2f} ms {throughput}")
+
+    with tempfile.TemporaryDirectory(prefix="sipca-bench-") as workdir:
+        print("Preparando modelo de referencia...")
+        model_path, scaler_path = build_model(workdir, model_path, scaler_path)
+
+        print("\nModelo")
+        ms, model = time_call(lambda: joblib.load(model_path), repeat)
+        record("model_load", ms)
+        single = prep.scale_data(test_data.generate_samples(1, seed=1), scaler_path=scaler_path)
+        ms, _ = time_call(lambda: model.predict_proba(single), repeat * 10)
+        record("predict_proba_single", ms)
+
+        for n_rows in sizes:
+            runs = repeat if n_rows < LARGE_DATASET_ROWS else 1
+            print(f"\nDataset de {n_rows:,} filas")
+            csv_path = os.path.join(workdir, f"samples_{n_rows}.csv")
+            test_data.generate_samples(n_rows, seed=n_rows, with_target=True).to_csv(csv_path, index=False)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                ms, df = time_call(lambda: prep.load_data(csv_path), runs)
+            record(f"load_data[{n_rows}]", ms, n_rows)
+
+            X = df[test_data.columns]
+            ms, X_scaled = time_call(lambda: prep.scale_data(X, scaler_path=scaler_path), runs)
+            record(f"scale_data[{n_rows}]", ms, n_rows)
+
+            ms, _ = time_call(lambda: model.predict_proba(X_scaled), runs)
+            record(f"predict_proba_batch[{n_rows}]", ms, n_rows)
+
+            del df, X, X_scaled
+            os.remove(csv_path)
+
+    print("\nVisión (cliente simulado)")
+    os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+    previous_client = vision_module._client
+    vision_module._client = fake_vision_client(VISION_RESPONSE)
+    image_bytes = os.urandom(512 * 1024)
+    try:
+        ms, analysis = time_call(lambda: vision_module.analyze_water_turbidity(image_bytes), repeat * 10)
+    finally:
+        vision_module._client = previous_client
+    if analysis.get('error'):
+        raise RuntimeError(f"El post-procesamiento de visión falló: {analysis['message']}")
+    record("vision_postprocess", ms)
+
+    print("\nAlertas (servidor Telegram stub)")
+    server, base_url = start_stub_server(first_token_delay=0.0, token_delay=0.0)
+    previous = telegram_bot.TOKEN, telegram_bot.TELEGRAM_API_URL
+    telegram_bot.TOKEN, telegram_bot.TELEGRAM_API_URL = "stub-token", base_url
+    try:
+        ms, (ok, status) = time_call(
+            lambda: telegram_bot.send_telegram_alert("🚨 *ALERTA DE CALIDAD DE AGUA*", 12345), repeat * 10)
+    finally:
+        telegram_bot.TOKEN, telegram_bot.TELEGRAM_API_URL = previous
+        server.shutdown()
+    if not ok:
+        raise RuntimeError(f"El envío de alertas falló: {status}")
+    record("alert_dispatch", ms)
+
+    return results
+
+
+def load_thresholds():
+    with open(THRESHOLDS_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def threshold_for(name, thresholds):
+    """Umbral del benchmark: se busca por nombre sin el tamaño (load_data[1000] -> load_data)"""
+    base = name.split("[")[0]
+    return {**thresholds["default"], **thresholds.get("benchmarks", {}).get(base, {})}
+
+
+def previous_record(host):
+    """Última ejecución guardada en la misma máquina (los tiempos no son comparables entre máquinas)"""
+    if not os.path.exists(RESULTS_FILE):
+        return None
+    with open(RESULTS_FILE, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    same_host = [r for r in records if r.get("host") == host]
+    return same_host[-1] if same_host else None
+
+
+def find_regressions(results, previous, thresholds):
+    regressions = []
+    for name, entry in results.items():
+        before = (previous or {}).get("results", {}).get(name, {}).get("median_ms")
+        if not before:
+            continue
+        limit = threshold_for(name, thresholds)
+        now = entry["median_ms"]
+        slowdown_pct = (now - before) / before * 100
+        if slowdown_pct > limit["max_slowdown_pct"] and now - before > limit["min_delta_ms"]:
+            regressions.append((name, before, now, slowdown_pct))
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=ROOT_DIR).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de predicción, visión y alertas")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Tamaños de dataset separados por comas")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición (se usa la mediana)")
+    parser.add_argument("--model", help="Modelo .pkl a usar (por defecto se entrena uno sintético)")
+    parser.add_argument("--scaler", help="Escalador .pkl que acompaña a --model")
+    parser.add_argument("--check", action="store_true", help="Salir con código 1 si hay regresiones")
+    parser.add_argument("--no-save", action="store_true", help="No guardar en el historial")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    host = platform.node()
+    results = run_suite(sizes, args.repeat, args.model, args.scaler)
+
+    previous = previous_record(host)
+    regressions = find_regressions(results, previous, load_thresholds())
+    if previous is None:
+        print("\nSin ejecución previa en esta máquina: no hay con qué comparar.")
+    elif regressions:
+        print(f"\n❌ Regresiones respecto a {previous.get('commit') or previous['timestamp']}:")
+        for name, before, now, pct in regressions:
+            print(f"  {name:<34} {before:>10.2f} -> {now:>10.2f} ms (+{pct:.0f}%)")
+    else:
+        print(f"\n✅ Sin regresiones respecto a {previous.get('commit') or previous['timestamp']}.")
+
+    if not args.no_save:
+        record = {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "host": host,
+            "python": sys.version.split()[0],
+            "sizes": sizes,
+            "results": results,
+        }
+        os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+        with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"-> Resultado añadido a {RESULTS_FILE}")
+
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita las APIs de streaming de los proveedores LLM
+Permite probar ChatbotLLM.chat_stream sin red ni API keys reales.
+
+Rutas soportadas:
+- POST /chat/completions, /v1/chat/completions  -> OpenAI / OpenRouter (SSE "data: {...}")
+- POST /v1/messages                             -> Anthropic (eventos SSE tipados)
+- POST /v1beta/models/<modelo>:streamGenerateContent -> Google Gemini (SSE)
+- POST /v1beta/models/<modelo>:generateContent       -> Google Gemini (sin streaming)
+- POST /bot<token>/sendMessage                  -> Telegram Bot API (alertas)
+
+Uso: python benchmarks/stub_llm_server.py [--port 8765] [--first-token-delay 0.3] [--token-delay 0.02]
+
+Para apuntar el chatbot al stub:
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+    OPENROUTER_BASE_URL=http://127.0.0.1:8765/v1
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765
+    GOOGLE_GEMINI_BASE_URL=http://127.0.0.1:8765
+    TELEGRAM_API_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_RESPONSE = (
+    "El rango seguro de pH para agua potable es de 6.5 a 8.5 según la OMS. "
+    "Valores fuera de ese rango requieren ajuste químico antes de la distribución."
+)
+
+
+def _tokens(text):
+    """Divide el texto en fragmentos tipo token (palabra + espacio)"""
+    words = text.split(" ")
+    return [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)]
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """Responde con un texto fijo, emitido token a token con retardos configurables"""
+
+    first_token_delay = 0.3
+    token_delay = 0.02
+    response_text = STUB_RESPONSE
+    # Comportamiento por modelo (OpenAI/OpenRouter): {"modelo": {"delay": s, "status": código}}
+    model_behaviors = {}
+
+    def log_message(self, format, *args):
+        # Silenciar el log por solicitud del servidor HTTP
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.split("?")[0]
+
+        if path.endswith("/chat/completions"):
+            behavior = self.model_behaviors.get(body.get("model"), {})
+            time.sleep(behavior.get("delay", 0))
+            if behavior.get("status", 200) != 200:
+                self.send_response(behavior["status"])
+                self.send_header("Retry-After", "5")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif body.get("stream"):
+                self._stream_openai(body)
+            else:
+                self._send_json({
+                    "id": "stub", "object": "chat.completion", "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": self.response_text}}],
+                })
+        elif path.endswith("/messages"):
+            if body.get("stream"):
+                self._stream_anthropic(body)
+            else:
+                self._send_json({
+                    "id": "msg_stub", "type": "message", "role": "assistant",
+                    "model": body.get("model", "stub"),
+                    "content": [{"type": "text", "text": self.response_text}],
+                    "stop_reason": "end_turn", "stop_sequence": None,
+                    "usage": {"input_tokens": 1, "output_tokens": 1},
+                })
+        elif path.endswith(":streamGenerateContent"):
+            self._stream_gemini()
+        elif path.endswith(":generateContent"):
+            self._send_json(self._gemini_chunk(self.response_text))
+        elif path.endswith("/sendMessage"):
+            self._send_json({"ok": True, "result": {"message_id": 1, "chat": {"id": body.get("chat_id")},
+                                                    "text": body.get("text", "")}})
+        else:
+            self.send_error(404)
+
+    # ------------------------------------------------------------------
+    def _send_json(self, payload):
+        data = json.dumps(payload).encode("utf-8")
+        time.sleep(self.first_token_delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_sse(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+    def _write_event(self, data, event=None):
+        chunk = ""
+        if event:
+            chunk += f"event: {event}\n"
+        chunk += f"data: {data if isinstance(data, str) else json.dumps(data)}\n\n"
+        self.wfile.write(chunk.encode("utf-8"))
+        self.wfile.flush()
+
+    def _emit_tokens(self, make_event):
+        time.sleep(self.first_token_delay)
+        for i, token in enumerate(_tokens(self.response_text)):
+            if i:
+                time.sleep(self.token_delay)
+            make_event(token)
+
+    def _stream_openai(self, body):
+        self._start_sse()
+        # Comentario keep-alive como los que envía OpenRouter
+        self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+        model = body.get("model", "stub")
+
+        def event(token):
+            self._write_event({
+                "id": "stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            })
+
+        self._emit_tokens(event)
+        self._write_event("[DONE]")
+
+    def _stream_anthropic(self, body):
+        self._start_sse()
+        self._write_event({
+            "type": "message_start",
+            "message": {
+                "id": "msg_stub", "type": "message", "role": "assistant",
+                "model": body.get("model", "stub"), "content": [],
+                "stop_reason": None, "stop_sequence": None,
+                "usage": {"input_tokens": 1, "output_tokens": 0},
+            },
+        }, event="message_start")
+        self._write_event({"type": "content_block_start", "index": 0,
+                           "content_block": {"type": "text", "text": ""}}, event="content_block_start")
+        self._emit_tokens(lambda token: self._write_event(
+            {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}},
+            event="content_block_delta"))
+        self._write_event({"type": "content_block_stop", "index": 0}, event="content_block_stop")
+        self._write_event({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                           "usage": {"output_tokens": 1}}, event="message_delta")
+        self._write_event({"type": "message_stop"}, event="message_stop")
+
+    @staticmethod
+    def _gemini_chunk(text):
+        return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}]}
+
+    def _stream_gemini(self):
+        self._start_sse()
+        self._emit_tokens(lambda token: self._write_event(self._gemini_chunk(token)))
+
+
+def start_stub_server(port=0, first_token_delay=0.3, token_delay=0.02, model_behaviors=None):
+    """
+    Inicia el servidor en un hilo en segundo plano
+
+    Returns:
+        (server, base_url): el servidor (usar server.shutdown() al terminar) y su URL base
+    """
+    handler = type("ConfiguredStubHandler", (StubLLMHandler,), {
+        "first_token_delay": first_token_delay,
+        "token_delay": token_delay,
+        "model_behaviors": model_behaviors or {},
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor stub de APIs LLM con streaming")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.port, args.first_token_delay, args.token_delay)
+    print(f"Servidor stub escuchando en {base_url} (Ctrl+C para salir)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
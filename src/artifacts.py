@@ -0,0 +1,223 @@
+"""
+Artefactos del modelo versionados
+Cada entrenamiento publica un directorio inmutable models/versions/<versión>/
+con el modelo, el escalador, los metadatos y la referencia de deriva. El
+archivo models/CURRENT indica la versión activa y se reemplaza con
+os.replace, de modo que un lector siempre ve una versión completa.
+
+ArtifactWatcher mantiene en memoria la versión activa: un hilo revisa
+CURRENT cada pocos segundos, carga la versión nueva por completo y recién
+entonces la intercambia. Las solicitudes en curso terminan con la versión
+que ya tenían; las siguientes usan la nueva.
+
+Instalaciones anteriores (archivos sueltos en models/, sin CURRENT) se
+siguen leyendo como la versión "legacy".
+"""
+
+import datetime
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+import joblib
+
+import compact_forest
+import metrics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, '../models')
+VERSIONS_DIR = 'versions'
+CURRENT_FILE = 'CURRENT'
+LEGACY_VERSION = 'legacy'
+
+MODEL_FILE = 'water_potability_model.pkl'
+# Mismo modelo en formato compacto (memmap): es el que carga el dashboard si existe
+COMPACT_MODEL_FILE = 'water_potability_model.forest'
+# Variante podada y cuantizada para gateways con poca memoria (forest_compression)
+EDGE_MODEL_FILE = 'water_potability_model.edge.forest'
+SCALER_FILE = 'scaler.pkl'
+METADATA_FILE = 'model_metadata.json'
+DRIFT_REFERENCE_FILE = 'drift_reference.json'
+
+# Versiones publicadas que se conservan en disco (la activa nunca se borra)
+KEEP_VERSIONS = 5
+# Cada cuánto el dashboard revisa si hay una versión nueva
+POLL_SECONDS = float(os.getenv('SIPCA_MODEL_POLL_SECONDS', '5'))
+# "compact" (por defecto) usa el .forest si la versión lo incluye, "edge" la variante
+# comprimida y "pickle" fuerza joblib
+MODEL_FORMAT = os.getenv('SIPCA_MODEL_FORMAT', 'compact')
+
+
+# ---------------------------------------------------------
+# Publicación
+# ---------------------------------------------------------
+def new_version_id() -> str:
+    """Identificador ordenable por fecha: 20250101-120000-123456-ab"""
+    return f"{datetime.datetime.now():%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:2]}"
+
+
+def stage_version(models_dir: str = MODELS_DIR) -> str:
+    """Crea un directorio temporal (oculto para los lectores) donde escribir una versión nueva"""
+    staging = os.path.join(models_dir, VERSIONS_DIR, f".tmp-{new_version_id()}")
+    os.makedirs(staging)
+    return staging
+
+
+def write_json(data: Dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def _write_current(version: str, models_dir: str):
+    tmp = os.path.join(models_dir, f".{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(models_dir, CURRENT_FILE))
+
+
+def publish_version(staging: str, models_dir: str = MODELS_DIR, keep: int = KEEP_VERSIONS) -> str:
+    """
+    Publica un directorio preparado con stage_version:
+    1. Lo renombra a versions/<versión> (el directorio ya está completo)
+    2. Apunta CURRENT a esa versión (os.replace, atómico)
+    3. Borra las versiones más antiguas que excedan `keep`
+
+    Returns:
+        El identificador de la versión publicada
+    """
+    version = os.path.basename(staging).removeprefix('.tmp-')
+    final = os.path.join(models_dir, VERSIONS_DIR, version)
+    os.replace(staging, final)
+    _write_current(version, models_dir)
+    prune_versions(models_dir, keep)
+    return version
+
+
+def prune_versions(models_dir: str = MODELS_DIR, keep: int = KEEP_VERSIONS):
+    root = os.path.join(models_dir, VERSIONS_DIR)
+    active = current_version(models_dir)
+    versions = sorted(v for v in os.listdir(root) if not v.startswith('.'))
+    for version in versions[:max(0, len(versions) - keep)]:
+        if version != active:
+            shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+# ---------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------
+def current_version(models_dir: str = MODELS_DIR) -> Optional[str]:
+    """Versión activa según CURRENT, o None si aún no se ha publicado ninguna"""
+    try:
+        with open(os.path.join(models_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def artifact_path(name: str, version: Optional[str] = None, models_dir: str = MODELS_DIR) -> str:
+    """
+    Ruta de un artefacto de la versión indicada (por defecto la activa).
+    Sin versiones publicadas se usa el archivo suelto en models/.
+    """
+    version = version or current_version(models_dir) or LEGACY_VERSION
+    if version == LEGACY_VERSION:
+        return os.path.join(models_dir, name)
+    return os.path.join(models_dir, VERSIONS_DIR, version, name)
+
+
+class ModelBundle:
+    """Modelo y escalador de una misma versión, cargados juntos"""
+
+    __slots__ = ('version', 'model', 'scaler', 'model_format', 'loaded_at')
+
+    def __init__(self, version: str, model, scaler, model_format: str = 'pickle'):
+        self.version = version
+        self.model = model
+        self.scaler = scaler
+        self.model_format = model_format
+        self.loaded_at = time.time()
+
+
+def load_model(version: Optional[str] = None, models_dir: str = MODELS_DIR, model_format: str = MODEL_FORMAT):
+    """(modelo, formato): el formato pedido si la versión lo incluye; si no, el siguiente hasta el pickle"""
+    fallbacks = {'edge': ['edge', 'compact'], 'compact': ['compact']}.get(model_format, [])
+    files = {'edge': EDGE_MODEL_FILE, 'compact': COMPACT_MODEL_FILE}
+    for fmt in fallbacks:
+        path = artifact_path(files[fmt], version, models_dir)
+        if os.path.exists(path):
+            return compact_forest.load(path), fmt
+    return joblib.load(artifact_path(MODEL_FILE, version, models_dir)), 'pickle'
+
+
+def load_bundle(version: str, models_dir: str = MODELS_DIR) -> ModelBundle:
+    with metrics.timer("model_load"):
+        model, model_format = load_model(version, models_dir)
+        scaler = joblib.load(artifact_path(SCALER_FILE, version, models_dir))
+    return ModelBundle(version, model, scaler, model_format)
+
+
+class ArtifactWatcher:
+    """
+    Versión activa del modelo en memoria, actualizada en segundo plano
+
+    current() es una lectura de atributo: el intercambio de versión es atómico
+    para los lectores y nunca bloquea una predicción mientras se carga la nueva.
+    """
+
+    def __init__(self, models_dir: str = MODELS_DIR, poll_seconds: float = POLL_SECONDS):
+        self.models_dir = models_dir
+        self.poll_seconds = poll_seconds
+        self.last_error: Optional[str] = None
+        self._bundle: Optional[ModelBundle] = None
+        self._failed_version: Optional[str] = None
+        self._lock = threading.Lock()  # una sola carga a la vez
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def current(self) -> Optional[ModelBundle]:
+        return self._bundle
+
+    def refresh(self) -> bool:
+        """Carga la versión activa si cambió. Devuelve True si se intercambió el modelo."""
+        version = current_version(self.models_dir) or LEGACY_VERSION
+        with self._lock:
+            active = self._bundle
+            if (active is not None and active.version == version) or version == self._failed_version:
+                return False
+            try:
+                bundle = load_bundle(version, self.models_dir)
+            except Exception as e:
+                # Se mantiene la versión anterior; no se reintenta hasta que CURRENT cambie
+                self._failed_version = version
+                self.last_error = f"{version}: {type(e).__name__}: {e}"
+                metrics.record_error("model_reload", type(e).__name__)
+                print(f"No se pudo cargar la versión {version} del modelo: {e}")
+                return False
+            self._bundle = bundle
+            self._failed_version = None
+            self.last_error = None
+        metrics.set_model_version(version)
+        if active is not None:
+            metrics.inc("model_reloads")
+            print(f"-> Modelo actualizado en caliente: {active.version} -> {version}")
+        return True
+
+    def start(self):
+        """Inicia el hilo que revisa CURRENT cada poll_seconds"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name='model-watcher')
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.refresh()
@@ -0,0 +1,119 @@
+"""
+Balanceo de clases con SMOTE sobre un índice espacial
+Misma técnica que imblearn.over_sampling.SMOTE en 02_limpieza_etl.ipynb:
+cada muestra sintética es x + u·(vecino - x), con x una muestra de la clase
+minoritaria, vecino uno de sus k vecinos más cercanos de la misma clase y
+u ~ U(0, 1). Cada clase minoritaria se completa hasta el tamaño de la mayor.
+
+Diferencias para que escale a millones de filas:
+1. El KD-tree de cada clase se construye una sola vez y lo comparten los
+   hilos (la búsqueda en el árbol de scikit-learn libera el GIL)
+2. Primero se sortean las muestras base y solo se buscan los vecinos de
+   las que se usan, no los de toda la clase
+3. Los vecinos y las interpolaciones se calculan por lotes vectorizados en
+   paralelo, con el tamaño de lote limitado por `max_memory_mb`; el único
+   arreglo que crece con los datos es el resultado
+
+Todo el azar se sortea antes de repartir los lotes: el resultado con una
+misma semilla no depende del número de hilos.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree, KDTree
+
+K_NEIGHBORS = 5
+MAX_MEMORY_MB = 256
+ALGORITHMS = {'kd_tree': KDTree, 'ball_tree': BallTree}
+
+
+def _batch_rows(n_features: int, k: int, max_memory_mb: float, workers: int) -> int:
+    """Filas por lote para que los lotes en curso (vecinos, distancias y muestras) quepan en max_memory_mb"""
+    per_row = 8 * (2 * (k + 1) + 3 * n_features)
+    return max(1024, int(max_memory_mb * 2 ** 20 / (per_row * workers)))
+
+
+def _synthesize(tree, X_class: np.ndarray, base: np.ndarray, pick: np.ndarray, gaps: np.ndarray,
+                k: int, out: np.ndarray):
+    """Un lote: vecinos de las muestras base (sin la propia) e interpolación escrita en `out`"""
+    unique, inverse = np.unique(base, return_inverse=True)
+    neighbors = tree.query(X_class[unique], k=k + 1, return_distance=False)[:, 1:]
+    chosen = neighbors[inverse, pick]
+    x = X_class[base]
+    np.subtract(X_class[chosen], x, out=out)
+    out *= gaps[:, None]
+    out += x
+
+
+def oversample_class(X_class: np.ndarray, n_new: int, k: int = K_NEIGHBORS, random_state=None,
+                     algorithm: str = 'kd_tree', n_jobs: Optional[int] = None,
+                     max_memory_mb: float = MAX_MEMORY_MB) -> np.ndarray:
+    """
+    n_new muestras sintéticas de una clase.
+
+    Args:
+        X_class: Muestras de la clase (filas x variables)
+        k: Vecinos entre los que se elige (se reduce si la clase tiene pocas muestras)
+        algorithm: 'kd_tree' o 'ball_tree'
+        n_jobs: Hilos (por defecto, uno por núcleo)
+    """
+    X_class = np.ascontiguousarray(X_class, dtype=np.float64)
+    n, d = X_class.shape
+    out = np.empty((n_new, d))
+    if n_new <= 0:
+        return out
+    if n < 2:
+        # Sin vecinos posibles: se repite la única muestra
+        out[:] = X_class[0]
+        return out
+    k = min(k, n - 1)
+    rng = np.random.default_rng(random_state)
+    base = rng.integers(0, n, n_new)
+    pick = rng.integers(0, k, n_new)
+    gaps = rng.random(n_new)
+
+    tree = ALGORITHMS[algorithm](X_class)
+    workers = max(1, n_jobs or os.cpu_count() or 1)
+    step = _batch_rows(d, k, max_memory_mb, workers)
+    slices = [slice(start, min(start + step, n_new)) for start in range(0, n_new, step)]
+    work = lambda s: _synthesize(tree, X_class, base[s], pick[s], gaps[s], k, out[s])
+    if workers == 1 or len(slices) == 1:
+        for s in slices:
+            work(s)
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="smote") as pool:
+            list(pool.map(work, slices))
+    return out
+
+
+def smote(X, y, k: int = K_NEIGHBORS, random_state=42, algorithm: str = 'kd_tree',
+          n_jobs: Optional[int] = None, max_memory_mb: float = MAX_MEMORY_MB) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Completa cada clase hasta el tamaño de la mayoritaria (sampling_strategy='auto' de imblearn).
+
+    Returns:
+        (X, y) con las muestras originales primero y luego las sintéticas de cada clase
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    classes, counts = np.unique(y, return_counts=True)
+    target = counts.max()
+    rng = np.random.default_rng(random_state)
+    X_parts, y_parts = [X], [y]
+    for label, count in zip(classes, counts):
+        if count == target:
+            continue
+        X_parts.append(oversample_class(X[y == label], int(target - count), k, rng, algorithm, n_jobs,
+                                        max_memory_mb))
+        y_parts.append(np.full(target - count, label, dtype=y.dtype))
+    return np.concatenate(X_parts), np.concatenate(y_parts)
+
+
+def balance_frame(X: pd.DataFrame, y: pd.Series, **options) -> Tuple[pd.DataFrame, pd.Series]:
+    """smote() conservando nombres de columnas y de la etiqueta (para el pipeline de entrenamiento)"""
+    X_res, y_res = smote(X.to_numpy(), y.to_numpy(), **options)
+    return pd.DataFrame(X_res, columns=X.columns), pd.Series(y_res, name=y.name)
@@ -0,0 +1,138 @@
+"""
+Historial de conversación con presupuesto de tokens para el Chatbot LLM
+Mantiene una ventana deslizante de turnos recientes y resume los antiguos
+"""
+
+import math
+import re
+from typing import Dict, List, Optional
+
+# Presupuesto de tokens del historial por proveedor (sin contar el contexto del sistema)
+PROVIDER_TOKEN_BUDGETS = {
+    "openai": 3000,
+    "google": 6000,
+    "anthropic": 6000,
+    "openrouter": 2000,
+}
+DEFAULT_TOKEN_BUDGET = 3000
+
+# Aproximación: ~4 caracteres por token y un pequeño costo fijo por mensaje (rol, separadores)
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estima la cantidad de tokens de un texto sin depender de un tokenizer"""
+    if not text:
+        return MESSAGE_OVERHEAD_TOKENS
+    return math.ceil(len(text) / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _first_sentence(text: str, max_chars: int) -> str:
+    """Extrae la primera oración de un texto, truncada a max_chars"""
+    text = " ".join(str(text).split())
+    match = re.match(r"(.+?[.!?])(\s|$)", text)
+    sentence = match.group(1) if match else text
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars - 3] + "..."
+
+
+class ConversationHistory:
+    """
+    Historial acotado por tokens.
+
+    Cuando el total supera el presupuesto, los turnos más antiguos (pregunta
+    del usuario y sus respuestas) se retiran completos de la ventana y se
+    condensan en un resumen extractivo (primera oración de cada pregunta y
+    respuesta). La ventana siempre empieza con un mensaje del usuario, como
+    exige la API de Anthropic. El resumen también tiene un límite propio,
+    por lo que el tamaño de cada solicitud queda acotado sin importar la
+    duración de la sesión.
+    """
+
+    def __init__(self, budget_tokens: Optional[int] = DEFAULT_TOKEN_BUDGET,
+                 keep_turns: int = 1, summary_budget_tokens: Optional[int] = None):
+        """
+        Args:
+            budget_tokens: Tokens máximos del historial (None = sin límite)
+            keep_turns: Turnos recientes que se conservan aunque excedan el presupuesto
+                (al menos 1: el de la pregunta en curso)
+            summary_budget_tokens: Tokens máximos del resumen (por defecto 1/4 del presupuesto)
+        """
+        self.budget_tokens = budget_tokens
+        self.keep_turns = max(keep_turns, 1)
+        if summary_budget_tokens is None and budget_tokens is not None:
+            summary_budget_tokens = max(budget_tokens // 4, 64)
+        self.summary_budget_tokens = summary_budget_tokens
+
+        self.messages: List[Dict] = []
+        self.summary_lines: List[str] = []
+        self.compacted_messages = 0
+
+    @classmethod
+    def for_provider(cls, provider: str, budget_tokens: Optional[int] = None, **kwargs):
+        """Crea un historial con el presupuesto configurado para el proveedor"""
+        if budget_tokens is None:
+            budget_tokens = PROVIDER_TOKEN_BUDGETS.get(provider, DEFAULT_TOKEN_BUDGET)
+        return cls(budget_tokens=budget_tokens, **kwargs)
+
+    def add(self, role: str, content: str):
+        """Añade un mensaje y compacta si se excede el presupuesto"""
+        self.messages.append({
+            "role": role,
+            "content": content,
+            "tokens": estimate_tokens(content)
+        })
+        self._compact()
+
+    def clear(self):
+        """Limpia mensajes y resumen"""
+        self.messages = []
+        self.summary_lines = []
+        self.compacted_messages = 0
+
+    @property
+    def summary(self) -> str:
+        """Resumen compacto de los turnos retirados de la ventana"""
+        return "\n".join(self.summary_lines)
+
+    @property
+    def total_tokens(self) -> int:
+        """Tokens estimados de la ventana más el resumen"""
+        return sum(m["tokens"] for m in self.messages) + self._summary_tokens()
+
+    def as_messages(self) -> List[Dict[str, str]]:
+        """Mensajes de la ventana en formato {'role', 'content'}"""
+        return [{"role": m["role"], "content": m["content"]} for m in self.messages]
+
+    def _summary_tokens(self) -> int:
+        return estimate_tokens(self.summary) if self.summary_lines else 0
+
+    def _oldest_turn_size(self) -> int:
+        """Mensajes del turno más antiguo: hasta la siguiente pregunta del usuario"""
+        return next((i for i in range(1, len(self.messages)) if self.messages[i]["role"] == "user"),
+                    len(self.messages))
+
+    def _retire(self, message: Dict):
+        """Pasa un mensaje retirado de la ventana al resumen"""
+        prefix = "Usuario" if message["role"] == "user" else "Asistente"
+        self.summary_lines.append(f"- {prefix}: {_first_sentence(message['content'], 120)}")
+        self.compacted_messages += 1
+
+        # El resumen también está acotado: se descartan las líneas más antiguas
+        while len(self.summary_lines) > 1 and self._summary_tokens() > self.summary_budget_tokens:
+            self.summary_lines.pop(0)
+
+    def _compact(self):
+        """
+        Retira turnos completos hacia el resumen hasta respetar el presupuesto (todos
+        los mensajes de la ventana cuentan). Solo los keep_turns turnos más recientes
+        pueden excederlo; los mensajes del asistente sin pregunta al inicio se retiran siempre.
+        """
+        if self.budget_tokens is None:
+            return
+
+        while self.messages and (self.messages[0]["role"] != "user" or (
+                self.total_tokens > self.budget_tokens
+                and sum(m["role"] == "user" for m in self.messages) > self.keep_turns)):
+            for _ in range(self._oldest_turn_size()):
+                self._retire(self.messages.pop(0))
@@ -5,48 +5,80 @@ Soporta múltiples proveedores: OpenAI, Google Gemini, Anthropic, OpenRouter
 
 import os
 import json
+import time
+import importlib.util
 import requests
-from typing import List, Dict, Tuple
+from collections import deque
+from typing import List, Dict, Tuple, Optional, Iterator
 import streamlit as st
 from dotenv import load_dotenv
 
+import metrics
+from chat_history import ConversationHistory
+from hedged_requests import HedgedRequester
+from ui_utils import inject_css
+
 # Cargar variables de entorno
 load_dotenv()
 
-# Importaciones condicionales para cada proveedor
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+def _sdk_installed(module_name: str) -> bool:
+    """Comprueba si un SDK está instalado sin importarlo"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except ModuleNotFoundError:
+        return False
 
-try:
-    from google import genai
-    GOOGLE_AVAILABLE = True
-except ImportError:
-    GOOGLE_AVAILABLE = False
 
-try:
-    import anthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
+# Disponibilidad de cada proveedor. Los SDKs son pesados de importar, así que
+# solo se importan en _initialize_client cuando se conecta ese proveedor.
+OPENAI_AVAILABLE = _sdk_installed("openai")
+GOOGLE_AVAILABLE = _sdk_installed("google.genai")
+ANTHROPIC_AVAILABLE = _sdk_installed("anthropic")
 
 # OpenRouter siempre está disponible (usa requests)
 OPENROUTER_AVAILABLE = True
 
+# URL configurable para apuntar a un servidor local de pruebas (benchmarks/stub_llm_server.py)
+OPENROUTER_API_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/") + "/chat/completions"
+
+# Lista de modelos gratuitos en orden de preferencia
+# Se intentarán en orden hasta encontrar uno que funcione
+OPENROUTER_FALLBACK_MODELS = [
+    "cognitivecomputations/dolphin-mistral-24b-venice-edition:free",
+    "nousresearch/hermes-3-llama-3.1-405b:free",
+    "google/gemini-2.0-flash-exp:free",
+    "qwen/qwen-2-7b-instruct:free",
+    "microsoft/phi-3-mini-128k-instruct:free",
+    "mistralai/mistral-small-3.1-24b-instruct:free",
+]
+
+# Cliente compartido por todas las sesiones: pool de conexiones y salud de modelos
+_openrouter_requester = None
+
+
+def get_openrouter_requester() -> HedgedRequester:
+    """Retorna el cliente de OpenRouter compartido, creándolo en el primer uso"""
+    global _openrouter_requester
+    if _openrouter_requester is None:
+        _openrouter_requester = HedgedRequester()
+    return _openrouter_requester
+
 
 class ChatbotLLM:
     """
     Clase principal del chatbot que maneja múltiples proveedores de LLM
     """
     
-    def __init__(self, provider: str = "openai"):
+    def __init__(self, provider: str = "openai", history_budget: Optional[int] = None,
+                 hedge_openrouter: bool = True):
         """
         Inicializa el chatbot con el proveedor especificado
         
         Args:
             provider: 'openai', 'google', 'anthropic', o 'openrouter'
+            history_budget: Tokens máximos del historial enviado en cada solicitud.
+                Por defecto se usa el presupuesto del proveedor (chat_history.PROVIDER_TOKEN_BUDGETS)
+            hedge_openrouter: Lanza modelos de respaldo en paralelo cuando el principal tarda (OpenRouter)
         
         Note:
             Las API keys se cargan automáticamente desde variables de entorno (.env):
@@ -56,6 +88,7 @@ class ChatbotLLM:
             - OPENROUTER_API_KEY para OpenRouter
         """
         self.provider = provider.lower()
+        self.hedge_openrouter = hedge_openrouter
         
         # Cargar API key desde variables de entorno según el proveedor
         env_key_map = {
@@ -73,7 +106,11 @@ class ChatbotLLM:
         else:
             raise ValueError(f"Proveedor '{self.provider}' no soportado")
         
-        self.conversation_history = []
+        # Historial acotado por tokens (los turnos antiguos se resumen)
+        self.history = ConversationHistory.for_provider(self.provider, history_budget)
+        
+        # Tiempos hasta el primer token de las respuestas en streaming
+        self.ttft_log = deque(maxlen=100)
         
         # Contexto del sistema sobre el proyecto
         self.system_context = """
@@ -109,13 +146,16 @@ Rangos seguros de referencia:
     def _initialize_client(self):
         """Inicializa el cliente del proveedor seleccionado"""
         if self.provider == "openai" and OPENAI_AVAILABLE:
+            import openai
             openai.api_key = self.api_key
             self.client = openai.OpenAI(api_key=self.api_key)
             
         elif self.provider == "google" and GOOGLE_AVAILABLE:
+            from google import genai
             self.client = genai.Client(api_key=self.api_key)
             
         elif self.provider == "anthropic" and ANTHROPIC_AVAILABLE:
+            import anthropic
             self.client = anthropic.Anthropic(api_key=self.api_key)
             
         elif self.provider == "openrouter" and OPENROUTER_AVAILABLE:
@@ -125,26 +165,55 @@ Rangos seguros de referencia:
         else:
             raise ValueError(f"Proveedor '{self.provider}' no disponible o no instalado")
     
+    @property
+    def conversation_history(self) -> List[Dict[str, str]]:
+        """Mensajes dentro de la ventana del historial"""
+        return self.history.as_messages()
+    
     def add_message(self, role: str, content: str):
         """Añade un mensaje al historial de conversación"""
-        self.conversation_history.append({
-            "role": role,
-            "content": content
-        })
+        self.history.add(role, content)
     
     def clear_history(self):
         """Limpia el historial de conversación"""
-        self.conversation_history = []
+        self.history.clear()
+    
+    def _system_prompt(self) -> str:
+        """Contexto del sistema más el resumen de los turnos compactados"""
+        if not self.history.summary_lines:
+            return self.system_context
+        return f"{self.system_context}\nResumen de la conversación previa:\n{self.history.summary}\n"
+    
+    def _history_messages(self, user_message: str) -> List[Dict[str, str]]:
+        """
+        Historial en formato {'role', 'content'} terminando en el mensaje del usuario.
+        chat() ya añade el mensaje al historial, así que no se duplica.
+        """
+        messages = self.history.as_messages()
+        if not messages or messages[-1] != {"role": "user", "content": user_message}:
+            messages.append({"role": "user", "content": user_message})
+        return messages
+    
+    def _build_messages(self, user_message: str) -> List[Dict[str, str]]:
+        """Mensajes en formato OpenAI (system + historial), usados por OpenAI y OpenRouter"""
+        return [{"role": "system", "content": self._system_prompt()}] + self._history_messages(user_message)
+    
+    def _build_gemini_prompt(self, user_message: str) -> str:
+        """Prompt de texto plano para Gemini (contexto + historial)"""
+        full_prompt = f"{self._system_prompt()}\n\n"
+        
+        # Añadir historial (incluye el mensaje actual del usuario)
+        for msg in self._history_messages(user_message):
+            role = "Usuario" if msg["role"] == "user" else "Asistente"
+            full_prompt += f"{role}: {msg['content']}\n"
+        
+        return full_prompt + "Asistente:"
     
     def get_response_openai(self, user_message: str) -> str:
         """Obtiene respuesta usando OpenAI GPT"""
         try:
             # Construir mensajes
-            messages = [
-                {"role": "system", "content": self.system_context}
-            ]
-            messages.extend(self.conversation_history)
-            messages.append({"role": "user", "content": user_message})
+            messages = self._build_messages(user_message)
             
             # Llamada a la API
             response = self.client.chat.completions.create(
@@ -162,20 +231,10 @@ Rangos seguros de referencia:
     def get_response_google(self, user_message: str) -> str:
         """Obtiene respuesta usando Google Gemini"""
         try:
-            # Construir el prompt completo
-            full_prompt = f"{self.system_context}\n\n"
-            
-            # Añadir historial
-            for msg in self.conversation_history:
-                role = "Usuario" if msg["role"] == "user" else "Asistente"
-                full_prompt += f"{role}: {msg['content']}\n"
-            
-            full_prompt += f"Usuario: {user_message}\nAsistente:"
-            
             # Llamada a la API
             response = self.client.models.generate_content(
                 model='gemini-2.5-flash',
-                contents=full_prompt
+                contents=self._build_gemini_prompt(user_message)
             )
             
             return response.text
@@ -187,19 +246,13 @@ Rangos seguros de referencia:
         """Obtiene respuesta usando Anthropic Claude"""
         try:
             # Construir mensajes
-            messages = []
-            for msg in self.conversation_history:
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-            messages.append({"role": "user", "content": user_message})
+            messages = self._history_messages(user_message)
             
             # Llamada a la API
             response = self.client.messages.create(
                 model="claude-3-sonnet-20240229",
                 max_tokens=500,
-                system=self.system_context,
+                system=self._system_prompt(),
                 messages=messages
             )
             
@@ -208,99 +261,186 @@ Rangos seguros de referencia:
         except Exception as e:
             return f"Error Anthropic: {str(e)}"
     
+    def _openrouter_headers(self) -> Dict[str, str]:
+        """Cabeceras requeridas por la API de OpenRouter"""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://sipca-water-quality.app",
+            "X-Title": "SIPCA - Water Quality Prediction",
+        }
+    
+    def _post_openrouter_with_fallback(self, messages: List[Dict[str, str]], stream: bool = False):
+        """
+        Envía la solicitud a los modelos de OPENROUTER_FALLBACK_MODELS, ordenados por salud
+        
+        En modo cubierto (hedge_openrouter=True) se lanza un modelo de respaldo en
+        paralelo si el principal tarda más de lo habitual; si no, se prueban en orden.
+        Un 429 ya no bloquea con sleep: el modelo queda en cooldown y se pasa al siguiente.
+        
+        Returns:
+            (response, last_error): la primera respuesta HTTP 200 (o None) y el último error
+        """
+        def build_payload(model_name):
+            payload = {"model": model_name, "messages": messages}
+            if stream:
+                payload["stream"] = True
+            return payload
+        
+        _, response, last_error = get_openrouter_requester().post(
+            OPENROUTER_API_URL,
+            headers=self._openrouter_headers(),
+            models=OPENROUTER_FALLBACK_MODELS,
+            build_payload=build_payload,
+            stream=stream,
+            hedge=self.hedge_openrouter
+        )
+        return response, last_error
+    
+    @staticmethod
+    def _openrouter_error_message(last_error: Optional[str]) -> str:
+        """Mensaje amigable cuando ningún modelo de OpenRouter respondió"""
+        if last_error and "429" in str(last_error):
+            return "⏳ Has excedido el límite de solicitudes. Espera unos minutos e intenta de nuevo."
+        elif last_error and "404" in str(last_error):
+            return "🔍 Los modelos no están disponibles en este momento. Intenta más tarde."
+        else:
+            return "😔 El servicio no está disponible en este momento. Intenta más tarde."
+    
     def get_response_openrouter(self, user_message: str) -> str:
         """Obtiene respuesta usando OpenRouter con fallback automático de modelos"""
-        import time
-        
-        # Lista de modelos gratuitos en orden de preferencia
-        # Se intentarán en orden hasta encontrar uno que funcione
-        FALLBACK_MODELS = [
-            "cognitivecomputations/dolphin-mistral-24b-venice-edition:free",
-            "nousresearch/hermes-3-llama-3.1-405b:free",
-            "google/gemini-2.0-flash-exp:free",
-            "qwen/qwen-2-7b-instruct:free",
-            "microsoft/phi-3-mini-128k-instruct:free",
-            "mistralai/mistral-small-3.1-24b-instruct:free",
-        ]
-        
         try:
             # Construir mensajes
-            messages = [
-                {"role": "system", "content": self.system_context}
-            ]
-            
-            # Añadir historial
-            for msg in self.conversation_history:
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
+            messages = self._build_messages(user_message)
             
-            messages.append({"role": "user", "content": user_message})
-            
-            # Intentar con cada modelo en la lista
-            last_error = None
-            for model_name in FALLBACK_MODELS:
-                try:
-                    # Llamada a OpenRouter API (según documentación oficial)
-                    response = requests.post(
-                        url="https://openrouter.ai/api/v1/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {self.api_key}",
-                            "Content-Type": "application/json",
-                            "HTTP-Referer": "https://sipca-water-quality.app",
-                            "X-Title": "SIPCA - Water Quality Prediction",
-                        },
-                        data=json.dumps({
-                            "model": model_name,
-                            "messages": messages
-                        }),
-                        timeout=30
-                    )
-                    
-                    # Si es exitoso, retornar
-                    if response.status_code == 200:
-                        result = response.json()
-                        return result['choices'][0]['message']['content']
-                    
-                    # Si es 404, probar siguiente modelo
-                    if response.status_code == 404:
-                        continue
-                    
-                    # Si es rate limit (429), esperar y reintentar con el mismo modelo
-                    if response.status_code == 429:
-                        retry_after = response.headers.get('Retry-After', '2')
-                        try:
-                            delay = min(int(retry_after), 10)
-                        except:
-                            delay = 2
-                        time.sleep(delay)
-                        continue
-                    
-                    # Otros errores, guardar y probar siguiente modelo
-                    last_error = f"HTTP {response.status_code}"
-                    continue
-                    
-                except requests.exceptions.Timeout:
-                    # Timeout, probar siguiente modelo
-                    last_error = "Timeout"
-                    continue
-                except requests.exceptions.RequestException as e:
-                    # Error de conexión, probar siguiente modelo
-                    last_error = str(e)
-                    continue
+            response, last_error = self._post_openrouter_with_fallback(messages)
+            if response is not None:
+                result = response.json()
+                return result['choices'][0]['message']['content']
             
             # Si ningún modelo funcionó, retornar mensaje amigable
-            if last_error and "429" in str(last_error):
-                return "⏳ Has excedido el límite de solicitudes. Espera unos minutos e intenta de nuevo."
-            elif last_error and "404" in str(last_error):
-                return "🔍 Los modelos no están disponibles en este momento. Intenta más tarde."
-            else:
-                return "😔 El servicio no está disponible en este momento. Intenta más tarde."
+            return self._openrouter_error_message(last_error)
             
         except Exception:
             return "😔 El servicio no está disponible en este momento. Intenta más tarde."
     
+    # ------------------------------------------------------------------
+    # Streaming: cada método es un generador que produce fragmentos de texto
+    # ------------------------------------------------------------------
+    def stream_openai(self, user_message: str) -> Iterator[str]:
+        """Respuesta en streaming usando OpenAI GPT"""
+        try:
+            stream = self.client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=self._build_messages(user_message),
+                temperature=0.7,
+                max_tokens=500,
+                stream=True
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            yield f"Error OpenAI: {str(e)}"
+    
+    def stream_google(self, user_message: str) -> Iterator[str]:
+        """Respuesta en streaming usando Google Gemini"""
+        try:
+            stream = self.client.models.generate_content_stream(
+                model='gemini-2.5-flash',
+                contents=self._build_gemini_prompt(user_message)
+            )
+            for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            yield f"Error Gemini: {str(e)}"
+    
+    def stream_anthropic(self, user_message: str) -> Iterator[str]:
+        """Respuesta en streaming usando Anthropic Claude"""
+        try:
+            with self.client.messages.stream(
+                model="claude-3-sonnet-20240229",
+                max_tokens=500,
+                system=self._system_prompt(),
+                messages=self._history_messages(user_message)
+            ) as stream:
+                for text in stream.text_stream:
+                    yield text
+        except Exception as e:
+            yield f"Error Anthropic: {str(e)}"
+    
+    def stream_openrouter(self, user_message: str) -> Iterator[str]:
+        """Respuesta en streaming (SSE) usando OpenRouter con fallback de modelos"""
+        try:
+            response, last_error = self._post_openrouter_with_fallback(
+                self._build_messages(user_message), stream=True
+            )
+            if response is None:
+                yield self._openrouter_error_message(last_error)
+                return
+            
+            with response:
+                for line in response.iter_lines(decode_unicode=True):
+                    # Las líneas que no empiezan con "data:" son comentarios keep-alive
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta", {})
+                    if delta.get("content"):
+                        yield delta["content"]
+        except Exception:
+            yield "😔 El servicio no está disponible en este momento. Intenta más tarde."
+    
+    def chat_stream(self, user_message: str) -> Iterator[str]:
+        """
+        Igual que chat() pero produce la respuesta por fragmentos a medida que llega
+        
+        Registra el tiempo hasta el primer token (TTFT) del proveedor en ttft_log.
+        """
+        self.add_message("user", user_message)
+        
+        stream_methods = {
+            "openai": self.stream_openai,
+            "google": self.stream_google,
+            "anthropic": self.stream_anthropic,
+            "openrouter": self.stream_openrouter,
+        }
+        stream_method = stream_methods.get(self.provider)
+        if stream_method is None:
+            self.add_message("assistant", "Proveedor no soportado")
+            yield "Proveedor no soportado"
+            return
+        
+        parts = []
+        start = time.perf_counter()
+        ttft = None
+        try:
+            for chunk in stream_method(user_message):
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                parts.append(chunk)
+                yield chunk
+        finally:
+            # Aunque el consumidor corte el stream, se guarda lo recibido
+            self._log_ttft(ttft, time.perf_counter() - start)
+            self.add_message("assistant", "".join(parts))
+    
+    def _log_ttft(self, ttft: Optional[float], total: float):
+        """Registra el tiempo hasta el primer token y el tiempo total de la respuesta"""
+        self.ttft_log.append({
+            "provider": self.provider,
+            "ttft_s": ttft,
+            "total_s": total
+        })
+        metrics.observe("chatbot_stream", total, provider=self.provider)
+        if ttft is None:
+            metrics.record_error("chatbot_stream", "no_response", provider=self.provider)
+        else:
+            metrics.observe("chatbot_ttft", ttft, provider=self.provider)
+    
     def chat(self, user_message: str) -> str:
         """
         Método principal para chatear
@@ -315,16 +455,17 @@ Rangos seguros de referencia:
         self.add_message("user", user_message)
         
         # Obtener respuesta según el proveedor
-        if self.provider == "openai":
-            response = self.get_response_openai(user_message)
-        elif self.provider == "google":
-            response = self.get_response_google(user_message)
-        elif self.provider == "anthropic":
-            response = self.get_response_anthropic(user_message)
-        elif self.provider == "openrouter":
-            response = self.get_response_openrouter(user_message)
-        else:
-            response = "Proveedor no soportado"
+        with metrics.timer("chatbot", provider=self.provider):
+            if self.provider == "openai":
+                response = self.get_response_openai(user_message)
+            elif self.provider == "google":
+                response = self.get_response_google(user_message)
+            elif self.provider == "anthropic":
+                response = self.get_response_anthropic(user_message)
+            elif self.provider == "openrouter":
+                response = self.get_response_openrouter(user_message)
+            else:
+                response = "Proveedor no soportado"
         
         # Añadir respuesta al historial
         self.add_message("assistant", response)
@@ -365,185 +506,8 @@ def create_chatbot_widget():
     if "last_error" not in st.session_state:
         st.session_state.last_error = None
     
-    # CSS moderno y limpio
-    st.markdown("""
-    <style>
-    /* Contenedor principal del widget */
-    .chat-widget-container {
-        position: fixed;
-        bottom: 20px;
-        right: 20px;
-        z-index: 9999;
-        font-family: 'Space Grotesk', -apple-system, BlinkMacSystemFont, sans-serif;
-    }
-    
-    /* Panel del chat */
-    .chat-panel {
-        width: 400px;
-        max-height: 600px;
-        background: white;
-        border-radius: 16px;
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.12);
-        overflow: hidden;
-        animation: slideUp 0.3s ease-out;
-    }
-    
-    @keyframes slideUp {
-        from {
-            opacity: 0;
-            transform: translateY(20px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-    
-    /* Header del chat */
-    .chat-header {
-        background: linear-gradient(135deg, #E3F2FD 0%, #BBDEFB 100%);
-        padding: 24px;
-        border-bottom: 1px solid #E3F2FD;
-    }
-    
-    .chat-welcome {
-        font-size: 28px;
-        font-weight: 600;
-        color: #1565C0;
-        margin: 0 0 8px 0;
-        display: flex;
-        align-items: center;
-        gap: 8px;
-    }
-    
-    .chat-subtitle {
-        font-size: 18px;
-        color: #424242;
-        margin: 0;
-        font-weight: 400;
-    }
-    
-    /* Input del chat */
-    .chat-input-section {
-        padding: 16px 20px;
-        background: white;
-        border-bottom: 1px solid #E0E0E0;
-    }
-    
-    /* Sección de inicio */
-    .chat-start-section {
-        padding: 20px;
-        background: #FAFAFA;
-        border-bottom: 1px solid #E0E0E0;
-    }
-    
-    .chat-start-button {
-        display: flex;
-        align-items: center;
-        gap: 12px;
-        padding: 12px 16px;
-        background: white;
-        border: 1px solid #E0E0E0;
-        border-radius: 8px;
-        cursor: pointer;
-        transition: all 0.2s;
-    }
-    
-    .chat-start-button:hover {
-        background: #F5F5F5;
-        border-color: #1976D2;
-    }
-    
-    .chat-disclaimer {
-        font-size: 11px;
-        color: #757575;
-        margin-top: 8px;
-        line-height: 1.4;
-    }
-    
-    /* Bookmarks */
-    .chat-bookmarks {
-        padding: 16px 20px;
-    }
-    
-    .bookmarks-title {
-        font-size: 13px;
-        font-weight: 600;
-        color: #616161;
-        margin-bottom: 12px;
-    }
-    
-    .bookmark-item {
-        display: flex;
-        align-items: center;
-        gap: 8px;
-        padding: 8px 12px;
-        margin-bottom: 6px;
-        border-radius: 6px;
-        cursor: pointer;
-        transition: background 0.2s;
-        font-size: 14px;
-        color: #424242;
-    }
-    
-    .bookmark-item:hover {
-        background: #F5F5F5;
-    }
-    
-    /* Footer */
-    .chat-footer {
-        padding: 12px 20px;
-        text-align: center;
-        font-size: 11px;
-        color: #9E9E9E;
-        border-top: 1px solid #E0E0E0;
-    }
-    
-    /* Mensajes del chat */
-    .stChatMessage {
-        padding: 12px 16px;
-        margin-bottom: 12px;
-        border-radius: 12px;
-    }
-    
-    /* Botón flotante */
-    .chat-float-btn {
-        width: 56px;
-        height: 56px;
-        border-radius: 50%;
-        background: linear-gradient(135deg, #1976D2 0%, #42A5F5 100%);
-        box-shadow: 0 4px 16px rgba(25, 118, 210, 0.4);
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        cursor: pointer;
-        transition: all 0.3s;
-        animation: pulse 2s infinite;
-    }
-    
-    @keyframes pulse {
-        0%, 100% {
-            box-shadow: 0 4px 16px rgba(25, 118, 210, 0.4);
-        }
-        50% {
-            box-shadow: 0 4px 24px rgba(25, 118, 210, 0.6);
-        }
-    }
-    
-    .chat-float-btn:hover {
-        transform: scale(1.05);
-        box-shadow: 0 6px 24px rgba(25, 118, 210, 0.5);
-    }
-    
-    /* Responsive */
-    @media (max-width: 768px) {
-        .chat-panel {
-            width: calc(100vw - 40px);
-            max-height: calc(100vh - 100px);
-        }
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    # CSS del widget (se lee del disco una sola vez por proceso)
+    inject_css("chatbot_widget.css")
     
     # Configuración en sidebar
     with st.sidebar.expander("🤖 Configurar Asistente IA", expanded=False):
@@ -614,6 +578,9 @@ def create_chatbot_widget():
         if st.session_state.chatbot:
             st.success(f"🟢 **Conectado:** {selected_provider}")
             st.caption(f"💬 {len(st.session_state.chat_messages)} mensajes")
+            ttft_log = st.session_state.chatbot.ttft_log
+            if ttft_log and ttft_log[-1]["ttft_s"] is not None:
+                st.caption(f"⏱️ Primer token: {ttft_log[-1]['ttft_s']:.2f} s")
         else:
             st.info("🔴 **Desconectado**")
         
@@ -625,83 +592,6 @@ def create_chatbot_widget():
                     st.session_state.last_error = None
                     st.rerun()
     
-    # CSS para posicionar el widget en la esquina inferior derecha (fijo)
-    st.markdown("""
-    <style>
-    /* Forzar SOLO el popover del chatbot a estar en la esquina inferior derecha */
-    /* NO afectar a selectbox ni otros popovers */
-    [data-testid="stPopover"]:not([data-testid="stSelectbox"]) {
-        position: fixed !important;
-        bottom: 20px !important;
-        right: 20px !important;
-        z-index: 9999 !important;
-    }
-    
-    /* Forzar SOLO el contenido del popover del chatbot */
-    [data-testid="stPopover"]:not([data-testid="stSelectbox"]) [data-baseweb="popover"],
-    [data-testid="stPopover"]:not([data-testid="stSelectbox"]) > div:not([data-baseweb="select"]) {
-        position: fixed !important;
-        bottom: 90px !important;
-        right: 20px !important;
-        left: auto !important;
-        top: auto !important;
-        transform: none !important;
-        margin: 0 !important;
-    }
-    
-    /* Ajustar el ancho SOLO de la ventana del chat */
-    [data-testid="stPopover"]:not([data-testid="stSelectbox"]) [data-baseweb="popover"] > div,
-    [data-testid="stPopover"]:not([data-testid="stSelectbox"]) > div > div:not([data-baseweb="select"]) {
-        width: 400px !important;
-        max-width: 90vw !important;
-    }
-    
-    /* NO afectar los selectbox - dejarlos con su comportamiento normal */
-    [data-baseweb="select"],
-    [data-baseweb="popover"]:has([role="listbox"]) {
-        position: absolute !important;
-        bottom: auto !important;
-        left: auto !important;
-        transform: initial !important;
-    }
-    
-    /* Estilo del botón flotante del chat */
-    [data-testid="stPopover"]:not([data-testid="stSelectbox"]) button {
-        width: 60px !important;
-        height: 60px !important;
-        border-radius: 50% !important;
-        background: linear-gradient(135deg, #1976D2 0%, #42A5F5 100%) !important;
-        box-shadow: 0 4px 16px rgba(25, 118, 210, 0.4) !important;
-        border: none !important;
-        font-size: 24px !important;
-        animation: pulse 2s infinite !important;
-    }
-    
-    @keyframes pulse {
-        0%, 100% {
-            box-shadow: 0 4px 16px rgba(25, 118, 210, 0.4);
-        }
-        50% {
-            box-shadow: 0 4px 24px rgba(25, 118, 210, 0.6);
-        }
-    }
-    
-    [data-testid="stPopover"]:not([data-testid="stSelectbox"]) button:hover {
-        transform: scale(1.05) !important;
-        box-shadow: 0 6px 24px rgba(25, 118, 210, 0.5) !important;
-    }
-    
-        /* Icono del chatbot flotante */
-    [data-testid="stPopover"]:not([data-testid="stSelectbox"]) button::before {
-        content: "smart_toy";
-        font-family: 'Material Symbols Outlined';
-        font-size: 28px;
-        font-weight: normal;
-        font-variation-settings: 'FILL' 1;
-        color: white;
-    }
-    </style>
-    """, unsafe_allow_html=True)
     
     # Widget del chatbot (sin columnas, se posiciona con CSS)
     with st.popover("", help="Asistente de Calidad de Agua"):
@@ -795,9 +685,14 @@ def create_chatbot_widget():
                 "content": prompt
             })
             
-            with st.spinner("💭 Pensando..."):
+            with chat_container:
+                with st.chat_message("user"):
+                    st.markdown(prompt)
+                
                 try:
-                    response = st.session_state.chatbot.chat(prompt)
+                    # Renderizar la respuesta a medida que llegan los fragmentos
+                    with st.chat_message("assistant"):
+                        response = st.write_stream(st.session_state.chatbot.chat_stream(prompt))
                     st.session_state.chat_messages.append({
                         "role": "assistant",
                         "content": response
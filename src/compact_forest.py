@@ -0,0 +1,335 @@
+"""
+Formato compacto del RandomForest para carga rápida
+Todos los nodos del bosque se guardan en arreglos planos con tipos reducidos
+(variable int16, umbral float32, hijos int32, probabilidades float32) dentro
+de un único archivo binario. Al cargarlo con np.memmap no se deserializa
+nada: el sistema operativo lee las páginas a medida que se usan y varios
+procesos (sesiones de Streamlit, workers) comparten la misma copia en memoria.
+
+Estructura del archivo:
+    MAGIC (8 bytes) | largo del encabezado (uint64) | encabezado JSON
+    | arreglos alineados a 64 bytes (ver ARRAYS)
+
+Los umbrales se redondean hacia abajo al float32 más cercano: sklearn
+compara las muestras en float32, así que x <= t da exactamente el mismo
+resultado que con el umbral float64 original.
+
+La variante para gateways (forest_compression) usa el mismo formato con
+umbrales uint16 sobre una grilla por variable y hojas uint8; el encabezado
+"quantization" indica cómo cuantizar las muestras antes de recorrerla.
+
+CompactForest expone lo que usa la aplicación del modelo de sklearn
+(predict, predict_proba, classes_, estimators_[i].tree_, ...), por lo que
+sirve como reemplazo directo en el dashboard, el motor what-if y las
+explicaciones. Las muestras sueltas y los lotes pequeños se recorren con
+numpy sobre las páginas compartidas; para lotes grandes se construyen una
+vez árboles nativos de sklearn a partir de los mismos arreglos (copia
+privada de unos pocos MB).
+"""
+
+import json
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+MAGIC = b'SIPCAFR1'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+# Pares (fila, árbol) recorridos a la vez: acota la memoria temporal en lotes grandes
+CHUNK_CELLS = 1 << 20
+# Desde este tamaño de lote se usan los árboles nativos de sklearn (Cython): el
+# recorrido con numpy es más rápido para pocas filas pero más lento para lotes grandes
+NATIVE_MIN_ROWS = 256
+# Convención de sklearn para las hojas
+TREE_LEAF = -1
+TREE_UNDEFINED = -2
+
+# nombre -> tipo en disco (la variante cuantizada usa uint16/uint8/int16, ver forest_compression)
+ARRAYS = {
+    'feature': np.int16,
+    'threshold': np.float32,
+    'children_left': np.int32,
+    'children_right': np.int32,
+    'value': np.float32,
+    'roots': np.int32,
+}
+
+
+def _floor_float32(values: np.ndarray) -> np.ndarray:
+    """Mayor float32 <= cada valor (conserva x32 <= t para cualquier x float32)"""
+    rounded = values.astype(np.float32)
+    over = rounded.astype(np.float64) > values
+    rounded[over] = np.nextafter(rounded[over], np.float32(-np.inf))
+    return rounded
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def forest_arrays(forest) -> Dict[str, np.ndarray]:
+    """Nodos de todos los árboles concatenados (hijos con índices locales, como en sklearn)"""
+    trees = [estimator.tree_ for estimator in forest.estimators_]
+    counts = np.array([tree.node_count for tree in trees])
+    value = np.concatenate([tree.value[:, 0, :] for tree in trees])
+    value = value / value.sum(axis=1, keepdims=True)  # conteos o fracciones -> probabilidades
+    return {
+        'feature': np.concatenate([tree.feature for tree in trees]).astype(np.int16),
+        'threshold': _floor_float32(np.concatenate([tree.threshold for tree in trees])),
+        'children_left': np.concatenate([tree.children_left for tree in trees]).astype(np.int32),
+        'children_right': np.concatenate([tree.children_right for tree in trees]).astype(np.int32),
+        'value': value.astype(np.float32),
+        'roots': np.r_[0, np.cumsum(counts)[:-1]].astype(np.int32),
+    }
+
+
+def max_depth(forest) -> int:
+    return int(max(estimator.tree_.max_depth for estimator in forest.estimators_))
+
+
+def save(forest, path: str, feature_names: Optional[Sequence[str]] = None,
+         arrays: Optional[Dict[str, np.ndarray]] = None, extra: Optional[Dict] = None):
+    """
+    Escribe el bosque en formato compacto
+
+    Args:
+        forest: RandomForestClassifier (o ExtraTrees) ajustado
+        path: Archivo de salida
+        feature_names: Nombres de las variables (por defecto feature_names_in_ o x0..xn)
+        arrays: Arreglos ya preparados (p. ej. una variante cuantizada); por defecto forest_arrays()
+        extra: Campos adicionales para el encabezado
+    """
+    if arrays is None:
+        arrays = forest_arrays(forest)
+    if feature_names is None:
+        feature_names = getattr(forest, 'feature_names_in_', None)
+    n_features = int(forest.n_features_in_)
+    header = {
+        'format': FORMAT_VERSION,
+        'n_features': n_features,
+        'feature_names': [str(f) for f in feature_names] if feature_names is not None else None,
+        'classes': np.asarray(forest.classes_).tolist(),
+        'feature_importances': np.asarray(forest.feature_importances_).tolist(),
+        'max_depth': max_depth(forest),
+        'arrays': {},
+        **(extra or {}),
+    }
+
+    # Desplazamientos relativos al final del encabezado (su largo aún no se conoce)
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        header['arrays'][name] = {'dtype': np.dtype(array.dtype).str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+
+    encoded = json.dumps(header).encode('utf-8')
+    data_start = _align(len(MAGIC) + 8 + len(encoded))
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(encoded)).tobytes())
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.seek(data_start + header['arrays'][name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+
+
+def read_header(path: str):
+    """(encabezado, byte donde empiezan los arreglos)"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} no es un modelo en formato compacto")
+        length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(length))
+    if header.get('format') != FORMAT_VERSION:
+        raise ValueError(f"Versión de formato no soportada: {header.get('format')}")
+    return header, _align(len(MAGIC) + 8 + length)
+
+
+def load(path: str, mmap: bool = True) -> "CompactForest":
+    """
+    Carga un modelo compacto. Con mmap=True los arreglos son vistas de solo
+    lectura sobre el archivo (páginas compartidas entre procesos); con False
+    se leen completos a memoria.
+    """
+    header, data_start = read_header(path)
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype, shape = np.dtype(spec['dtype']), tuple(spec['shape'])
+        if mmap:
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=data_start + spec['offset'], shape=shape)
+        else:
+            with open(path, 'rb') as f:
+                f.seek(data_start + spec['offset'])
+                arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+    return CompactForest(header, arrays)
+
+
+class _TreeArrays:
+    """Vista de un árbol con los atributos de sklearn.tree._tree.Tree que usa ForestExplainer"""
+
+    def __init__(self, forest: "CompactForest", index: int):
+        start = int(forest.roots[index])
+        end = int(forest.roots[index + 1]) if index + 1 < len(forest.roots) else len(forest.feature)
+        self._forest = forest
+        self._index = index
+        self.node_count = end - start
+        self.feature = forest.feature[start:end]
+        self.threshold = forest.threshold[start:end]
+        self.children_left = forest.children_left[start:end]
+        self.children_right = forest.children_right[start:end]
+        self.value = forest.value[start:end, None, :]
+
+    def apply(self, X) -> np.ndarray:
+        """Hoja (índice local) alcanzada por cada fila"""
+        roots = self._forest.roots[self._index:self._index + 1]
+        return (self._forest._descend(self._forest._inputs(X), roots) - roots[0]).ravel()
+
+
+class _Estimator:
+    __slots__ = ('tree_',)
+
+    def __init__(self, tree):
+        self.tree_ = tree
+
+
+class CompactForest:
+    """Bosque cargado desde el formato compacto, con la API de predicción de sklearn"""
+
+    def __init__(self, header: Dict, arrays: Dict[str, np.ndarray]):
+        self.header = header
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.children_left = arrays['children_left']
+        self.children_right = arrays['children_right']
+        self.value = arrays['value']
+        self.roots = np.asarray(arrays['roots'], dtype=np.int64)
+        self.classes_ = np.asarray(header['classes'])
+        self.n_classes_ = len(self.classes_)
+        self.n_features_in_ = header['n_features']
+        if header.get('feature_names'):
+            self.feature_names_in_ = np.asarray(header['feature_names'], dtype=object)
+        self.feature_importances_ = np.asarray(header['feature_importances'])
+        self.n_estimators = len(self.roots)
+        self.quantization = header.get('quantization')
+        if self.quantization:
+            self._x_offset = np.asarray(self.quantization['offset'], dtype=np.float64)
+            self._x_scale = np.asarray(self.quantization['scale'], dtype=np.float64)
+        self._estimators = None
+        self._native_trees = None
+
+    @property
+    def estimators_(self):
+        """Árboles como vistas sobre los arreglos compartidos (se crean al primer uso)"""
+        if self._estimators is None:
+            self._estimators = [_Estimator(_TreeArrays(self, t)) for t in range(self.n_estimators)]
+        return self._estimators
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children_left,
+                                      self.children_right, self.value, self.roots))
+
+    def _descend(self, X: np.ndarray, roots: np.ndarray) -> np.ndarray:
+        """
+        Recorre todos los pares (fila, árbol) a la vez, un nivel por iteración;
+        los pares que llegan a una hoja salen del conjunto activo.
+
+        Returns:
+            Índice global de la hoja: filas x árboles
+        """
+        n_rows, n_trees = len(X), len(roots)
+        nodes = np.tile(roots, n_rows)
+        bases = nodes.copy()
+        rows = np.repeat(np.arange(n_rows), n_trees)
+        active = np.arange(nodes.size)
+        while active.size:
+            current = nodes[active]
+            feature = self.feature[current]
+            split = feature >= 0
+            if not split.all():
+                active, current, feature = active[split], current[split], feature[split]
+            go_left = X[rows[active], feature] <= self.threshold[current]
+            child = np.where(go_left, self.children_left[current], self.children_right[current])
+            nodes[active] = bases[active] + child
+        return nodes.reshape(n_rows, n_trees)
+
+    def _inputs(self, X) -> np.ndarray:
+        """Muestras como float32 contiguo; en la variante cuantizada, sus códigos de grilla"""
+        if self.quantization:
+            X64 = np.asarray(X, dtype=np.float32).astype(np.float64)
+            codes = np.ceil((X64 - self._x_offset) / self._x_scale)
+            return np.ascontiguousarray(np.clip(codes, 0, self.quantization['threshold_levels'] + 1),
+                                        dtype=np.float32)
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def _native(self):
+        """
+        Árboles de sklearn (Cython) construidos desde los arreglos, para lotes
+        grandes. Se crean al primer lote grande; lista vacía si la API interna
+        de sklearn no está disponible (se sigue usando el recorrido con numpy).
+        """
+        if self._native_trees is None:
+            try:
+                from sklearn.tree._tree import NODE_DTYPE, Tree
+                trees = []
+                for estimator in self.estimators_:
+                    arrays = estimator.tree_
+                    nodes = np.zeros(arrays.node_count, dtype=NODE_DTYPE)
+                    nodes['left_child'] = arrays.children_left
+                    nodes['right_child'] = arrays.children_right
+                    nodes['feature'] = arrays.feature
+                    nodes['threshold'] = arrays.threshold
+                    tree = Tree(self.n_features_in_, np.array([self.n_classes_], dtype=np.intp), 1)
+                    tree.__setstate__({
+                        'max_depth': self.header.get('max_depth', 0),
+                        'node_count': arrays.node_count,
+                        'nodes': nodes,
+                        'values': np.ascontiguousarray(arrays.value, dtype=np.float64),
+                    })
+                    trees.append(tree)
+            except (ImportError, KeyError, TypeError, ValueError):
+                trees = []
+            self._native_trees = trees
+        return self._native_trees
+
+    def _use_native(self, n_rows: int) -> bool:
+        return n_rows >= NATIVE_MIN_ROWS and bool(self._native())
+
+    def _blocks(self, X):
+        X = self._inputs(X)
+        step = max(1, CHUNK_CELLS // self.n_estimators)
+        for start in range(0, len(X), step):
+            yield start, self._descend(X[start:start + step], self.roots)
+
+    def leaf_nodes(self, X) -> np.ndarray:
+        """Índice global de la hoja alcanzada en cada árbol (filas x árboles), en un solo recorrido"""
+        if self._use_native(len(X)):
+            X32 = self._inputs(X)
+            return np.column_stack([tree.apply(X32) for tree in self._native()]) + self.roots
+        leaves = np.empty((len(X), self.n_estimators), dtype=np.int64)
+        for start, block in self._blocks(X):
+            leaves[start:start + len(block)] = block
+        return leaves
+
+    def apply(self, X) -> np.ndarray:
+        """Como RandomForestClassifier.apply: índice local de la hoja en cada árbol"""
+        return self.leaf_nodes(X) - self.roots
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self._use_native(len(X)):
+            X32 = self._inputs(X)
+            proba = np.zeros((len(X), self.n_classes_))
+            for tree in self._native():
+                proba += tree.predict(X32).reshape(len(X32), -1)
+            proba /= self.n_estimators
+        else:
+            proba = np.empty((len(X), self.n_classes_))
+            for start, block in self._blocks(X):
+                proba[start:start + len(block)] = self.value[block].mean(axis=1, dtype=np.float64)
+        if self.quantization:
+            # Hojas en 0..255 por clase: normalizar para que cada fila sume 1
+            proba /= proba.sum(axis=1, keepdims=True)
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -0,0 +1,168 @@
+"""
+Comparación de varias muestras (p. ej. etapas de tratamiento de la planta)
+Puntúa N muestras en una sola llamada al modelo y las dibuja juntas, en
+lugar de comparar solo la muestra de los sliders con un promedio fijo:
+
+- Coordenadas paralelas: una línea por muestra, coloreada por P(potable);
+  en el navegador se pueden filtrar rangos arrastrando sobre cada eje
+- Mapa de calor: filas = muestras, columnas = variables (small multiples
+  compactos que siguen siendo legibles con cientos de muestras)
+
+La matriz normalizada (cada variable a [0, 1] según su rango) y el
+postprocesado de risk.py se calculan una sola vez en build(); filtrar,
+ordenar o cambiar de vista solo indexa esas matrices.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import risk
+import validation
+from score import PREDICTION_COLUMN, PROBABILITY_COLUMN, prediction_labels
+
+# Columnas que se usan como nombre de la muestra (sin distinguir mayúsculas)
+NAME_COLUMNS = ('Etapa', 'Muestra', 'Nombre', 'Punto', 'Stage', 'Sample', 'Name')
+
+FILTERS = ('Todas', 'Con alerta', 'Riesgo MEDIO (revisar)')
+ORDERS = ('Archivo', 'P(potable) ascendente', 'P(potable) descendente')
+
+
+def sample_names(df: pd.DataFrame, extra_columns: Sequence) -> np.ndarray:
+    """Nombre único de cada muestra: columna de NAME_COLUMNS, la primera columna de texto extra o 'Muestra i'"""
+    by_name = {str(c).strip().lower(): c for c in extra_columns}
+    column = next((by_name[n.lower()] for n in NAME_COLUMNS if n.lower() in by_name), None)
+    if column is None:
+        column = next((c for c in extra_columns if not pd.api.types.is_numeric_dtype(df[c])), None)
+    if column is None:
+        return np.array([f"Muestra {i + 1}" for i in range(len(df))], dtype=object)
+    names = df[column].astype(str).reset_index(drop=True)
+    # Los nombres repetidos se distinguen con el número de fila (los ejes de plotly los unirían)
+    repeated = names.duplicated(keep=False).to_numpy()
+    names[repeated] = names[repeated] + ' (fila ' + (np.flatnonzero(repeated) + 1).astype(str) + ')'
+    return names.to_numpy(dtype=object)
+
+
+def normalize(X: np.ndarray, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    """Cada columna a [0, 1] con su rango (recortada; los NaN se conservan)"""
+    span = np.where(high > low, high - low, 1.0)
+    return np.clip((X - low) / span, 0.0, 1.0).astype(np.float32)
+
+
+class ComparisonSet:
+    """Muestras puntuadas, con la matriz normalizada y el postprocesado ya calculados"""
+
+    __slots__ = ('names', 'features', 'X', 'normalized', 'low', 'high', 'proba', 'assessment', 'valid')
+
+    def __init__(self, names, features, X, low, high, proba, assessment, valid):
+        self.names = names
+        self.features = list(features)
+        self.X = X
+        self.low = low
+        self.high = high
+        self.normalized = normalize(X, low, high)
+        self.proba = proba
+        self.assessment = assessment
+        self.valid = valid
+
+    def __len__(self):
+        return len(self.names)
+
+    def select(self, how: str = 'Todas', order: str = 'Archivo') -> np.ndarray:
+        """Índices de las muestras puntuadas que cumplen el filtro, en el orden pedido"""
+        mask = self.valid.copy()
+        if how == 'Con alerta':
+            mask &= self.assessment[risk.ALERT_COLUMN].to_numpy()
+        elif how == 'Riesgo MEDIO (revisar)':
+            mask &= self.assessment[risk.RISK_COLUMN].to_numpy() == 'MEDIO'
+        rows = np.flatnonzero(mask)
+        if order != 'Archivo':
+            rows = rows[np.argsort(self.proba[rows], kind='stable')]
+            if order == 'P(potable) descendente':
+                rows = rows[::-1]
+        return rows
+
+    def table(self, rows: np.ndarray) -> pd.DataFrame:
+        """Resultados de las muestras seleccionadas (nombre, predicción, probabilidad y alertas)"""
+        out = pd.DataFrame({'Muestra': self.names[rows]})
+        out[PREDICTION_COLUMN] = prediction_labels(self.proba[rows])
+        out[PROBABILITY_COLUMN] = self.proba[rows]
+        return pd.concat([out, self.assessment.iloc[rows].reset_index(drop=True)], axis=1)
+
+
+def build(df: pd.DataFrame, model, scaler, features: Sequence[str],
+          ranges: Dict[str, Tuple[float, float]]) -> ComparisonSet:
+    """
+    Valida y puntúa todas las muestras en una sola llamada al modelo.
+
+    Args:
+        features: Orden de variables del modelo
+        ranges: (mínimo, máximo) de cada variable para normalizar (los de los sliders)
+
+    Raises:
+        validation.SchemaError: Si falta alguna variable del esquema
+    """
+    batch = validation.validate(df, features)
+    proba = np.full(len(df), np.nan)
+    if batch.valid.any():
+        proba = batch.expand(risk.positive_probability(model, scaler.transform(batch.frame())), np.nan)
+    assessment = risk.assess(proba, batch.X[:, batch.features.index('ph')])
+    low = np.array([ranges[f][0] for f in batch.features], dtype=np.float64)
+    high = np.array([ranges[f][1] for f in batch.features], dtype=np.float64)
+    return ComparisonSet(sample_names(df, batch.extra_columns), batch.features, batch.X, low, high,
+                         proba, assessment, batch.valid)
+
+
+# ---------------------------------------------------------
+# Vistas (plotly se importa al dibujar, como en el resto del dashboard)
+# ---------------------------------------------------------
+PROBA_COLORSCALE = [[0.0, '#ef4444'], [0.5, '#facc15'], [1.0, '#4ade80']]
+
+
+def _tick(value: float) -> str:
+    return f"{value:,.0f}" if abs(value) >= 100 else f"{value:g}"
+
+
+def parallel_coordinates(cs: ComparisonSet, rows: np.ndarray, labels: Optional[Dict[str, str]] = None):
+    """Una línea por muestra; los ejes muestran los valores reales del rango de cada variable"""
+    import plotly.graph_objects as go
+    labels = labels or {}
+    dimensions = [
+        dict(label=labels.get(f, f), values=cs.normalized[rows, j], range=[0, 1],
+             tickvals=[0, 0.5, 1],
+             ticktext=[_tick(cs.low[j]), _tick((cs.low[j] + cs.high[j]) / 2), _tick(cs.high[j])])
+        for j, f in enumerate(cs.features)
+    ]
+    dimensions.append(dict(label='P(potable) %', values=cs.proba[rows] * 100, range=[0, 100]))
+    fig = go.Figure(go.Parcoords(
+        line=dict(color=cs.proba[rows], colorscale=PROBA_COLORSCALE, cmin=0, cmax=1, showscale=True,
+                  colorbar=dict(title='P(potable)', tickformat='.0%')),
+        dimensions=dimensions,
+    ))
+    fig.update_layout(height=450, margin=dict(l=60, r=40, t=50, b=20),
+                      paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+    return fig
+
+
+def heatmap(cs: ComparisonSet, rows: np.ndarray, labels: Optional[Dict[str, str]] = None):
+    """Muestras x variables (posición en el rango) más la columna P(potable)"""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    labels = labels or {}
+    names = cs.names[rows]
+    height = min(1200, 120 + 22 * len(rows))
+    fig = make_subplots(rows=1, cols=2, column_widths=[0.88, 0.12], shared_yaxes=True, horizontal_spacing=0.01)
+    fig.add_trace(go.Heatmap(
+        z=cs.normalized[rows], x=[labels.get(f, f) for f in cs.features], y=names,
+        customdata=cs.X[rows], colorscale='Blues', zmin=0, zmax=1, showscale=False,
+        hovertemplate='%{y} · %{x}: %{customdata:.2f}<extra></extra>',
+    ), row=1, col=1)
+    fig.add_trace(go.Heatmap(
+        z=cs.proba[rows, None], x=['P(potable)'], y=names, colorscale=PROBA_COLORSCALE, zmin=0, zmax=1,
+        showscale=False, hovertemplate='%{y}: %{z:.0%}<extra></extra>',
+    ), row=1, col=2)
+    fig.update_yaxes(autorange='reversed', type='category')
+    fig.update_layout(height=height, margin=dict(l=0, r=0, t=10, b=0),
+                      paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+    return fig
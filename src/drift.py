@@ -0,0 +1,173 @@
+"""
+Monitoreo de deriva de datos
+Compara las muestras que se analizan (muestra individual, lotes CSV y
+lecturas de cámaras) con la distribución de entrenamiento:
+- PSI sobre los deciles del entrenamiento (histograma por cortes)
+- Estadístico KS aproximado a partir de los t-digest de ambos lados
+
+La referencia se guarda al entrenar (models/drift_reference.json). El
+monitor mantiene un FeatureSketch por variable: memoria constante sin
+importar cuántas filas por día se procesen.
+"""
+
+import datetime
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+import metrics
+from sketches import FeatureSketch
+
+# Umbrales habituales de PSI: < 0.1 estable, 0.1-0.2 moderado, > 0.2 deriva
+PSI_WARNING = 0.1
+PSI_ALERT = 0.2
+KS_ALERT = 0.15
+# Filas mínimas en la ventana antes de evaluar una variable
+MIN_SAMPLES = 100
+# Lecturas ya ingeridas que se recuerdan para no contarlas dos veces
+SEEN_TOKENS = 10_000
+
+
+def build_reference(df, features: Sequence[str], bins: int = 10) -> Dict:
+    """Resumen de los datos de entrenamiento (cortes por deciles, t-digest, momentos)"""
+    return {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "rows": int(len(df)),
+        "features": {f: FeatureSketch.from_values(df[f].to_numpy(), bins=bins).to_dict() for f in features},
+    }
+
+
+def extend_reference(reference: Dict, df) -> Dict:
+    """Añade filas nuevas de entrenamiento a la referencia manteniendo sus cortes"""
+    features = {}
+    for f, data in reference["features"].items():
+        sketch = FeatureSketch.from_dict(data)
+        if f in df.columns:
+            sketch.update(df[f].to_numpy())
+        features[f] = sketch.to_dict()
+    return {**reference, "rows": reference.get("rows", 0) + int(len(df)), "features": features}
+
+
+def save_reference(reference: Dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(reference, f)
+
+
+def load_reference(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def psi(expected: np.ndarray, actual: np.ndarray, eps: float = 1e-4) -> float:
+    """Population Stability Index entre dos vectores de proporciones"""
+    e = np.clip(expected, eps, None)
+    a = np.clip(actual, eps, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def ks_statistic(reference: FeatureSketch, live: FeatureSketch, points: int = 101) -> float:
+    """Máxima diferencia entre CDFs, evaluada en los cuantiles de ambos digest"""
+    grid = np.linspace(0, 1, points)
+    xs = np.unique(np.r_[reference.digest.quantile(grid), live.digest.quantile(grid)])
+    return float(np.max(np.abs(reference.digest.cdf(xs) - live.digest.cdf(xs))))
+
+
+class DriftMonitor:
+    """
+    Ventana diaria de resúmenes por variable contra la referencia de entrenamiento.
+    Seguro para usarse desde varias sesiones de Streamlit a la vez.
+    """
+
+    def __init__(self, reference: Dict, min_samples: int = MIN_SAMPLES):
+        self.reference = {f: FeatureSketch.from_dict(d) for f, d in reference["features"].items()}
+        self.features = list(self.reference)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._last_alert: Dict[str, float] = {}
+        self.rows_by_source: Dict[str, int] = {}
+        self._new_window()
+
+    def _new_window(self):
+        self.window_date = datetime.date.today()
+        self.live = {f: FeatureSketch(s.histogram.cuts) for f, s in self.reference.items()}
+        self.rows_by_source = {}
+
+    def _rotate_if_needed(self):
+        if datetime.date.today() != self.window_date:
+            self._new_window()
+
+    def update(self, df, source: str):
+        """Añade un DataFrame (solo se usan las columnas conocidas presentes)"""
+        columns = [f for f in self.features if f in df.columns]
+        if not columns or not len(df):
+            return
+        with self._lock:
+            self._rotate_if_needed()
+            for f in columns:
+                self.live[f].update(df[f].to_numpy())
+            self.rows_by_source[source] = self.rows_by_source.get(source, 0) + len(df)
+        metrics.inc("drift_rows", len(df), source=source)
+
+    def update_once(self, token: str, df, source: str):
+        """Como update, pero ignora lecturas ya vistas (p. ej. cámara + marca de tiempo)"""
+        with self._lock:
+            if token in self._seen:
+                return
+            self._seen[token] = None
+            while len(self._seen) > SEEN_TOKENS:
+                self._seen.popitem(last=False)
+        self.update(df, source)
+
+    def report(self) -> List[Dict]:
+        """PSI, KS y estado por variable de la ventana actual"""
+        rows = []
+        with self._lock:
+            self._rotate_if_needed()
+            for f in self.features:
+                ref, live = self.reference[f], self.live[f]
+                row = {
+                    "feature": f,
+                    "n": live.count,
+                    "ref_mean": ref.moments.mean,
+                    "live_mean": live.moments.mean if live.count else None,
+                    "psi": None,
+                    "ks": None,
+                    "status": "sin datos",
+                }
+                if live.count >= self.min_samples:
+                    row["psi"] = psi(ref.histogram.proportions(), live.histogram.proportions())
+                    row["ks"] = ks_statistic(ref, live)
+                    if row["psi"] > PSI_ALERT or row["ks"] > KS_ALERT:
+                        row["status"] = "deriva"
+                    elif row["psi"] > PSI_WARNING:
+                        row["status"] = "moderada"
+                    else:
+                        row["status"] = "estable"
+                elif live.count:
+                    row["status"] = "pocos datos"
+                rows.append(row)
+        return rows
+
+    def new_alerts(self, cooldown_s: float = 3600) -> List[Dict]:
+        """Variables en deriva que no se han alertado en los últimos cooldown_s segundos"""
+        now = time.monotonic()
+        alerts = []
+        for row in self.report():
+            if row["status"] != "deriva":
+                continue
+            with self._lock:
+                last = self._last_alert.get(row["feature"])
+                if last is not None and now - last < cooldown_s:
+                    continue
+                self._last_alert[row["feature"]] = now
+            metrics.inc("drift_alerts", feature=row["feature"])
+            alerts.append(row)
+        return alerts
@@ -0,0 +1,401 @@
+"""
+ETL de datos crudos de planta (limpieza de notebooks/02_limpieza_etl.ipynb)
+Convierte un CSV crudo (exportación de planta o data/raw/water_potability.csv)
+en un dataset limpio y columnar, listo para entrenar o puntuar:
+1. Conversión de tipos: cada variable a float64 (texto no numérico -> NaN,
+   admite coma decimal); la etiqueta a entero y las filas sin etiqueta
+   válida se descartan
+2. Valores imposibles (pH fuera de 0..14, concentraciones negativas) -> NaN
+3. Valores atípicos: opcionalmente se recortan a las cercas IQR
+   (Q1 - k·IQR, Q3 + k·IQR), las mismas de detectar_outliers_iqr en el EDA
+4. Imputación por clase de Potability (mediana por defecto, o media como en
+   el notebook); sin etiqueta, con el estadístico global
+
+El archivo se procesa en dos pasadas sobre bloques de bytes independientes:
+- Pasada 1 (en paralelo, un proceso por bloque): parseo, conversión y
+  validación; cada bloque se guarda como parte temporal y devuelve sus
+  estadísticos combinables (t-digest y momentos por clase, ver sketches.py)
+- Pasada 2: con los estadísticos combinados se recorta e imputa cada parte
+  (operaciones sobre la matriz completa, sin bucles por fila ni columna) y
+  se escribe en orden al Parquet de salida
+
+La memoria depende del tamaño de bloque, no del archivo. Los bloques se
+cortan en saltos de línea: el CSV no puede tener saltos dentro de campos
+entre comillas.
+"""
+
+import argparse
+import importlib.util
+import io
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sketches import Moments, TDigest
+from test_data import columns as FEATURES
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RAW_PATH = os.path.join(BASE_DIR, '../data/raw/water_potability.csv')
+OUTPUT_PATH = os.path.join(BASE_DIR, '../data/processed/water_potability_etl.parquet')
+TARGET = 'Potability'
+
+# Rango físicamente posible de cada variable; fuera de él el valor se trata como faltante
+VALID_RANGES = {col: (0.0, np.inf) for col in FEATURES}
+VALID_RANGES['ph'] = (0.0, 14.0)
+
+STRATEGIES = ('median', 'mean')
+STRATEGY_NAMES = {'median': 'mediana', 'mean': 'media'}
+CHUNK_BYTES = 32 * 1024 * 1024
+DIGEST_COMPRESSION = 1000.0
+# Clave de los estadísticos globales (sin etiqueta o para las cercas IQR)
+ALL = 'all'
+
+PARQUET_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+
+# ---------------------------------------------------------
+# Bloques del archivo
+# ---------------------------------------------------------
+def byte_ranges(path: str, chunk_bytes: int = CHUNK_BYTES) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    Encabezado y rangos [inicio, fin) de ~chunk_bytes que terminan en salto de
+    línea, para que cada proceso parsee su bloque sin leer el resto.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline().decode('utf-8-sig').strip()
+        starts = [f.tell()]
+        while starts[-1] + chunk_bytes < size:
+            f.seek(starts[-1] + chunk_bytes)
+            f.readline()
+            if f.tell() >= size:
+                break
+            starts.append(f.tell())
+    names = [name.strip().strip('"') for name in header.split(',')]
+    return names, [(start, end) for start, end in zip(starts, starts[1:] + [size]) if end > start]
+
+
+def read_block(path: str, start: int, end: int, names: Sequence[str]) -> pd.DataFrame:
+    """Filas del rango [start, end) con los nombres del encabezado"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(data), header=None, names=list(names))
+
+
+# ---------------------------------------------------------
+# Transformaciones vectorizadas
+# ---------------------------------------------------------
+def coerce(raw: pd.DataFrame, target: Optional[str] = TARGET) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Variables a una matriz float64 (en el orden de FEATURES) y etiqueta a int8.
+
+    Returns:
+        (DataFrame limpio de tipos, conteos: valores no numéricos, fuera de rango y filas descartadas)
+    """
+    missing = [col for col in FEATURES if col not in raw.columns]
+    if missing:
+        raise ValueError(f"Faltan columnas en los datos crudos: {missing}")
+
+    # El parser de pandas ya convierte las columnas limpias; solo las que quedaron
+    # como texto (coma decimal, anotaciones del laboratorio) se convierten aquí
+    X = np.empty((len(raw), len(FEATURES)), dtype=np.float64)
+    invalid_text = np.zeros(len(FEATURES), dtype=np.int64)
+    for j, col in enumerate(FEATURES):
+        values = raw[col]
+        if not pd.api.types.is_numeric_dtype(values):
+            text = values.astype(str).str.strip().str.replace(',', '.', regex=False).where(values.notna())
+            values = pd.to_numeric(text, errors='coerce')
+            invalid_text[j] = int((text.notna() & values.isna()).sum())
+        X[:, j] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    low = np.array([VALID_RANGES[col][0] for col in FEATURES])
+    high = np.array([VALID_RANGES[col][1] for col in FEATURES])
+    out_of_range = (X < low) | (X > high)
+    X[out_of_range] = np.nan
+
+    counts = {
+        'non_numeric': dict(zip(FEATURES, invalid_text.tolist())),
+        'out_of_range': dict(zip(FEATURES, out_of_range.sum(axis=0).tolist())),
+        'dropped_rows': 0,
+    }
+    df = pd.DataFrame(X, columns=FEATURES)
+    if target and target in raw.columns:
+        y = pd.to_numeric(raw[target], errors='coerce').to_numpy()
+        valid = np.isin(y, (0, 1))
+        counts['dropped_rows'] = int((~valid).sum())
+        df = df[valid].reset_index(drop=True)
+        df[target] = y[valid].astype(np.int8)
+    return df, counts
+
+
+class ColumnStats:
+    """Estadísticos combinables de cada variable, globales y por clase"""
+
+    def __init__(self):
+        self.digests: Dict[str, Dict] = {}
+        self.moments: Dict[str, Dict] = {}
+        self.missing = dict.fromkeys(FEATURES, 0)
+        self.rows = 0
+
+    def _group(self, key):
+        if key not in self.digests:
+            self.digests[key] = {col: TDigest(DIGEST_COMPRESSION) for col in FEATURES}
+            self.moments[key] = {col: Moments() for col in FEATURES}
+        return self.digests[key], self.moments[key]
+
+    def update(self, df: pd.DataFrame, target: Optional[str] = TARGET):
+        X = df[FEATURES].to_numpy()
+        self.rows += len(X)
+        for col, n in zip(FEATURES, np.isnan(X).sum(axis=0).tolist()):
+            self.missing[col] += n
+        groups = [(ALL, X)]
+        if target and target in df.columns:
+            y = df[target].to_numpy()
+            groups += [(int(label), X[y == label]) for label in np.unique(y)]
+        for key, values in groups:
+            digests, moments = self._group(key)
+            # Un solo np.sort por grupo para todas las variables (los NaN quedan al final)
+            ordered = np.sort(values, axis=0)
+            valid = (~np.isnan(ordered)).sum(axis=0)
+            for j, col in enumerate(FEATURES):
+                column = ordered[:valid[j], j]
+                digests[col].merge(TDigest.from_sorted(column, DIGEST_COMPRESSION))
+                moments[col].update(column)
+
+    def merge(self, other: "ColumnStats"):
+        self.rows += other.rows
+        for col in FEATURES:
+            self.missing[col] += other.missing[col]
+        for key in other.digests:
+            digests, moments = self._group(key)
+            for col in FEATURES:
+                digests[col].merge(other.digests[key][col])
+                moments[col].merge(other.moments[key][col])
+
+    def fill_values(self, strategy: str = 'median') -> Dict:
+        """Valor de imputación por clase (y ALL) y variable"""
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Estrategia de imputación desconocida: {strategy} (opciones: {STRATEGIES})")
+        if strategy == 'median':
+            return {key: {col: d.quantile(0.5) for col, d in digests.items()}
+                    for key, digests in self.digests.items()}
+        return {key: {col: m.mean if m.count else np.nan for col, m in moments.items()}
+                for key, moments in self.moments.items()}
+
+    def iqr_fences(self, factor: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Cercas (inferior, superior) por variable con el IQR global"""
+        digests = self.digests[ALL]
+        q1 = np.array([digests[col].quantile(0.25) for col in FEATURES])
+        q3 = np.array([digests[col].quantile(0.75) for col in FEATURES])
+        return q1 - factor * (q3 - q1), q3 + factor * (q3 - q1)
+
+
+def impute(df: pd.DataFrame, fills: Dict, target: Optional[str] = TARGET,
+           bounds: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Recorta a `bounds` e imputa los faltantes de todas las variables en una
+    sola operación: se arma la matriz de valores de relleno de cada fila según
+    su clase y se elige con np.where.
+    """
+    X = df[FEATURES].to_numpy(dtype=np.float64, copy=True)
+    clipped = np.zeros(len(FEATURES), dtype=np.int64)
+    if bounds is not None:
+        outside = (X < bounds[0]) | (X > bounds[1])
+        clipped = outside.sum(axis=0)
+        np.clip(X, bounds[0], bounds[1], out=X)
+
+    keys = [key for key in fills if key != ALL]
+    if target and target in df.columns and keys:
+        table = np.array([[fills[key][col] for col in FEATURES] for key in keys + [ALL]])
+        # Clases sin estadísticos (no vistas en la pasada 1) usan la fila global
+        rows = df[target].map({key: i for i, key in enumerate(keys)}).fillna(len(keys)).to_numpy(dtype=np.int64)
+        fill = table[rows]
+    else:
+        fill = np.array([fills[ALL][col] for col in FEATURES])
+    np.copyto(X, np.broadcast_to(fill, X.shape), where=np.isnan(X))
+
+    out = pd.DataFrame(X, columns=FEATURES)
+    if target and target in df.columns:
+        out[target] = df[target].to_numpy()
+    return out, {'clipped': dict(zip(FEATURES, clipped.tolist()))}
+
+
+# ---------------------------------------------------------
+# Partes intermedias y salida
+# ---------------------------------------------------------
+def _write_part(df: pd.DataFrame, path: str, target: Optional[str]):
+    """Parte intermedia sin compresión: la matriz float64 y la etiqueta tal cual"""
+    arrays = {'X': df[FEATURES].to_numpy()}
+    if target:
+        arrays['y'] = df[target].to_numpy()
+    np.savez(path, **arrays)
+
+
+def _read_part(path: str, target: Optional[str]) -> pd.DataFrame:
+    with np.load(path + '.npz') as part:
+        df = pd.DataFrame(part['X'], columns=FEATURES, copy=False)
+        if target:
+            df[target] = part['y']
+    return df
+
+
+class _Output:
+    """Escritura incremental del resultado: Parquet si pyarrow está instalado, si no CSV"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer = None
+        self._first = True
+
+    def write(self, df: pd.DataFrame):
+        if PARQUET_AVAILABLE:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _extract_block(path: str, start: int, end: int, names: Sequence[str], target: Optional[str],
+                   part_path: str):
+    """Pasada 1 de un bloque (se ejecuta en un proceso del pool)"""
+    df, counts = coerce(read_block(path, start, end, names), target)
+    stats = ColumnStats()
+    stats.update(df, target)
+    _write_part(df, part_path, target)
+    return stats, counts
+
+
+def _sum_counts(total: Dict, counts: Dict):
+    for key, value in counts.items():
+        if isinstance(value, dict):
+            for col, n in value.items():
+                total.setdefault(key, {}).setdefault(col, 0)
+                total[key][col] += n
+        else:
+            total[key] = total.get(key, 0) + value
+
+
+# ---------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------
+def run(input_path: str = RAW_PATH, output_path: str = OUTPUT_PATH, strategy: str = 'median',
+        clip_iqr: Optional[float] = None, target: Optional[str] = TARGET, workers: Optional[int] = None,
+        chunk_bytes: int = CHUNK_BYTES) -> Dict:
+    """
+    Limpia `input_path` y escribe el resultado en `output_path`.
+
+    Args:
+        strategy: 'median' o 'mean' (la media reproduce el notebook)
+        clip_iqr: Factor k de las cercas IQR; None deja los atípicos como están
+        target: Columna de la etiqueta; si el archivo no la tiene se imputa con estadísticos globales
+        workers: Procesos para la pasada 1 (por defecto, uno por núcleo)
+
+    Returns:
+        Reporte con filas, tiempos, filas/s, conteos de limpieza y valores de imputación
+    """
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"El archivo {input_path} no existe.")
+    if not PARQUET_AVAILABLE and output_path.endswith('.parquet'):
+        output_path = output_path[:-len('.parquet')] + '.csv'
+        print("-> pyarrow no está instalado: la salida se escribe como CSV")
+    started = time.perf_counter()
+    names, ranges = byte_ranges(input_path, chunk_bytes)
+    target = target if target in names else None
+    workers = max(1, min(workers or os.cpu_count() or 1, len(ranges)))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix='.etl-', dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        # Pasada 1: parseo, tipos y estadísticos por bloque
+        parts = [os.path.join(workdir, f'part-{i:05d}') for i in range(len(ranges))]
+        jobs = [(input_path, start, end, names, target, part) for (start, end), part in zip(ranges, parts)]
+        if workers == 1:
+            results = [_extract_block(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_extract_block, *zip(*jobs)))
+        stats, counts = ColumnStats(), {}
+        for block_stats, block_counts in results:
+            stats.merge(block_stats)
+            _sum_counts(counts, block_counts)
+        extract_s = time.perf_counter() - started
+
+        # Pasada 2: recorte e imputación con los estadísticos de todo el archivo
+        fills = stats.fill_values(strategy)
+        bounds = stats.iqr_fences(clip_iqr) if clip_iqr is not None else None
+        output = _Output(output_path)
+        try:
+            for part in parts:
+                df, part_counts = impute(_read_part(part, target), fills, target, bounds)
+                _sum_counts(counts, part_counts)
+                output.write(df)
+        finally:
+            output.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - started
+    report = {
+        'input': input_path,
+        'output': output_path,
+        'rows': stats.rows,
+        'chunks': len(ranges),
+        'workers': workers,
+        'strategy': strategy,
+        'clip_iqr': clip_iqr,
+        'missing': stats.missing,
+        **counts,
+        'fill_values': {str(key): {col: round(float(v), 6) for col, v in values.items()}
+                        for key, values in fills.items()},
+        'extract_seconds': round(extract_s, 3),
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(stats.rows / elapsed, 1) if elapsed > 0 else None,
+    }
+    return report
+
+
+def print_report(report: Dict):
+    print(f"-> {report['rows']:,} filas limpias en {report['seconds']:.2f} s "
+          f"({report['rows_per_second']:,.0f} filas/s; {report['chunks']} bloques, {report['workers']} procesos)")
+    scope = 'por clase' if len(report['fill_values']) > 1 else 'global'
+    print(f"-> Faltantes imputados ({STRATEGY_NAMES[report['strategy']]} {scope}): "
+          + ", ".join(f"{col}={n}" for col, n in report['missing'].items() if n))
+    invalid = {col: report['non_numeric'][col] + report['out_of_range'][col] for col in FEATURES}
+    if any(invalid.values()):
+        print("-> Valores no numéricos o fuera de rango: " + ", ".join(f"{c}={n}" for c, n in invalid.items() if n))
+    if report['dropped_rows']:
+        print(f"-> Filas descartadas sin etiqueta válida: {report['dropped_rows']:,}")
+    if report['clip_iqr'] is not None:
+        print(f"-> Valores recortados a las cercas IQR (k={report['clip_iqr']}): "
+              + ", ".join(f"{col}={n}" for col, n in report['clipped'].items() if n))
+    print(f"-> Dataset guardado en {report['output']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Limpieza de datos crudos de planta")
+    parser.add_argument("input", nargs="?", default=RAW_PATH, help="CSV crudo")
+    parser.add_argument("-o", "--output", default=OUTPUT_PATH, help="Archivo de salida (.parquet)")
+    parser.add_argument("--strategy", choices=STRATEGIES, default='median', help="Imputación por clase")
+    parser.add_argument("--clip-iqr", type=float, metavar="K",
+                        help="Recortar atípicos a Q1 - K·IQR y Q3 + K·IQR (p. ej. 1.5)")
+    parser.add_argument("--workers", type=int, help="Procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_BYTES / 2 ** 20, help="Tamaño de bloque en MB")
+    args = parser.parse_args()
+    print_report(run(args.input, args.output, args.strategy, args.clip_iqr, workers=args.workers,
+                     chunk_bytes=int(args.chunk_mb * 2 ** 20)))
@@ -0,0 +1,114 @@
+"""
+Explicaciones por muestra para el RandomForest
+Contribuciones por camino de decisión (estilo Saabas): en cada nodo del
+recorrido, el cambio en la probabilidad de "potable" al bajar al hijo se
+atribuye a la variable del split. La suma de las contribuciones más el
+sesgo (probabilidad media de la raíz) es exactamente predict_proba[:, 1].
+
+Como el camino hasta cada nodo es fijo, la contribución acumulada desde la
+raíz se precalcula una sola vez para todos los nodos del bosque (matriz
+nodos x variables). Explicar un lote se reduce a buscar la hoja de cada
+árbol (tree_.apply) y sumar las filas correspondientes con un único
+producto disperso, sin recorrer caminos en Python.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+
+class ForestExplainer:
+    """Contribuciones por variable para un RandomForestClassifier (o ExtraTrees, o CompactForest) binario"""
+
+    def __init__(self, forest, feature_names: Optional[Sequence[str]] = None, positive_class=1):
+        self.forest = forest
+        self.feature_names = list(feature_names) if feature_names is not None else [
+            f"x{i}" for i in range(forest.n_features_in_)
+        ]
+        classes = list(forest.classes_)
+        self.class_index = classes.index(positive_class) if positive_class in classes else len(classes) - 1
+        self._build_node_contributions()
+
+    def _build_node_contributions(self):
+        """Contribución acumulada desde la raíz de cada nodo de cada árbol, ya promediada entre árboles"""
+        estimators = self.forest.estimators_
+        n_trees = len(estimators)
+        n_features = self.forest.n_features_in_
+        blocks, roots, offsets = [], [], [0]
+
+        for estimator in estimators:
+            tree = estimator.tree_
+            counts = tree.value[:, 0, :]
+            proba = counts[:, self.class_index] / counts.sum(axis=1)
+            roots.append(proba[0])
+
+            # Recorrido por niveles desde la raíz: C[hijo] = C[padre] + Δp en la variable del split
+            left, right = tree.children_left, tree.children_right
+            cumulative = np.zeros((tree.node_count, n_features))
+            frontier = np.array([0])
+            while frontier.size:
+                splits = frontier[left[frontier] >= 0]
+                for children in (left[splits], right[splits]):
+                    cumulative[children] = cumulative[splits]
+                    cumulative[children, tree.feature[splits]] += proba[children] - proba[splits]
+                frontier = np.concatenate([left[splits], right[splits]])
+
+            blocks.append(cumulative / n_trees)
+            offsets.append(offsets[-1] + tree.node_count)
+
+        self.node_contributions = np.vstack(blocks)
+        self.tree_offsets = np.asarray(offsets[:-1])
+        self.bias = float(np.mean(roots))
+
+    def leaves(self, X_scaled) -> np.ndarray:
+        """Índice global (en node_contributions) de la hoja alcanzada en cada árbol: filas x árboles"""
+        if hasattr(self.forest, 'leaf_nodes'):
+            # Modelo compacto: recorre todos los árboles a la vez y su numeración global es la misma
+            return self.forest.leaf_nodes(X_scaled)
+        X32 = np.ascontiguousarray(X_scaled, dtype=np.float32)
+        leaves = np.empty((X32.shape[0], len(self.tree_offsets)), dtype=np.int64)
+        for t, estimator in enumerate(self.forest.estimators_):
+            leaves[:, t] = estimator.tree_.apply(X32)
+        return leaves + self.tree_offsets
+
+    def explain(self, X_scaled) -> np.ndarray:
+        """
+        Contribuciones (filas x variables) a la probabilidad de la clase positiva
+
+        Args:
+            X_scaled: Muestras ya escaladas, como las recibe el modelo
+        """
+        leaves = self.leaves(X_scaled)
+        n_rows, n_trees = leaves.shape
+        # Una entrada por (fila, árbol): el producto suma las contribuciones de las hojas
+        selector = sparse.csr_matrix(
+            (np.ones(leaves.size), leaves.ravel(), np.arange(0, leaves.size + 1, n_trees)),
+            shape=(n_rows, self.node_contributions.shape[0])
+        )
+        return selector @ self.node_contributions
+
+    def explain_one(self, x_scaled) -> Dict[str, float]:
+        """Contribuciones de una sola muestra como {variable: contribución}"""
+        contributions = self.explain(np.asarray(x_scaled).reshape(1, -1))[0]
+        return dict(zip(self.feature_names, contributions.tolist()))
+
+    def top_factors(self, contributions: np.ndarray) -> List[str]:
+        """Variable con mayor contribución absoluta en cada fila"""
+        names = np.asarray(self.feature_names)
+        return names[np.abs(contributions).argmax(axis=1)].tolist()
+
+    def global_importance(self, X_scaled) -> Dict[str, float]:
+        """Contribución absoluta media por variable sobre un conjunto de muestras"""
+        mean_abs = np.abs(self.explain(X_scaled)).mean(axis=0)
+        return dict(zip(self.feature_names, mean_abs.tolist()))
+
+
+def load_metadata(path: str) -> Dict:
+    """Lee el JSON de metadatos guardado junto al modelo ({} si no existe)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,228 @@
+"""
+Exportación de resultados por lotes a disco
+En lugar de armar todo el CSV en memoria (to_csv().encode() guarda el texto
+y los bytes completos a la vez), los resultados se escriben por bloques de
+filas a un archivo comprimido y la descarga se sirve desde ese archivo:
+
+- csv.gz (gzip, siempre disponible), csv.zst (zstd, con pyarrow) o parquet
+- Cada bloque se serializa y comprime antes de pasar al siguiente, así la
+  memoria adicional depende de CHUNK_ROWS y no del tamaño del lote
+- Los archivos van a EXPORT_DIR (SIPCA_EXPORT_DIR, por defecto en el
+  directorio temporal) y se borran pasada MAX_AGE_SECONDS
+
+Después de puntuar, el dashboard escribe el lote en STORE_FORMAT y ya no
+guarda el DataFrame: los demás formatos se convierten desde ese archivo y
+las vistas previas (página o muestra) leen solo los bloques que las
+contienen (read_chunks). Lo que sigue dependiendo del tamaño del lote:
+- El archivo subido (Streamlit lo guarda en memoria) y el DataFrame mientras
+  se puntúa
+- La descarga: st.download_button lee el archivo completo a su almacenamiento
+  de medios en memoria al hacer clic (el tamaño comprimido, no el del lote)
+"""
+
+import gzip
+import importlib.util
+import os
+import tempfile
+import time
+from typing import Iterable, Iterator, List, Union
+
+import numpy as np
+import pandas as pd
+
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+# Formato en que se guarda el lote puntuado (se relee por grupos de filas)
+STORE_FORMAT = 'parquet' if PYARROW_AVAILABLE else 'csv.gz'
+
+CHUNK_ROWS = 50_000
+# Nivel 1: el texto de floats comprime casi igual que con 6 y en bastante menos tiempo
+GZIP_LEVEL = 1
+EXPORT_DIR = os.getenv("SIPCA_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "sipca-exports"))
+MAX_AGE_SECONDS = int(os.getenv("SIPCA_EXPORT_MAX_AGE_SECONDS", "3600"))
+
+# Extensión: (nombre para la interfaz, tipo MIME)
+FORMATS = {
+    'csv.gz': ('CSV comprimido (gzip)', 'application/gzip'),
+    'csv.zst': ('CSV comprimido (zstd)', 'application/zstd'),
+    'parquet': ('Parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def available_formats() -> List[str]:
+    """Formatos que se pueden escribir con las dependencias instaladas"""
+    if not PYARROW_AVAILABLE:
+        return ['csv.gz']
+    import pyarrow as pa
+    return [fmt for fmt in FORMATS if fmt != 'csv.zst' or pa.Codec.is_available('zstd')]
+
+
+def iter_chunks(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Bloques consecutivos de filas (vistas de df, sin copiar el resto)"""
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def read_chunks(path: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Bloques de filas de una exportación, sin cargar el archivo completo"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        with pq.ParquetFile(path) as pf:
+            for batch in pf.iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas()
+    elif path.endswith('.csv.zst'):
+        import pyarrow as pa
+        with pa.input_stream(path, compression='zstd') as stream, pd.read_csv(stream, chunksize=chunk_rows) as reader:
+            yield from reader
+    else:
+        with pd.read_csv(path, chunksize=chunk_rows) as reader:
+            yield from reader
+
+
+def _write_csv(chunks: Iterable[pd.DataFrame], path: str, fmt: str):
+    if fmt == 'csv.zst':
+        import pyarrow as pa
+        out = pa.CompressedOutputStream(path, 'zstd')
+    else:
+        out = gzip.open(path, 'wb', compresslevel=GZIP_LEVEL)
+    with out:
+        for i, chunk in enumerate(chunks):
+            out.write(chunk.to_csv(index=False, header=i == 0).encode('utf-8'))
+
+
+def _write_parquet(chunks: Iterable[pd.DataFrame], path: str):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            elif not table.schema.equals(writer.schema, check_metadata=False):
+                # Columnas de texto con bloques vacíos o todos nulos
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write(data: Union[pd.DataFrame, Iterable[pd.DataFrame]], path: str, fmt: str,
+          chunk_rows: int = CHUNK_ROWS) -> str:
+    """
+    Escribe en `path` bloque a bloque (archivo temporal y reemplazo atómico).
+    `data` es un DataFrame o bloques ya separados, p. ej. read_chunks de otra exportación.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt}. Opciones: {list(FORMATS)}")
+    chunks = iter_chunks(data, chunk_rows) if isinstance(data, pd.DataFrame) else data
+    tmp = path + '.tmp'
+    try:
+        if fmt == 'parquet':
+            _write_parquet(chunks, tmp)
+        else:
+            _write_csv(chunks, tmp, fmt)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+
+def cleanup(export_dir: str = EXPORT_DIR, max_age_seconds: float = MAX_AGE_SECONDS) -> int:
+    """Borra las exportaciones más antiguas que max_age_seconds; devuelve cuántas"""
+    removed = 0
+    limit = time.time() - max_age_seconds
+    try:
+        entries = list(os.scandir(export_dir))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < limit:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def remove(paths: Iterable[str]):
+    """Borra exportaciones que ya no se van a descargar (ignora las que no existan)"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def export(data: Union[pd.DataFrame, Iterable[pd.DataFrame]], fmt: str, name: str = 'water_potability_results',
+           export_dir: str = EXPORT_DIR, chunk_rows: int = CHUNK_ROWS) -> str:
+    """Escribe data (DataFrame o bloques) en un archivo nuevo de export_dir y devuelve su ruta"""
+    os.makedirs(export_dir, exist_ok=True)
+    cleanup(export_dir)
+    fd, path = tempfile.mkstemp(prefix=f"{name}-", suffix=f".{fmt}", dir=export_dir)
+    os.close(fd)
+    try:
+        return write(data, path, fmt, chunk_rows)
+    except Exception:
+        os.remove(path)
+        raise
+
+
+def download_name(path: str, name: str = 'water_potability_results') -> str:
+    """Nombre del archivo descargado (sin el sufijo aleatorio de mkstemp)"""
+    fmt = next((f for f in FORMATS if path.endswith('.' + f)), os.path.splitext(path)[1].lstrip('.'))
+    return f"{name}.{fmt}"
+
+
+# ---------------------------------------------------------
+# Vistas acotadas para la vista previa (leídas de la exportación)
+# ---------------------------------------------------------
+def page_count(n_rows: int, page_rows: int) -> int:
+    return max(1, -(-n_rows // page_rows))
+
+
+def read_rows(path: str, rows: np.ndarray, chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Filas `rows` (índices crecientes) de una exportación; solo se leen los bloques
+    (grupos de filas en Parquet) que las contienen. El índice es el número de fila.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    parts, offset = [], 0
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        with pq.ParquetFile(path) as pf:
+            for group in range(pf.num_row_groups):
+                n = pf.metadata.row_group(group).num_rows
+                selected = rows[(rows >= offset) & (rows < offset + n)] - offset
+                if len(selected):
+                    parts.append(pf.read_row_group(group).to_pandas().iloc[selected])
+                offset += n
+    else:
+        for chunk in read_chunks(path, chunk_rows):
+            selected = rows[(rows >= offset) & (rows < offset + len(chunk))] - offset
+            if len(selected):
+                parts.append(chunk.iloc[selected])
+            offset += len(chunk)
+            if len(rows) and offset > rows[-1]:
+                break
+    if not parts:
+        return pd.DataFrame()
+    out = pd.concat(parts)
+    out.index = rows[:len(out)]
+    return out
+
+
+def page(path: str, number: int, page_rows: int, n_rows: int) -> pd.DataFrame:
+    """Página `number` (desde 1) de page_rows filas de una exportación de n_rows filas"""
+    start = (min(max(number, 1), page_count(n_rows, page_rows)) - 1) * page_rows
+    return read_rows(path, np.arange(start, min(start + page_rows, n_rows)))
+
+
+def sample(path: str, sample_rows: int, n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """sample_rows filas al azar de una exportación de n_rows filas, en el orden del archivo"""
+    if n_rows <= sample_rows:
+        return read_rows(path, np.arange(n_rows))
+    return read_rows(path, np.sort(np.random.default_rng(seed).choice(n_rows, sample_rows, replace=False)))
+
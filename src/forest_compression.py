@@ -0,0 +1,204 @@
+"""
+Compresión del bosque para gateways con poca memoria
+Genera, a partir del RandomForest entrenado, una variante en el formato
+compacto (compact_forest) mucho más pequeña:
+1. Profundidad máxima: los nodos bajo el límite se convierten en hojas con
+   la distribución de clases del nodo
+2. Umbrales de 16 bits: por variable, una grilla uniforme entre el menor y
+   el mayor umbral; la muestra se cuantiza con la misma grilla y se compara
+   en enteros (equivale a bajar cada umbral al punto de grilla anterior)
+3. Hojas de 8 bits: probabilidades por clase en 0..255
+4. Poda de nodos: un split cuyos dos hijos son hojas con la misma
+   probabilidad cuantizada se reemplaza por una hoja
+5. Poda de árboles: selección greedy, sobre un conjunto de validación, de
+   los árboles ya comprimidos que mejor reproducen al bosque completo
+
+El resultado lo carga compact_forest.load y se usa con la misma API
+(predict, predict_proba, explicaciones).
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import compact_forest
+
+DEFAULT_MAX_DEPTH = 8
+DEFAULT_MAX_TREES = 50
+# Mínimo de árboles: con menos, la selección se ajusta demasiado a la validación
+MIN_TREES = 20
+# Pérdida de accuracy aceptada al podar árboles
+ACCURACY_TOLERANCE = 0.005
+# Códigos de umbral 0..THRESHOLD_LEVELS; las muestras usan además THRESHOLD_LEVELS + 1
+# (por encima del mayor umbral), que cabe en uint16
+THRESHOLD_LEVELS = 65534
+LEAF_LEVELS = 255
+
+
+def _positive_index(forest) -> int:
+    classes = list(forest.classes_)
+    return classes.index(1) if 1 in classes else len(classes) - 1
+
+
+def select_trees(P: np.ndarray, y: np.ndarray, max_trees: int = DEFAULT_MAX_TREES,
+                 min_trees: int = MIN_TREES, tolerance: float = ACCURACY_TOLERANCE) -> Tuple[List[int], List[float]]:
+    """
+    Selección greedy hacia adelante: en cada paso agrega el árbol que más baja
+    el error cuadrático (Brier) del promedio. Se queda con el menor número de
+    árboles (al menos min_trees) cuya accuracy queda dentro de `tolerance` de
+    la de todos los árboles.
+
+    Args:
+        P: P(positiva) de cada árbol para cada muestra de validación (árboles x muestras)
+        y: Etiquetas booleanas (True = positiva)
+
+    Returns:
+        (índices de los árboles elegidos, accuracy tras agregar cada uno)
+    """
+    target = float(np.mean((P.mean(axis=0) > 0.5) == y))
+    selected, curve = [], []
+    remaining = np.arange(len(P))
+    total = np.zeros(P.shape[1])
+    for k in range(1, min(max_trees, len(P)) + 1):
+        candidates = (total + P[remaining]) / k
+        best = int(np.argmin(((candidates - y) ** 2).mean(axis=1)))
+        tree = int(remaining[best])
+        selected.append(tree)
+        curve.append(float(np.mean((candidates[best] > 0.5) == y)))
+        total += P[tree]
+        remaining = np.delete(remaining, best)
+
+    reached = [k for k, acc in enumerate(curve, 1) if k >= min(min_trees, len(curve)) and acc >= target - tolerance]
+    keep = reached[0] if reached else len(curve)
+    return selected[:keep], curve
+
+
+def threshold_grid(trees, n_features: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(inicio, paso) por variable de la grilla de umbrales de 16 bits"""
+    low = np.full(n_features, np.inf)
+    high = np.full(n_features, -np.inf)
+    for tree in trees:
+        split = tree.children_left >= 0
+        np.minimum.at(low, tree.feature[split], tree.threshold[split])
+        np.maximum.at(high, tree.feature[split], tree.threshold[split])
+    unused = ~np.isfinite(low)
+    low[unused], high[unused] = 0.0, 0.0
+    step = (high - low) / THRESHOLD_LEVELS
+    step[step == 0] = 1.0
+    return low, step
+
+
+def _rebuild_tree(tree, max_depth: int, offset: np.ndarray, scale: np.ndarray) -> Dict[str, list]:
+    """Árbol con profundidad limitada, umbrales/hojas cuantizados y splits redundantes eliminados"""
+    counts = tree.value[:, 0, :]
+    leaf_values = np.rint(counts / counts.sum(axis=1, keepdims=True) * LEAF_LEVELS).astype(np.uint8)
+    left, right = tree.children_left, tree.children_right
+    out = {'feature': [], 'threshold': [], 'children_left': [], 'children_right': [], 'value': []}
+
+    def add_leaf(index, node):
+        out['feature'][index] = compact_forest.TREE_UNDEFINED
+        out['threshold'][index] = 0
+        out['children_left'][index] = compact_forest.TREE_LEAF
+        out['children_right'][index] = compact_forest.TREE_LEAF
+        out['value'][index] = leaf_values[node]
+
+    def visit(node, depth):
+        index = len(out['feature'])
+        for column in out.values():
+            column.append(None)
+        if left[node] < 0 or depth >= max_depth:
+            add_leaf(index, node)
+            return index
+        l_index = visit(left[node], depth + 1)
+        r_index = visit(right[node], depth + 1)
+        both_leaves = out['feature'][l_index] < 0 and out['feature'][r_index] < 0
+        if both_leaves and np.array_equal(out['value'][l_index], out['value'][r_index]):
+            # Los dos hijos predicen lo mismo: el split no aporta
+            value = out['value'][l_index]
+            for column in out.values():
+                del column[l_index:]
+            add_leaf(index, node)
+            out['value'][index] = value
+            return index
+        feature = int(tree.feature[node])
+        out['feature'][index] = feature
+        out['threshold'][index] = int(np.clip(np.floor((tree.threshold[node] - offset[feature]) / scale[feature]),
+                                              0, THRESHOLD_LEVELS))
+        out['children_left'][index] = l_index
+        out['children_right'][index] = r_index
+        out['value'][index] = leaf_values[node]  # las explicaciones usan la probabilidad de cada nodo
+        return index
+
+    visit(0, 0)
+    return out
+
+
+def _stack(trees: List[Dict[str, list]]) -> Dict[str, np.ndarray]:
+    """Concatena árboles reconstruidos con los tipos reducidos del formato cuantizado"""
+    sizes = np.array([len(t['feature']) for t in trees])
+    child_dtype = np.int16 if sizes.max() <= np.iinfo(np.int16).max else np.int32
+    return {
+        'feature': np.concatenate([t['feature'] for t in trees]).astype(np.int16),
+        'threshold': np.concatenate([t['threshold'] for t in trees]).astype(np.uint16),
+        'children_left': np.concatenate([t['children_left'] for t in trees]).astype(child_dtype),
+        'children_right': np.concatenate([t['children_right'] for t in trees]).astype(child_dtype),
+        'value': np.vstack([np.stack(t['value']) for t in trees]).astype(np.uint8),
+        'roots': np.r_[0, np.cumsum(sizes)[:-1]].astype(np.int32),
+    }
+
+
+def compress(forest, X_val, y_val, max_depth: int = DEFAULT_MAX_DEPTH, max_trees: int = DEFAULT_MAX_TREES,
+             min_trees: int = MIN_TREES, tolerance: float = ACCURACY_TOLERANCE) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """
+    Arreglos del bosque comprimido (para compact_forest.save) y encabezado extra
+
+    Args:
+        forest: RandomForestClassifier ajustado
+        X_val, y_val: Validación para elegir los árboles (ya escalada, como la recibe el modelo)
+    """
+    # 1. Todos los árboles con profundidad limitada y cuantizados: se eligen
+    #    los árboles por cómo predicen ya comprimidos
+    trees = [estimator.tree_ for estimator in forest.estimators_]
+    offset, scale = threshold_grid(trees, forest.n_features_in_)
+    rebuilt = [_rebuild_tree(tree, max_depth, offset, scale) for tree in trees]
+    quantization = {
+        'offset': offset.tolist(),
+        'scale': scale.tolist(),
+        'threshold_levels': THRESHOLD_LEVELS,
+        'leaf_levels': LEAF_LEVELS,
+    }
+
+    # 2. Predicción de cada árbol comprimido sobre la validación
+    header = {'classes': np.asarray(forest.classes_).tolist(), 'n_features': int(forest.n_features_in_),
+              'feature_importances': np.asarray(forest.feature_importances_).tolist(),
+              'quantization': quantization}
+    candidate = compact_forest.CompactForest(header, _stack(rebuilt))
+    positive = _positive_index(forest)
+    values = candidate.value[candidate.leaf_nodes(X_val)].astype(np.float64)  # muestras x árboles x clases
+    P = (values[:, :, positive] / values.sum(axis=2)).T
+    y = np.asarray(y_val) == forest.classes_[positive]
+
+    # 3. Poda de árboles
+    selected, curve = select_trees(P, y, max_trees, min_trees, tolerance)
+    arrays = _stack([rebuilt[t] for t in selected])
+    extra = {
+        'max_depth': int(min(max_depth, compact_forest.max_depth(forest))),
+        'quantization': quantization,
+        'compression': {
+            'source_trees': len(trees),
+            'trees': len(selected),
+            'max_depth': max_depth,
+            'source_nodes': int(sum(tree.node_count for tree in trees)),
+            'nodes': int(len(arrays['feature'])),
+            'selection_accuracy': curve[len(selected) - 1],
+        },
+    }
+    return arrays, extra
+
+
+def save_compressed(forest, path: str, X_val, y_val, feature_names: Optional[Sequence[str]] = None,
+                    **options) -> Dict:
+    """Comprime y guarda el bosque; devuelve el resumen de la compresión"""
+    arrays, extra = compress(forest, X_val, y_val, **options)
+    compact_forest.save(forest, path, feature_names, arrays=arrays, extra=extra)
+    return extra['compression']
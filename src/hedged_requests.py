@@ -0,0 +1,240 @@
+"""
+Solicitudes con cobertura (hedged requests) para OpenRouter
+Lanza el modelo principal y, si tarda más que un umbral, inicia un modelo
+de respaldo en paralelo. Se usa la primera respuesta válida y el resto se
+descarta. El orden de los modelos se ajusta con una puntuación de salud
+calculada a partir de la latencia y la tasa de error observadas.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Latencia asumida para modelos sin observaciones (favorece explorarlos)
+DEFAULT_LATENCY_S = 5.0
+# Segundos de penalización por tasa de error en la puntuación de salud
+# (un modelo que falla rápido no debe quedar por delante de uno sano)
+ERROR_PENALTY_S = 10.0
+
+
+class ModelHealth:
+    """Latencia y tasa de error de un modelo como promedios móviles exponenciales"""
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.cooldown_until = 0.0
+        self.requests = 0
+
+    def record(self, latency: float, ok: bool):
+        self.requests += 1
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += self.alpha * (latency - self.latency_ewma)
+        self.error_ewma += self.alpha * ((0.0 if ok else 1.0) - self.error_ewma)
+
+    def score(self) -> float:
+        """Costo esperado en segundos: menor es mejor"""
+        latency = self.latency_ewma if self.latency_ewma is not None else DEFAULT_LATENCY_S
+        return latency + ERROR_PENALTY_S * self.error_ewma
+
+    def in_cooldown(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+
+class ModelHealthTracker:
+    """Puntuaciones de salud por modelo, compartidas entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._health: Dict[str, ModelHealth] = {}
+
+    def _get(self, model: str) -> ModelHealth:
+        if model not in self._health:
+            self._health[model] = ModelHealth()
+        return self._health[model]
+
+    def record_success(self, model: str, latency: float):
+        with self._lock:
+            self._get(model).record(latency, ok=True)
+
+    def record_failure(self, model: str, latency: float, cooldown: float = 0.0):
+        """Registra un error; cooldown (s) aparta al modelo tras un rate limit (429)"""
+        with self._lock:
+            health = self._get(model)
+            health.record(latency, ok=False)
+            if cooldown:
+                health.cooldown_until = max(health.cooldown_until, time.monotonic() + cooldown)
+
+    def expected_latency(self, model: str) -> Optional[float]:
+        with self._lock:
+            health = self._health.get(model)
+            return health.latency_ewma if health else None
+
+    def ordered(self, models: List[str]) -> List[str]:
+        """Ordena los modelos por salud; los que están en cooldown van al final"""
+        with self._lock:
+            health = {m: self._get(m) for m in models}
+            # sorted es estable: con igual puntuación se respeta el orden configurado
+            return sorted(models, key=lambda m: (health[m].in_cooldown(), health[m].score()))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Estado actual de cada modelo (para depuración o métricas)"""
+        with self._lock:
+            return {
+                m: {
+                    "latency_ewma_s": h.latency_ewma,
+                    "error_rate": round(h.error_ewma, 3),
+                    "score": round(h.score(), 3),
+                    "cooldown": h.in_cooldown(),
+                    "requests": h.requests,
+                }
+                for m, h in self._health.items()
+            }
+
+
+def _retry_after_seconds(response, default: float = 2.0) -> float:
+    try:
+        return float(response.headers.get("Retry-After", default))
+    except (TypeError, ValueError):
+        return default
+
+
+class HedgedRequester:
+    """
+    Cliente HTTP con una sesión compartida (pool de conexiones) que prueba
+    una lista de modelos con solicitudes cubiertas.
+
+    Los hilos no se pueden interrumpir a mitad de una solicitud: las
+    solicitudes perdedoras se marcan como canceladas y su respuesta se
+    cierra en cuanto llega, liberando la conexión al pool.
+    """
+
+    def __init__(self, tracker: Optional[ModelHealthTracker] = None, max_parallel: int = 3,
+                 min_hedge_delay: float = 1.5, timeout: float = 30):
+        """
+        Args:
+            tracker: Puntuaciones de salud (se crea uno nuevo si no se indica)
+            max_parallel: Solicitudes simultáneas como máximo
+            min_hedge_delay: Espera mínima (s) antes de lanzar un respaldo
+            timeout: Timeout por solicitud (s)
+        """
+        self.tracker = tracker or ModelHealthTracker()
+        self.max_parallel = max_parallel
+        self.min_hedge_delay = min_hedge_delay
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_parallel * 2)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_parallel * 2, thread_name_prefix="hedged")
+
+    def hedge_delay(self, model: str) -> float:
+        """Umbral para lanzar el respaldo: 1.5x la latencia habitual del modelo"""
+        expected = self.tracker.expected_latency(model)
+        if expected is None:
+            return max(self.min_hedge_delay, DEFAULT_LATENCY_S / 2)
+        return max(self.min_hedge_delay, 1.5 * expected)
+
+    def _attempt(self, model, url, headers, payload, stream, cancelled):
+        start = time.perf_counter()
+        try:
+            response = self.session.post(url, headers=headers, data=json.dumps(payload),
+                                         timeout=self.timeout, stream=stream)
+        except requests.exceptions.Timeout:
+            self.tracker.record_failure(model, time.perf_counter() - start)
+            return model, None, "Timeout"
+        except requests.exceptions.RequestException as e:
+            self.tracker.record_failure(model, time.perf_counter() - start)
+            return model, None, str(e)
+
+        elapsed = time.perf_counter() - start
+        if response.status_code == 200:
+            self.tracker.record_success(model, elapsed)
+            if cancelled.is_set():
+                response.close()
+                return model, None, "Cancelada"
+            return model, response, None
+
+        cooldown = _retry_after_seconds(response) if response.status_code == 429 else 0.0
+        self.tracker.record_failure(model, elapsed, cooldown=cooldown)
+        response.close()
+        return model, None, f"HTTP {response.status_code}"
+
+    def post(self, url: str, headers: Dict[str, str], models: List[str],
+             build_payload: Callable[[str], Dict], stream: bool = False, hedge: bool = True
+             ) -> Tuple[Optional[str], Optional[requests.Response], Optional[str]]:
+        """
+        Envía la solicitud probando la lista de modelos
+
+        Args:
+            url: Endpoint de la API
+            headers: Cabeceras HTTP
+            models: Modelos candidatos (se reordenan por salud)
+            build_payload: Función modelo -> cuerpo JSON de la solicitud
+            stream: Si True, la respuesta se devuelve sin leer el cuerpo (SSE)
+            hedge: Si False, los modelos se prueban uno a uno (sin respaldo en paralelo)
+
+        Returns:
+            (modelo, respuesta, último_error): respuesta es None si ningún modelo respondió
+        """
+        pending_models = self.tracker.ordered(models)
+        limit = self.max_parallel if hedge else 1
+        cancelled = threading.Event()
+        running = {}
+        last_error = None
+
+        def launch():
+            model = pending_models.pop(0)
+            future = self._executor.submit(self._attempt, model, url, headers,
+                                           build_payload(model), stream, cancelled)
+            running[future] = model
+            return time.monotonic() + self.hedge_delay(model)
+
+        deadline = launch()
+
+        while running:
+            can_hedge = bool(pending_models) and len(running) < limit
+            timeout = max(0.0, deadline - time.monotonic()) if can_hedge else None
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            winner = None
+            for future in done:
+                running.pop(future)
+                model, response, error = future.result()
+                if response is None:
+                    last_error = error
+                elif winner is None:
+                    winner = model, response
+                else:
+                    # Otra respuesta válida en la misma ronda: liberar su conexión al pool
+                    response.close()
+            if winner is not None:
+                # Primera respuesta válida: cancelar el resto
+                cancelled.set()
+                for loser in running:
+                    loser.add_done_callback(_close_response)
+                return winner[0], winner[1], None
+
+            # Siguiente modelo si algo falló o si se superó el umbral de latencia
+            if pending_models and len(running) < limit and (done or time.monotonic() >= deadline):
+                deadline = launch()
+
+        return None, None, last_error
+
+
+def _close_response(future):
+    """Cierra la respuesta de una solicitud que perdió la carrera"""
+    if future.cancelled():
+        return
+    _, response, _ = future.result()
+    if response is not None:
+        response.close()
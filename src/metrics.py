@@ -0,0 +1,308 @@
+"""
+Instrumentación ligera de las rutas críticas
+- Contadores, histogramas y cronómetros por etapa (carga de modelo, escalado,
+  predicción, Telegram, visión, chatbot)
+- Latencias p50/p95/p99 sobre una ventana de observaciones recientes
+- Exportación en formato de texto de Prometheus desde un endpoint local
+
+Desactivado por defecto: con SIPCA_METRICS distinto de "1", timer() devuelve
+un context manager vacío compartido y inc()/observe() retornan de inmediato.
+
+Importar siempre como `import metrics` (sin el prefijo src.): el registro es
+estado del módulo y debe ser el mismo para app.py y los módulos de src.
+"""
+
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ENABLED = os.getenv('SIPCA_METRICS', '0') == '1'
+METRICS_PORT = int(os.getenv('SIPCA_METRICS_PORT', '9108'))
+PREFIX = 'sipca_'
+
+# Límites (segundos) de los buckets de latencia: de 0.5 ms a 60 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+# Observaciones recientes por serie usadas para calcular los cuantiles
+QUANTILE_WINDOW = 1024
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(key) + list((extra or {}).items())
+    if not pairs:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    """Contador monótono con etiquetas"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def expose(self):
+        with self._lock:
+            values = dict(self._values)
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        lines += [f'{self.name}{_format_labels(k)} {v:g}' for k, v in sorted(values.items())]
+        return lines
+
+
+class Gauge:
+    """Valor instantáneo con etiquetas (p. ej. la versión activa del modelo)"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def expose(self):
+        with self._lock:
+            values = dict(self._values)
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        lines += [f'{self.name}{_format_labels(k)} {v:g}' for k, v in sorted(values.items())]
+        return lines
+
+
+class _Series:
+    """Buckets acumulados, suma, conteo y ventana reciente de una serie del histograma"""
+
+    __slots__ = ('buckets', 'total', 'count', 'window')
+
+    def __init__(self, n_buckets: int):
+        self.buckets = [0] * (n_buckets + 1)  # el último es +Inf
+        self.total = 0.0
+        self.count = 0
+        self.window = deque(maxlen=QUANTILE_WINDOW)
+
+
+class Histogram:
+    """Histograma de latencias con buckets fijos y cuantiles sobre una ventana"""
+
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.bounds = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series: Dict[LabelKey, _Series] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.bounds))
+            series.buckets[bisect.bisect_left(self.bounds, value)] += 1
+            series.total += value
+            series.count += 1
+            series.window.append(value)
+
+    def quantiles(self, **labels) -> Dict[float, float]:
+        """p50/p95/p99 de las observaciones recientes de una serie"""
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            window = sorted(series.window) if series else []
+        return _quantiles(window)
+
+    def expose(self):
+        with self._lock:
+            snapshot = {k: (list(s.buckets), s.total, s.count, sorted(s.window))
+                        for k, s in self._series.items()}
+
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for key, (buckets, total, count, _) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, n in zip(self.bounds + (float('inf'),), buckets):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(f'{self.name}_bucket{_format_labels(key, {"le": le})} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {total:.6f}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {count}')
+
+        # Los cuantiles van en un gauge aparte: Prometheus no admite cuantiles en un histograma
+        quantile_name = f'{self.name}_quantile'
+        lines += [f'# HELP {quantile_name} Cuantiles de las últimas {QUANTILE_WINDOW} observaciones',
+                  f'# TYPE {quantile_name} gauge']
+        for key, (_, _, _, window) in sorted(snapshot.items()):
+            for q, value in _quantiles(window).items():
+                lines.append(f'{quantile_name}{_format_labels(key, {"quantile": f"{q:g}"})} {value:.6f}')
+        return lines
+
+
+def _quantiles(ordered) -> Dict[float, float]:
+    if not ordered:
+        return {}
+    last = len(ordered) - 1
+    return {q: ordered[min(last, int(round(q * last)))] for q in QUANTILES}
+
+
+# ---------------------------------------------------------
+# Registro global
+# ---------------------------------------------------------
+STAGE_LATENCY = Histogram(f'{PREFIX}stage_duration_seconds', 'Duración de cada etapa instrumentada')
+STAGE_ERRORS = Counter(f'{PREFIX}stage_errors_total', 'Errores por etapa y tipo')
+EVENTS = Counter(f'{PREFIX}events_total', 'Eventos de la aplicación')
+MODEL_INFO = Gauge(f'{PREFIX}model_info', 'Versión activa del modelo (valor: hora de carga, epoch)')
+_REGISTRY = [STAGE_LATENCY, STAGE_ERRORS, EVENTS, MODEL_INFO]
+
+
+class _NoopTimer:
+    """Context manager vacío usado cuando las métricas están desactivadas"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def fail(self, reason: str):
+        pass
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+class _StageTimer:
+    """Mide una etapa; una excepción o fail() la cuentan como error"""
+
+    __slots__ = ('stage', 'labels', 'start', 'failed')
+
+    def __init__(self, stage: str, labels: Dict[str, str]):
+        self.stage = stage
+        self.labels = labels
+        self.failed = False
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_LATENCY.observe(time.perf_counter() - self.start, stage=self.stage, **self.labels)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(stage=self.stage, reason=exc_type.__name__, **self.labels)
+        return False
+
+    def fail(self, reason: str):
+        """Marca la etapa como fallida sin excepción (p. ej. una respuesta HTTP de error)"""
+        if not self.failed:
+            self.failed = True
+            STAGE_ERRORS.inc(stage=self.stage, reason=reason, **self.labels)
+
+
+def timer(stage: str, **labels):
+    """
+    Cronómetro de una etapa: `with metrics.timer("predict"): ...`
+
+    Registra la duración en sipca_stage_duration_seconds{stage=...} y cuenta
+    las excepciones en sipca_stage_errors_total.
+    """
+    if not ENABLED:
+        return _NOOP_TIMER
+    return _StageTimer(stage, labels)
+
+
+def observe(stage: str, seconds: float, **labels):
+    """Registra una duración medida por fuera (p. ej. tiempo al primer token)"""
+    if ENABLED:
+        STAGE_LATENCY.observe(seconds, stage=stage, **labels)
+
+
+def record_error(stage: str, reason: str, **labels):
+    """Cuenta un error de una etapa (los que la UI muestra con st.error)"""
+    if ENABLED:
+        STAGE_ERRORS.inc(stage=stage, reason=reason, **labels)
+
+
+def inc(event: str, amount: float = 1.0, **labels):
+    """Incrementa el contador de un evento (alertas enviadas, reruns, etc.)"""
+    if ENABLED:
+        EVENTS.inc(amount, event=event, **labels)
+
+
+def set_model_version(version: str):
+    """Publica la versión activa del modelo como sipca_model_info{version=...}"""
+    if ENABLED:
+        MODEL_INFO.clear()
+        MODEL_INFO.set(time.time(), version=version)
+
+
+def stage_quantiles(stage: str, **labels) -> Dict[float, float]:
+    """p50/p95/p99 (segundos) de una etapa"""
+    return STAGE_LATENCY.quantiles(stage=stage, **labels)
+
+
+def render_prometheus() -> str:
+    """Todas las métricas en formato de texto de Prometheus (versión 0.0.4)"""
+    lines = []
+    for metric in _REGISTRY:
+        lines += metric.expose()
+    return '\n'.join(lines) + '\n'
+
+
+# ---------------------------------------------------------
+# Endpoint HTTP
+# ---------------------------------------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = '127.0.0.1'):
+    """
+    Sirve /metrics en un hilo en segundo plano
+
+    Returns:
+        El servidor, o None si las métricas están desactivadas
+    """
+    if not ENABLED:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrics-server').start()
+    print(f"-> Métricas disponibles en http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,246 @@
+"""
+Comparación de modelos candidatos (notebooks/03_entrenamiento.ipynb como script)
+Ajusta varios clasificadores sobre la misma partición y escribe una tabla
+de posiciones con las métricas del notebook, el tiempo de ajuste y el de
+predicción.
+
+- Los datos se dividen y escalan una sola vez; las matrices se guardan como
+  .npy y cada proceso las abre con np.load(mmap_mode='r'), así todos leen
+  las mismas páginas en lugar de recibir una copia serializada
+- Los candidatos se ajustan en paralelo en un pool de procesos
+- Cada resultado (modelo y métricas) se guarda bajo el hash de su
+  configuración y de los datos: al repetir la comparación solo se ajustan
+  los candidatos nuevos o modificados
+
+Los candidatos se describen como {"name", "estimator": "modulo:Clase", "params"};
+con --config se pasa una lista en JSON en lugar de CANDIDATES.
+"""
+
+import argparse
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.preprocessing import StandardScaler
+
+import balancing
+import preprocessing as prep
+import risk
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, '../data/processed/water_potability_cleaned.csv')
+OUTPUT_DIR = os.path.join(BASE_DIR, '../models/compare')
+CACHE_DIR = 'cache'
+LEADERBOARD_FILE = 'leaderboard.csv'
+TARGET = 'Potability'
+
+CANDIDATES = [
+    {"name": "Random Forest", "estimator": "sklearn.ensemble:RandomForestClassifier",
+     "params": {"n_estimators": 100, "random_state": 42}},
+    {"name": "Extra Trees", "estimator": "sklearn.ensemble:ExtraTreesClassifier",
+     "params": {"n_estimators": 100, "random_state": 42}},
+    {"name": "Hist Gradient Boosting", "estimator": "sklearn.ensemble:HistGradientBoostingClassifier",
+     "params": {"random_state": 42}},
+    {"name": "Regresión Logística", "estimator": "sklearn.linear_model:LogisticRegression",
+     "params": {"max_iter": 1000}},
+]
+if importlib.util.find_spec("xgboost") is not None:
+    CANDIDATES.insert(1, {"name": "XGBoost", "estimator": "xgboost:XGBClassifier",
+                          "params": {"n_estimators": 100, "random_state": 42, "eval_metric": "logloss"}})
+
+# Columnas de la tabla, en el orden y con los nombres del notebook
+METRICS = ['Accuracy', 'Precision (Clase 1 (Potable))', 'Recall (Clase 1 (Potable))', 'F1-Score', 'ROC-AUC']
+
+
+def _estimator_class(path: str):
+    module, _, name = path.partition(':')
+    return getattr(importlib.import_module(module), name)
+
+
+def _library_version(path: str) -> str:
+    root = sys.modules[importlib.import_module(path.partition(':')[0]).__name__.split('.')[0]]
+    return getattr(root, '__version__', '')
+
+
+def config_hash(spec: Dict, data_hash: str) -> str:
+    """Hash del candidato (clase, parámetros y versión de la librería) y de los datos"""
+    payload = json.dumps({
+        "estimator": spec["estimator"],
+        "params": spec.get("params", {}),
+        "version": _library_version(spec["estimator"]),
+        "data": data_hash,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+# ---------------------------------------------------------
+# Datos compartidos
+# ---------------------------------------------------------
+def prepare_data(data_path: str, workdir: str, test_size: float = 0.2, random_state: int = 42,
+                 balance: bool = False) -> str:
+    """
+    Divide, balancea (opcional, solo entrenamiento) y escala una vez; guarda
+    X/y de entrenamiento y prueba como .npy en `workdir`.
+
+    Returns:
+        Hash de las cuatro matrices (parte de la clave de caché)
+    """
+    df = prep.load_data(data_path)
+    X_train, X_test, y_train, y_test = prep.split_data(df, TARGET, test_size=test_size, random_state=random_state)
+    if balance:
+        X_train, y_train = balancing.balance_frame(X_train, y_train)
+    scaler = StandardScaler()
+    arrays = {
+        'X_train': scaler.fit_transform(X_train),
+        'X_test': scaler.transform(X_test),
+        'y_train': y_train.to_numpy(),
+        'y_test': y_test.to_numpy(),
+    }
+    digest = hashlib.sha256()
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        np.save(os.path.join(workdir, f'{name}.npy'), array)
+        digest.update(name.encode('utf-8'))
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def _load(workdir: str, name: str) -> np.ndarray:
+    return np.load(os.path.join(workdir, f'{name}.npy'), mmap_mode='r')
+
+
+# ---------------------------------------------------------
+# Ajuste de un candidato (en un proceso del pool)
+# ---------------------------------------------------------
+def fit_candidate(spec: Dict, workdir: str, cache_path: str) -> Dict:
+    """Ajusta y evalúa un candidato; guarda el modelo y el resultado en cache_path"""
+    X_train, y_train = _load(workdir, 'X_train'), _load(workdir, 'y_train')
+    X_test, y_test = _load(workdir, 'X_test'), _load(workdir, 'y_test')
+    model = _estimator_class(spec["estimator"])(**spec.get("params", {}))
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred, proba, _ = risk.predict_scores(model, X_test)
+    predict_s = time.perf_counter() - start
+
+    result = {
+        "Modelo": spec["name"],
+        "Accuracy": accuracy_score(y_test, y_pred),
+        "Precision (Clase 1 (Potable))": precision_score(y_test, y_pred, zero_division=0),
+        "Recall (Clase 1 (Potable))": recall_score(y_test, y_pred, zero_division=0),
+        "F1-Score": f1_score(y_test, y_pred, zero_division=0),
+        "ROC-AUC": roc_auc_score(y_test, proba),
+        "Ajuste (s)": fit_s,
+        "Predicción (ms/1k filas)": predict_s * 1000 / len(y_test) * 1000,
+        "estimator": spec["estimator"],
+        "params": spec.get("params", {}),
+    }
+    staging = f"{cache_path}.tmp-{os.getpid()}"
+    os.makedirs(staging, exist_ok=True)
+    joblib.dump(model, os.path.join(staging, 'model.pkl'))
+    with open(os.path.join(staging, 'result.json'), "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    shutil.rmtree(cache_path, ignore_errors=True)
+    os.replace(staging, cache_path)
+    return result
+
+
+def _cached(cache_path: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(cache_path, 'result.json'), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def load_model(name: str, output_dir: str = OUTPUT_DIR):
+    """Modelo ajustado de un candidato según la última tabla de posiciones"""
+    board = pd.read_csv(os.path.join(output_dir, LEADERBOARD_FILE))
+    key = board.loc[board["Modelo"] == name, "hash"].iloc[0]
+    return joblib.load(os.path.join(output_dir, CACHE_DIR, key, 'model.pkl'))
+
+
+# ---------------------------------------------------------
+# Comparación
+# ---------------------------------------------------------
+def compare(candidates: Optional[List[Dict]] = None, data_path: str = DATA_PATH, output_dir: str = OUTPUT_DIR,
+            workers: Optional[int] = None, balance: bool = False, force: bool = False) -> pd.DataFrame:
+    """
+    Ajusta los candidatos que no estén en caché y devuelve la tabla de
+    posiciones ordenada por ROC-AUC (también se guarda en leaderboard.csv).
+    """
+    candidates = candidates or CANDIDATES
+    cache_root = os.path.join(output_dir, CACHE_DIR)
+    os.makedirs(cache_root, exist_ok=True)
+    started = time.perf_counter()
+
+    workdir = tempfile.mkdtemp(prefix='.data-', dir=output_dir)
+    try:
+        data_hash = prepare_data(data_path, workdir, balance=balance)
+        results, pending = [], []
+        for spec in candidates:
+            key = config_hash(spec, data_hash)
+            cached = None if force else _cached(os.path.join(cache_root, key))
+            if cached is not None:
+                results.append({**cached, "Modelo": spec["name"], "hash": key, "en caché": True})
+            else:
+                pending.append((spec, key))
+        if pending:
+            print(f"-> Ajustando {len(pending)} de {len(candidates)} candidatos "
+                  f"({len(candidates) - len(pending)} en caché)...")
+            workers = max(1, min(workers or os.cpu_count() or 1, len(pending)))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(fit_candidate, spec, workdir, os.path.join(cache_root, key)): (spec, key)
+                           for spec, key in pending}
+                for future in as_completed(futures):
+                    spec, key = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"Error al ajustar {spec['name']}: {type(e).__name__}: {e}")
+                        continue
+                    print(f"   {spec['name']}: ROC-AUC {result['ROC-AUC']:.4f} en {result['Ajuste (s)']:.2f} s")
+                    results.append({**result, "hash": key, "en caché": False})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    columns = ["Modelo"] + METRICS + ["Ajuste (s)", "Predicción (ms/1k filas)", "en caché", "hash"]
+    board = pd.DataFrame(results, columns=columns).sort_values("ROC-AUC", ascending=False).reset_index(drop=True)
+    board.to_csv(os.path.join(output_dir, LEADERBOARD_FILE), index=False)
+    print(f"-> Comparación completa en {time.perf_counter() - started:.2f} s")
+    return board
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comparación de modelos candidatos")
+    parser.add_argument("--data", default=DATA_PATH, help="Dataset (CSV o Parquet de etl.py)")
+    parser.add_argument("--config", help="JSON con la lista de candidatos (por defecto CANDIDATES)")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Directorio de la tabla y la caché de modelos")
+    parser.add_argument("--workers", type=int, help="Procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--balance", action="store_true", help="SMOTE sobre el conjunto de entrenamiento")
+    parser.add_argument("--force", action="store_true", help="Reajustar aunque el candidato esté en caché")
+    args = parser.parse_args()
+
+    candidates = None
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            candidates = json.load(f)
+    board = compare(candidates, args.data, args.output, args.workers, args.balance, args.force)
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.precision', 4):
+        print(board.drop(columns=["hash"]).to_string(index=False))
+    print(f"-> Tabla guardada en {os.path.join(args.output, LEADERBOARD_FILE)}")
@@ -1,49 +1,194 @@
 import pandas as pd
+import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, classification_report, roc_auc_score
+from sklearn.metrics import accuracy_score, brier_score_loss, classification_report, f1_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
 import joblib
 import os
+import argparse
+import datetime
+import hashlib
+import json
+import shutil
+import sklearn
+import time
+from concurrent.futures import ProcessPoolExecutor
 import preprocessing as prep
+from explain import ForestExplainer, load_metadata
+import drift
+import artifacts
+import compact_forest
+import forest_compression
+import balancing
+import risk
 
 # Configuración de rutas
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BASE_DIR, '../data/processed/water_potability_cleaned.csv')
-MODEL_PATH = os.path.join(BASE_DIR, '../models/water_potability_model.pkl')
-SCALER_PATH = os.path.join(BASE_DIR, '../models/scaler.pkl')
+# Los artefactos se publican como versiones en models/versions/ (ver artifacts.py)
+MODELS_DIR = artifacts.MODELS_DIR
 
-def train():
+# Modo incremental
+TREES_PER_UPDATE = 20    # Árboles nuevos por actualización
+MAX_TREES = 300          # Al superarlo se descartan los árboles más antiguos
+REPLAY_ROWS = 2000       # Filas históricas mezcladas con las nuevas para entrenar los árboles nuevos
+UPDATE_HISTORY = 30      # Actualizaciones incrementales que se conservan en los metadatos
+# Parte de las filas nuevas que no se usa para actualizar y sobre la que se miden las métricas
+HOLDOUT_FRACTION = 0.2
+MIN_UPDATE_ROWS = 20     # Con menos filas nuevas la evaluación reservada no es representativa
+# Decimales con los que se comparan las filas nuevas con el almacén (el texto del CSV
+# y el de los archivos de laboratorio no siempre reproducen el mismo float hasta el último bit)
+DEDUP_DECIMALS = 6
+
+# Hiperparámetros del bosque (entrenamiento completo y validación cruzada)
+MODEL_PARAMS = {"n_estimators": 100, "random_state": 42}
+
+# Validación cruzada: folds, modelos y predicciones en caché por datos y configuración
+CV_DIR = os.path.join(MODELS_DIR, 'cv')
+CV_FOLDS = 5
+# Métricas sobre las predicciones guardadas de cada fold; agregar una no requiere reentrenar
+CV_METRICS = {
+    "auc": lambda y, p: roc_auc_score(y, p),
+    "accuracy": lambda y, p: accuracy_score(y, p > 0.5),
+    "f1": lambda y, p: f1_score(y, p > 0.5),
+    "brier": lambda y, p: brier_score_loss(y, p),
+}
+
+def publish(staging):
+    """Publica la versión preparada en `staging`; el dashboard la carga en segundo plano"""
+    version = artifacts.publish_version(staging, MODELS_DIR)
+    print(f"-> Versión {version} publicada en {os.path.join(MODELS_DIR, artifacts.VERSIONS_DIR, version)}")
+    return version
+
+def build_metadata(model, feature_names, X_eval_scaled, metrics_data, previous=None):
+    """Importancias globales y métricas que se guardan junto al modelo"""
+    explainer = ForestExplainer(model, feature_names)
+    metadata = dict(previous or {})
+    metadata.update({
+        "features": feature_names,
+        "metrics": metrics_data,
+        "n_trees": len(model.estimators_),
+        # Reducción de impureza (Gini) del bosque
+        "feature_importances": dict(zip(feature_names, model.feature_importances_.round(6).tolist())),
+        # Contribución absoluta media a P(potable) sobre el conjunto de evaluación
+        "mean_abs_contribution": {k: round(v, 6) for k, v in explainer.global_importance(X_eval_scaled).items()},
+        "base_value": round(explainer.bias, 6),
+    })
+    return metadata
+
+def holdout_metrics(model, X_eval_scaled, y_eval):
+    """Accuracy y AUC sobre filas que el modelo no vio (AUC None si solo hay una clase)"""
+    y_pred, y_proba, _ = risk.predict_scores(model, X_eval_scaled)
+    auc = roc_auc_score(y_eval, y_proba) if len(np.unique(y_eval)) > 1 else None
+    return {"accuracy": round(accuracy_score(y_eval, y_pred), 4),
+            "auc": None if auc is None else round(auc, 4),
+            "eval_rows": int(len(y_eval))}
+
+def save_edge_model(model, staging, feature_names, X_val, y_val, X_eval, y_eval):
+    """
+    Variante podada y cuantizada para gateways (forest_compression). Los árboles
+    se eligen con X_val y la accuracy se reporta sobre X_eval.
+    """
+    path = os.path.join(staging, artifacts.EDGE_MODEL_FILE)
+    summary = forest_compression.save_compressed(model, path, X_val, y_val, feature_names)
+    edge = compact_forest.load(path, mmap=False)
+    summary.update({
+        "size_kb": round(os.path.getsize(path) / 1024, 1),
+        "accuracy": round(accuracy_score(y_eval, edge.predict(X_eval)), 4),
+        "full_accuracy": round(accuracy_score(y_eval, model.predict(X_eval)), 4),
+    })
+    print(f"-> Modelo para gateways: {summary['trees']} árboles, {summary['nodes']:,} nodos, "
+          f"{summary['size_kb']} KB, accuracy {summary['accuracy']:.4f} (completo {summary['full_accuracy']:.4f})")
+    return summary
+
+def load_store(path):
+    """Almacén de entrenamiento (CSV o Parquet de etl.py); None si todavía no existe"""
+    if not os.path.exists(path):
+        return None
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, float_precision='round_trip')
+
+def rows_in_store(rows, store, columns):
+    """Máscara de las filas de `rows` que ya están en `store` (valores redondeados a DEDUP_DECIMALS)"""
+    def keys(df):
+        # + 0.0 unifica -0.0 y 0.0, que tienen hashes distintos
+        values = df[columns].astype('float64').round(DEDUP_DECIMALS) + 0.0
+        return pd.util.hash_pandas_object(values, index=False)
+    return keys(rows).isin(keys(store)).to_numpy()
+
+def append_to_store(rows, path):
+    """
+    Añade filas al almacén de entrenamiento. El CSV se extiende en el sitio;
+    el Parquet se reescribe completo (archivo temporal y reemplazo atómico).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if not path.endswith('.parquet'):
+        rows.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+        return
+    store = load_store(path)
+    if store is not None:
+        rows = pd.concat([store, rows[store.columns]], ignore_index=True)
+    tmp = path + '.tmp'
+    rows.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+def remap_thresholds(model, old_mean, old_scale, new_mean, new_scale):
+    """
+    Reexpresa los umbrales de los árboles existentes en la escala del escalador
+    actualizado: x_old <= t  <=>  x_new <= (μ_old + σ_old·t - μ_new) / σ_new,
+    así los árboles viejos siguen tomando las mismas decisiones sobre los datos crudos.
+    """
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        internal = tree.children_left >= 0
+        feature = tree.feature[internal]
+        threshold = tree.threshold  # vista escribible sobre los nodos del árbol
+        threshold[internal] = (old_mean[feature] + old_scale[feature] * threshold[internal]
+                               - new_mean[feature]) / new_scale[feature]
+
+def train(data_path=None, balance=False):
+    """
+    Entrenamiento completo. Con `balance` se aplica SMOTE (balancing.py) solo
+    al conjunto de entrenamiento, p. ej. sobre la salida sin balancear de etl.py;
+    la evaluación se hace sobre datos reales.
+    """
+    data_path = data_path or DATA_PATH
     print("Iniciando entrenamiento del modelo...")
     
     # 1. Cargar datos
     try:
-        df = prep.load_data(DATA_PATH)
+        df = prep.load_data(data_path)
     except FileNotFoundError as e:
-        print(f"Error: No se encontró el archivo de datos en {DATA_PATH}.")
+        print(f"Error: No se encontró el archivo de datos en {data_path}.")
         print(e)
         return
     
     # 2. Dividir datos
     print("Separando datos en Train/Test...")
     X_train, X_test, y_train, y_test = prep.split_data(df, target_column='Potability')
+    X_reference = X_train  # filas reales: referencia de deriva
+    if balance:
+        before = y_train.value_counts().to_dict()
+        X_train, y_train = balancing.balance_frame(X_train, y_train)
+        print(f"-> Clases balanceadas con SMOTE: {before} -> {y_train.value_counts().to_dict()}")
     
     # 3. Escalar datos
     print("Escalando datos...")
-    X_train_scaled = prep.train_save_scaler(X_train, output_path=SCALER_PATH)
-    X_test_scaled = prep.scale_data(X_test, scaler_path=SCALER_PATH)
+    staging = artifacts.stage_version(MODELS_DIR)
+    scaler_path = os.path.join(staging, artifacts.SCALER_FILE)
+    X_train_scaled = prep.train_save_scaler(X_train, output_path=scaler_path)
+    X_test_scaled = prep.scale_data(X_test, scaler_path=scaler_path)
     
     # 4. Definir modelo
     print("Entrenando el modelo RandomForestClassifier...")
-    rf_model = RandomForestClassifier(
-        n_estimators=100,
-        random_state=42,
-    )
+    rf_model = RandomForestClassifier(**MODEL_PARAMS)
     
     # 5. Entrenar modelo
     rf_model.fit(X_train_scaled, y_train)
     
     # 6. Evaluar modelo
-    y_pred = rf_model.predict(X_test_scaled)
-    y_proba = rf_model.predict_proba(X_test_scaled)[:, 1]
+    y_pred, y_proba, _ = risk.predict_scores(rf_model, X_test_scaled)
     
     acc = accuracy_score(y_test, y_pred)
     auc = roc_auc_score(y_test, y_proba)
@@ -54,9 +199,298 @@ def train():
     print("Reporte de clasificación:")
     print(classification_report(y_test, y_pred))
     
-    # 7. Guardar modelo
-    joblib.dump(rf_model, MODEL_PATH)
-    print(f"Modelo guardado en {MODEL_PATH}")
+    # 7. Importancias globales (se calculan una vez aquí, no en cada rerun del dashboard)
+    feature_names = list(X_train.columns)
+    metadata = build_metadata(rf_model, feature_names, X_test_scaled,
+                              {"accuracy": round(acc, 4), "auc": round(auc, 4)})
+    metadata["trained_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+    # Almacén al que train_incremental añade los resultados de laboratorio nuevos
+    metadata["data_path"] = os.path.abspath(data_path)
+    metadata["training_rows"] = int(len(X_train))
+    if balance:
+        metadata["synthetic_rows"] = int(len(X_train) - len(X_reference))
+    
+    # 8. Referencia para el monitoreo de deriva (filas reales de entrenamiento, sin las sintéticas de SMOTE)
+    reference = drift.build_reference(X_reference, feature_names)
+    
+    # 9. Publicar modelo, escalador, metadatos y referencia como una versión nueva
+    joblib.dump(rf_model, os.path.join(staging, artifacts.MODEL_FILE))
+    compact_forest.save(rf_model, os.path.join(staging, artifacts.COMPACT_MODEL_FILE), feature_names)
+    # Mitad de la prueba para elegir árboles y la otra mitad para medir la variante comprimida
+    metadata["edge_model"] = save_edge_model(rf_model, staging, feature_names,
+                                             X_test_scaled[::2], y_test.to_numpy()[::2],
+                                             X_test_scaled[1::2], y_test.to_numpy()[1::2])
+    artifacts.write_json(metadata, os.path.join(staging, artifacts.METADATA_FILE))
+    artifacts.write_json(reference, os.path.join(staging, artifacts.DRIFT_REFERENCE_FILE))
+    publish(staging)
+
+def train_incremental(new_data_path, trees_per_update=TREES_PER_UPDATE, max_trees=MAX_TREES,
+                      replay_rows=REPLAY_ROWS, data_path=None):
+    """
+    Actualiza el modelo publicado con resultados de laboratorio nuevos sin reentrenar desde cero:
+    1. Descarta las filas que ya están en el almacén de entrenamiento del que salió
+       el modelo (data_path de sus metadatos, o `data_path`/DATA_PATH si no lo tiene)
+    2. Actualiza media y varianza del escalador (partial_fit) y reexpresa los umbrales
+       de los árboles existentes en la nueva escala
+    3. Añade árboles (warm_start) entrenados con las filas nuevas + una muestra histórica
+    4. Descarta los árboles más antiguos si se supera max_trees
+    Una parte de las filas nuevas (HOLDOUT_FRACTION) no se usa en 2-3: sobre ella se
+    comparan el modelo anterior y el actualizado y se recalculan las métricas guardadas.
+    5. Publica una versión nueva que el dashboard carga en caliente y, solo
+       entonces, añade las filas nuevas al almacén (una actualización abortada
+       no deja filas a medias y repetirla no las duplica)
+    """
+    print("Iniciando actualización incremental del modelo...")
+    
+    # 1. Cargar artefactos publicados y filas nuevas
+    try:
+        new_df = prep.load_data(new_data_path)
+        version = artifacts.current_version(MODELS_DIR)
+        model = joblib.load(artifacts.artifact_path(artifacts.MODEL_FILE, version, MODELS_DIR))
+        scaler = joblib.load(artifacts.artifact_path(artifacts.SCALER_FILE, version, MODELS_DIR))
+    except FileNotFoundError as e:
+        print(f"Error: {e}. Ejecuta primero un entrenamiento completo.")
+        return
+    
+    feature_names = list(getattr(scaler, 'feature_names_in_', new_df.columns.drop('Potability', errors='ignore')))
+    missing = set(feature_names + ['Potability']) - set(new_df.columns)
+    if missing:
+        print(f"Error: faltan columnas en {new_data_path}: {sorted(missing)}")
+        return
+    new_df = new_df[feature_names + ['Potability']].dropna()
+    if new_df.empty:
+        print("No hay filas válidas para actualizar el modelo.")
+        return
+    previous = load_metadata(artifacts.artifact_path(artifacts.METADATA_FILE, version, MODELS_DIR))
+    data_path = data_path or previous.get("data_path") or DATA_PATH
+    history = load_store(data_path)
+    if history is None:
+        history = new_df.iloc[:0]
+    else:
+        # Filas idénticas a las del almacén: ya se usaron (p. ej. al repetir la actualización)
+        seen = rows_in_store(new_df, history, feature_names + ['Potability'])
+        if seen.any():
+            print(f"-> {int(seen.sum())} filas ya estaban en {data_path} y se omiten")
+            new_df = new_df[~seen]
+        if new_df.empty:
+            print("No hay filas nuevas para actualizar el modelo.")
+            return
+    if len(new_df) < MIN_UPDATE_ROWS:
+        print(f"Error: se necesitan al menos {MIN_UPDATE_ROWS} filas nuevas (hay {len(new_df)}).")
+        return
+    
+    # 2. Filas reservadas para evaluar y evaluación del modelo actual sobre ellas
+    y_all = new_df['Potability'].astype(int)
+    stratify = y_all if y_all.value_counts().min() >= 2 else None
+    fit_df, eval_df = train_test_split(new_df, test_size=HOLDOUT_FRACTION, random_state=42, stratify=stratify)
+    X_new = fit_df[feature_names]
+    X_eval, y_eval = eval_df[feature_names], eval_df['Potability'].astype(int).to_numpy()
+    before = holdout_metrics(model, scaler.transform(X_eval), y_eval)
+    print(f"Modelo actual sobre {len(eval_df)} de las {len(new_df)} filas nuevas (reservadas): "
+          f"accuracy {before['accuracy']:.4f}")
+    
+    # 3. Muestra histórica del almacén para mezclar con las filas nuevas
+    replay = history.sample(min(replay_rows, len(history)), random_state=len(history)) if len(history) else history
+    
+    # 4. Escalador incremental y umbrales de los árboles existentes
+    old_mean, old_scale = scaler.mean_.copy(), scaler.scale_.copy()
+    scaler.partial_fit(X_new)
+    remap_thresholds(model, old_mean, old_scale, scaler.mean_, scaler.scale_)
+    
+    # 5. Árboles nuevos con warm_start
+    update_df = pd.concat([fit_df, replay[feature_names + ['Potability']]], ignore_index=True)
+    X_update = scaler.transform(update_df[feature_names])
+    y_update = update_df['Potability'].astype(int)
+    if y_update.nunique() < len(model.classes_):
+        print("Error: las filas nuevas y la muestra histórica no contienen ambas clases.")
+        return
+    trees_before = len(model.estimators_)
+    model.set_params(warm_start=True, n_estimators=trees_before + trees_per_update)
+    model.fit(X_update, y_update)
+    
+    # 6. Rotación: conservar solo los max_trees árboles más recientes
+    removed = max(0, len(model.estimators_) - max_trees)
+    if removed:
+        model.estimators_ = model.estimators_[removed:]
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+    print(f"Árboles: {trees_before} + {trees_per_update} nuevos - {removed} descartados = {len(model.estimators_)}")
+    
+    X_eval_scaled = scaler.transform(X_eval)
+    after = holdout_metrics(model, X_eval_scaled, y_eval)
+    print(f"Modelo actualizado sobre las filas reservadas: accuracy {after['accuracy']:.4f}")
+    
+    # 7. Metadatos (métricas y contribuciones sobre las filas reservadas) y referencia de deriva
+    metadata = build_metadata(model, feature_names, X_eval_scaled, after, previous)
+    metadata["parent_version"] = version or artifacts.LEGACY_VERSION
+    metadata["data_path"] = os.path.abspath(data_path)
+    metadata["updated_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+    metadata["training_rows"] = int(previous.get("training_rows", len(history))) + len(fit_df)
+    metadata["incremental_updates"] = (previous.get("incremental_updates", []) + [{
+        "at": metadata["updated_at"],
+        "rows": len(new_df),
+        "trees_added": trees_per_update,
+        "trees_removed": removed,
+        "eval_rows": len(eval_df),
+        "accuracy_before": before["accuracy"],
+        "accuracy_after": after["accuracy"],
+        "auc_before": before["auc"],
+        "auc_after": after["auc"],
+    }])[-UPDATE_HISTORY:]
+    
+    staging = artifacts.stage_version(MODELS_DIR)
+    artifacts.write_json(metadata, os.path.join(staging, artifacts.METADATA_FILE))
+    reference = drift.load_reference(artifacts.artifact_path(artifacts.DRIFT_REFERENCE_FILE, version, MODELS_DIR))
+    if reference:
+        artifacts.write_json(drift.extend_reference(reference, new_df[feature_names]),
+                             os.path.join(staging, artifacts.DRIFT_REFERENCE_FILE))
+    
+    # 8. Publicar
+    joblib.dump(scaler, os.path.join(staging, artifacts.SCALER_FILE))
+    joblib.dump(model, os.path.join(staging, artifacts.MODEL_FILE))
+    compact_forest.save(model, os.path.join(staging, artifacts.COMPACT_MODEL_FILE), feature_names)
+    # Como en train(): mitad de las filas reservadas para elegir árboles y la otra mitad para medir
+    metadata["edge_model"] = save_edge_model(model, staging, feature_names, X_eval_scaled[::2], y_eval[::2],
+                                             X_eval_scaled[1::2], y_eval[1::2])
+    artifacts.write_json(metadata, os.path.join(staging, artifacts.METADATA_FILE))
+    publish(staging)
+    
+    # 9. Almacén de entrenamiento: solo con la versión ya publicada
+    append_to_store(new_df, data_path)
+    print(f"-> {len(new_df)} filas añadidas a {data_path}")
+
+def fold_scalers(X, folds):
+    """
+    Media y desviación del escalador de cada fold sin volver a recorrer los
+    datos de entrenamiento: se suman una vez Σx y Σx² de cada partición
+    (desplazadas por la media global) y el entrenamiento del fold k es el
+    total menos su partición. Equivale a StandardScaler().fit(X[train_k]).
+    """
+    shift = X.mean(axis=0)
+    sums = np.array([(X[test] - shift).sum(axis=0) for _, test in folds])
+    squares = np.array([((X[test] - shift) ** 2).sum(axis=0) for _, test in folds])
+    counts = np.array([len(test) for _, test in folds])[:, None]
+    n = len(X) - counts
+    mean = (sums.sum(axis=0) - sums) / n
+    var = np.maximum((squares.sum(axis=0) - squares) / n - mean ** 2, 0.0)
+    scale = np.sqrt(var)
+    scale[scale == 0] = 1.0
+    return mean + shift, scale
+
+def _fit_fold(cache_dir, k, balance):
+    """Entrena y predice un fold (en un proceso del pool); guarda modelo y predicciones en caché"""
+    X = np.load(os.path.join(cache_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(cache_dir, 'y.npy'), mmap_mode='r')
+    with np.load(os.path.join(cache_dir, 'folds.npz')) as folds:
+        train_idx, test_idx = folds[f'train_{k}'], folds[f'test_{k}']
+        mean, scale = folds['mean'][k], folds['scale'][k]
+    X_train, y_train = X[train_idx], y[train_idx]
+    if balance:
+        # El balanceo cambia la distribución: el escalador se ajusta sobre el fold balanceado
+        X_train, y_train = balancing.smote(X_train, y_train, n_jobs=1)
+        mean, scale = X_train.mean(axis=0), X_train.std(axis=0)
+        scale[scale == 0] = 1.0
+
+    start = time.perf_counter()
+    model = RandomForestClassifier(**MODEL_PARAMS).fit((X_train - mean) / scale, y_train)
+    fit_s = time.perf_counter() - start
+    proba = risk.positive_probability(model, (X[test_idx] - mean) / scale)
+
+    fold_dir = os.path.join(cache_dir, f'fold-{k}')
+    staging = f"{fold_dir}.tmp-{os.getpid()}"
+    os.makedirs(staging, exist_ok=True)
+    joblib.dump(model, os.path.join(staging, artifacts.MODEL_FILE))
+    np.savez(os.path.join(staging, 'predictions.npz'), index=test_idx, proba=proba, mean=mean, scale=scale)
+    artifacts.write_json({"fit_seconds": fit_s}, os.path.join(staging, 'fold.json'))
+    shutil.rmtree(fold_dir, ignore_errors=True)
+    os.replace(staging, fold_dir)
+    return k, fit_s
+
+def cross_validate(data_path=None, n_folds=CV_FOLDS, workers=None, balance=False, seed=42):
+    """
+    Validación cruzada estratificada del bosque de model_train.
+
+    Los índices de los folds, los datos (.npy que los procesos abren con
+    memmap), los modelos y las predicciones fuera de fold quedan en
+    models/cv/<clave>/, con la clave derivada de los datos, los folds, la
+    semilla, los hiperparámetros y la versión de scikit-learn. Al repetir
+    solo se entrenan los folds que faltan; las métricas (CV_METRICS) se
+    calculan siempre desde las predicciones guardadas.
+    """
+    data_path = data_path or DATA_PATH
+    started = time.perf_counter()
+    df = prep.load_data(data_path)
+    X = np.ascontiguousarray(df.drop(columns=['Potability']).to_numpy(dtype=np.float64))
+    y = df['Potability'].to_numpy()
+
+    digest = hashlib.sha256(X.tobytes())
+    digest.update(y.tobytes())
+    digest.update(json.dumps({"folds": n_folds, "seed": seed, "params": MODEL_PARAMS, "balance": balance,
+                              "sklearn": sklearn.__version__}, sort_keys=True).encode('utf-8'))
+    cache_dir = os.path.join(CV_DIR, digest.hexdigest()[:16])
+
+    # 1. Folds y estadísticos de escalado: una sola vez por clave
+    if not os.path.exists(os.path.join(cache_dir, 'folds.npz')):
+        os.makedirs(cache_dir, exist_ok=True)
+        folds = list(StratifiedKFold(n_folds, shuffle=True, random_state=seed).split(X, y))
+        mean, scale = fold_scalers(X, folds)
+        np.save(os.path.join(cache_dir, 'X.npy'), X)
+        np.save(os.path.join(cache_dir, 'y.npy'), y)
+        arrays = {f'{part}_{k}': idx for k, fold in enumerate(folds) for part, idx in zip(('train', 'test'), fold)}
+        np.savez(os.path.join(cache_dir, 'folds.npz'), mean=mean, scale=scale, **arrays)
+
+    # 2. Folds sin modelo en caché, en paralelo
+    pending = [k for k in range(n_folds)
+               if not os.path.exists(os.path.join(cache_dir, f'fold-{k}', 'predictions.npz'))]
+    if pending:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(pending)))
+        print(f"Entrenando {len(pending)} de {n_folds} folds ({workers} procesos)...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for k, fit_s in pool.map(_fit_fold, [cache_dir] * len(pending), pending, [balance] * len(pending)):
+                print(f"   fold {k}: entrenado en {fit_s:.2f} s")
+
+    # 3. Métricas desde las predicciones guardadas
+    scores = {name: [] for name in CV_METRICS}
+    for k in range(n_folds):
+        with np.load(os.path.join(cache_dir, f'fold-{k}', 'predictions.npz')) as pred:
+            y_fold, proba = y[pred['index']], pred['proba']
+        for name, metric in CV_METRICS.items():
+            scores[name].append(float(metric(y_fold, proba)))
+
+    report = {
+        "folds": n_folds,
+        "cached_folds": n_folds - len(pending),
+        "metrics": {name: {"mean": round(float(np.mean(v)), 4), "std": round(float(np.std(v)), 4),
+                           "folds": [round(x, 4) for x in v]} for name, v in scores.items()},
+        "wall_seconds": round(time.perf_counter() - started, 2),
+        "cache_dir": cache_dir,
+    }
+    artifacts.write_json(report, os.path.join(cache_dir, 'cv_report.json'))
+
+    print(f"Validación cruzada ({n_folds} folds, {report['cached_folds']} en caché):")
+    for name, values in report["metrics"].items():
+        print(f"   {name}: {values['mean']:.4f} ± {values['std']:.4f}")
+    print(f"Tiempo total: {report['wall_seconds']:.2f} s")
+    return report
 
 if __name__ == "__main__":
-    train()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Entrenamiento del modelo de potabilidad")
+    parser.add_argument("--incremental", metavar="CSV",
+                        help="Actualizar el modelo publicado con un CSV de resultados de laboratorio etiquetados")
+    parser.add_argument("--trees", type=int, default=TREES_PER_UPDATE, help="Árboles nuevos por actualización")
+    parser.add_argument("--max-trees", type=int, default=MAX_TREES, help="Máximo de árboles en el bosque")
+    parser.add_argument("--replay-rows", type=int, default=REPLAY_ROWS, help="Filas históricas mezcladas con las nuevas")
+    parser.add_argument("--data", help="Dataset de entrenamiento (CSV o Parquet de etl.py); por defecto el CSV procesado. "
+                                       "Con --incremental, el almacén al que se añaden las filas (por defecto el del modelo)")
+    parser.add_argument("--balance", action="store_true",
+                        help="Balancear las clases del conjunto de entrenamiento con SMOTE")
+    parser.add_argument("--cv", type=int, nargs="?", const=CV_FOLDS, metavar="K",
+                        help=f"Validación cruzada con K folds (por defecto {CV_FOLDS}) en lugar de entrenar")
+    parser.add_argument("--workers", type=int, help="Procesos para la validación cruzada")
+    args = parser.parse_args()
+    
+    if args.cv:
+        cross_validate(args.data, args.cv, args.workers, args.balance)
+    elif args.incremental:
+        train_incremental(args.incremental, args.trees, args.max_trees, args.replay_rows, args.data)
+    else:
+        train(args.data, args.balance)
\ No newline at end of file
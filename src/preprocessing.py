@@ -9,13 +9,14 @@ def load_data(file_path):
     """Carga el dataset desde una ruta especificada."""
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"El archivo {file_path} no existe.")
-    df = pd.read_csv(file_path)
+    # Parquet: salida de etl.py
+    df = pd.read_parquet(file_path) if file_path.endswith('.parquet') else pd.read_csv(file_path)
     print(f"-> Datos cargados desde {file_path} con dimensiones: {df.shape}")
     return df
 
 def split_data(df, target_column, test_size=0.2, random_state=42):
     """Divide el dataset en conjuntos de entrenamiento y prueba."""
-    X = df.drop(columns=[target_column], axis=1)
+    X = df.drop(columns=[target_column])
     y = df[target_column]
     
     X_train, X_test, y_train, y_test = train_test_split(
@@ -0,0 +1,271 @@
+"""
+Perfil estadístico en streaming de datasets crudos grandes
+Reemplaza, para archivos que no caben en memoria, el describe(), corr() y
+detectar_outliers_iqr de notebooks/01_eda_analisis.ipynb con una sola
+pasada sobre el CSV o Parquet:
+- Momentos por columna (conteo, media, desviación, mínimo, máximo) y tasa de faltantes
+- Cuantiles aproximados con t-digest (sketches.py)
+- Atípicos IQR: fuera de Q1 - 1.5·IQR y Q3 + 1.5·IQR, contados con la CDF
+  del t-digest (no hace falta una segunda pasada ni ordenar la columna)
+- Matriz de correlación de Pearson acumulada con sumas por pares de
+  columnas (como df.corr(), cada par usa las filas donde ambas tienen valor)
+
+Cada bloque del archivo produce un Profile independiente y Profile.merge
+los combina de forma exacta (salvo la aproximación del t-digest), así que
+los bloques se procesan en paralelo y los perfiles guardados en JSON (p. ej.
+uno por año) se pueden combinar después.
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import etl
+from sketches import Moments, TDigest
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+IQR_FACTOR = 1.5
+DIGEST_COMPRESSION = 1000.0
+CHUNK_BYTES = etl.CHUNK_BYTES
+
+
+class CorrelationSketch:
+    """
+    Sumas por pares de columnas para la correlación con eliminación por pares.
+    Para (i, j) se acumulan, sobre las filas donde ambas tienen valor: n_ij,
+    Σx_i, Σx_i² y Σx_i·x_j. Los valores se desplazan por `shift` (la media del
+    primer bloque) para no perder precisión al restar sumas grandes.
+    """
+
+    def __init__(self, n_columns: int, shift: Optional[np.ndarray] = None):
+        self.shift = np.zeros(n_columns) if shift is None else np.asarray(shift, dtype=np.float64)
+        self.n = np.zeros((n_columns, n_columns))
+        self.sum = np.zeros((n_columns, n_columns))     # sum[i, j] = Σ x_i sobre filas con i y j
+        self.sum_sq = np.zeros((n_columns, n_columns))  # sum_sq[i, j] = Σ x_i² sobre filas con i y j
+        self.cross = np.zeros((n_columns, n_columns))   # cross[i, j] = Σ x_i·x_j
+        self._shifted = shift is not None
+
+    def update(self, X: np.ndarray):
+        present = np.isfinite(X)
+        if not self._shifted and len(X):
+            counts = present.sum(axis=0)
+            self.shift = np.where(present, X, 0.0).sum(axis=0) / np.maximum(counts, 1)
+            self._shifted = True
+        mask = present.astype(np.float64)
+        Z = np.where(present, X - self.shift, 0.0)
+        self.n += mask.T @ mask
+        self.sum += Z.T @ mask
+        self.sum_sq += (Z * Z).T @ mask
+        self.cross += Z.T @ Z
+
+    def _recenter(self, shift: np.ndarray):
+        """Reexpresa las sumas respecto de otro desplazamiento (x - b = (x - a) + (a - b))"""
+        d = (self.shift - shift)[:, None]
+        self.sum_sq += 2 * d * self.sum + d ** 2 * self.n
+        self.cross += d * self.sum.T + d.T * self.sum + d * d.T * self.n
+        self.sum += d * self.n
+        self.shift = np.asarray(shift, dtype=np.float64)
+
+    def merge(self, other: "CorrelationSketch"):
+        if not other._shifted:
+            return
+        if not self._shifted:
+            self.shift, self._shifted = other.shift.copy(), True
+        if not np.array_equal(other.shift, self.shift):
+            other = CorrelationSketch.from_dict(other.to_dict())
+            other._recenter(self.shift)
+        self.n += other.n
+        self.sum += other.sum
+        self.sum_sq += other.sum_sq
+        self.cross += other.cross
+
+    def correlation(self) -> np.ndarray:
+        n = np.where(self.n > 1, self.n, np.nan)
+        mean_i, mean_j = self.sum / n, self.sum.T / n
+        cov = self.cross / n - mean_i * mean_j
+        var_i = self.sum_sq / n - mean_i ** 2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / np.sqrt(var_i * var_i.T)
+        np.fill_diagonal(corr, np.where(np.diag(self.n) > 1, 1.0, np.nan))
+        return np.clip(corr, -1.0, 1.0)
+
+    def to_dict(self) -> Dict:
+        return {"shift": self.shift.tolist(), "shifted": self._shifted, "n": self.n.tolist(),
+                "sum": self.sum.tolist(), "sum_sq": self.sum_sq.tolist(), "cross": self.cross.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "CorrelationSketch":
+        sketch = cls(len(data["shift"]), data["shift"] if data["shifted"] else None)
+        sketch.n = np.asarray(data["n"], dtype=np.float64)
+        sketch.sum = np.asarray(data["sum"], dtype=np.float64)
+        sketch.sum_sq = np.asarray(data["sum_sq"], dtype=np.float64)
+        sketch.cross = np.asarray(data["cross"], dtype=np.float64)
+        return sketch
+
+
+class Profile:
+    """Perfil combinable de las columnas numéricas de un dataset"""
+
+    def __init__(self, columns: Sequence[str], compression: float = DIGEST_COMPRESSION):
+        self.columns = list(columns)
+        self.compression = compression
+        self.rows = 0
+        self.missing = np.zeros(len(self.columns), dtype=np.int64)
+        self.moments = [Moments() for _ in self.columns]
+        self.digests = [TDigest(compression) for _ in self.columns]
+        self.correlations = CorrelationSketch(len(self.columns))
+
+    def update(self, df: pd.DataFrame):
+        """Agrega un bloque; el texto no numérico cuenta como faltante"""
+        X = np.column_stack([pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+                             for col in self.columns]) if len(df) else np.empty((0, len(self.columns)))
+        X[~np.isfinite(X)] = np.nan
+        self.rows += len(X)
+        self.missing += np.isnan(X).sum(axis=0)
+        ordered = np.sort(X, axis=0)  # NaN al final de cada columna
+        valid = len(X) - np.isnan(X).sum(axis=0)
+        for j in range(len(self.columns)):
+            column = ordered[:valid[j], j]
+            self.moments[j].update(column)
+            self.digests[j].merge(TDigest.from_sorted(column, self.compression))
+        self.correlations.update(X)
+
+    def merge(self, other: "Profile"):
+        if other.columns != self.columns:
+            raise ValueError("Los perfiles tienen columnas distintas")
+        self.rows += other.rows
+        self.missing += other.missing
+        for mine, theirs in zip(self.moments, other.moments):
+            mine.merge(theirs)
+        for mine, theirs in zip(self.digests, other.digests):
+            mine.merge(theirs)
+        self.correlations.merge(other.correlations)
+
+    def summary(self, quantiles: Sequence[float] = QUANTILES, iqr_factor: float = IQR_FACTOR) -> pd.DataFrame:
+        """Una fila por columna: lo de describe() más faltantes, cuantiles y atípicos IQR"""
+        rows = []
+        for col, moments, digest, missing in zip(self.columns, self.moments, self.digests, self.missing):
+            q1, q3 = digest.quantile(0.25), digest.quantile(0.75)
+            low, high = q1 - iqr_factor * (q3 - q1), q3 + iqr_factor * (q3 - q1)
+            outliers = (digest.count * (digest.cdf(low) + 1 - digest.cdf(high))) if digest.count else 0.0
+            row = {
+                "columna": col,
+                "count": moments.count,
+                "faltantes_%": 100 * missing / self.rows if self.rows else np.nan,
+                "mean": moments.mean if moments.count else np.nan,
+                "std": moments.std if moments.count else np.nan,
+                "min": moments.min if moments.count else np.nan,
+            }
+            row.update({f"p{q * 100:g}": digest.quantile(q) for q in quantiles})
+            row.update({
+                "max": moments.max if moments.count else np.nan,
+                "outliers_iqr": int(round(outliers)),
+                "outliers_%": 100 * outliers / digest.count if digest.count else np.nan,
+            })
+            rows.append(row)
+        return pd.DataFrame(rows).set_index("columna")
+
+    def correlation(self) -> pd.DataFrame:
+        return pd.DataFrame(self.correlations.correlation(), index=self.columns, columns=self.columns)
+
+    def to_dict(self) -> Dict:
+        return {"columns": self.columns, "compression": self.compression, "rows": self.rows,
+                "missing": self.missing.tolist(), "moments": [m.to_dict() for m in self.moments],
+                "digests": [d.to_dict() for d in self.digests], "correlations": self.correlations.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Profile":
+        profile = cls(data["columns"], data["compression"])
+        profile.rows = data["rows"]
+        profile.missing = np.asarray(data["missing"], dtype=np.int64)
+        profile.moments = [Moments.from_dict(m) for m in data["moments"]]
+        profile.digests = [TDigest.from_dict(d) for d in data["digests"]]
+        profile.correlations = CorrelationSketch.from_dict(data["correlations"])
+        return profile
+
+
+# ---------------------------------------------------------
+# Lectura por bloques
+# ---------------------------------------------------------
+def _csv_block(path: str, start: int, end: int, names: List[str], columns: List[str]) -> Profile:
+    profile = Profile(columns)
+    profile.update(etl.read_block(path, start, end, names))
+    return profile
+
+
+def _parquet_block(path: str, row_group: int, columns: List[str]) -> Profile:
+    import pyarrow.parquet as pq
+    profile = Profile(columns)
+    profile.update(pq.ParquetFile(path).read_row_group(row_group, columns=columns).to_pandas())
+    return profile
+
+
+def _jobs(path: str, columns: Optional[Sequence[str]], chunk_bytes: int):
+    """(función, argumentos de cada bloque, columnas) según el formato del archivo"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        columns = list(columns or parquet.schema_arrow.names)
+        return _parquet_block, [(path, i, columns) for i in range(parquet.num_row_groups)], columns
+    names, ranges = etl.byte_ranges(path, chunk_bytes)
+    columns = list(columns or names)
+    return _csv_block, [(path, start, end, names, columns) for start, end in ranges], columns
+
+
+def profile_file(path: str, columns: Optional[Sequence[str]] = None, workers: Optional[int] = None,
+                 chunk_bytes: int = CHUNK_BYTES) -> Profile:
+    """Perfil de un CSV o Parquet en una pasada, con un proceso por bloque"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"El archivo {path} no existe.")
+    fn, jobs, columns = _jobs(path, columns, chunk_bytes)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    profile = Profile(columns)
+    if workers == 1:
+        for job in jobs:
+            profile.merge(fn(*job))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(fn, *zip(*jobs)):
+                profile.merge(part)
+    return profile
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perfil estadístico en streaming de un CSV o Parquet")
+    parser.add_argument("inputs", nargs="+", help="CSV/Parquet, o perfiles .json guardados con --output")
+    parser.add_argument("-o", "--output", help="Guardar el perfil combinado en JSON")
+    parser.add_argument("--columns", help="Columnas a perfilar, separadas por coma (por defecto todas)")
+    parser.add_argument("--workers", type=int, help="Procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_BYTES / 2 ** 20, help="Tamaño de bloque en MB")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    columns = args.columns.split(",") if args.columns else None
+    profile = None
+    for path in args.inputs:
+        if path.endswith('.json'):
+            with open(path, "r", encoding="utf-8") as f:
+                part = Profile.from_dict(json.load(f))
+        else:
+            part = profile_file(path, columns, args.workers, int(args.chunk_mb * 2 ** 20))
+        if profile is None:
+            profile = part
+        else:
+            profile.merge(part)
+    elapsed = time.perf_counter() - started
+
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.precision', 3):
+        print(profile.summary())
+        print("\nCorrelación (Pearson, por pares):")
+        print(profile.correlation().round(3))
+    print(f"\n-> {profile.rows:,} filas en {elapsed:.2f} s ({profile.rows / max(elapsed, 1e-9):,.0f} filas/s)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(profile.to_dict(), f)
+        print(f"-> Perfil guardado en {args.output}")
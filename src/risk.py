@@ -0,0 +1,121 @@
+"""
+Puntuación y postprocesado vectorizado de las probabilidades
+predict_scores() es la API única de puntuación: etiqueta, P(potable) y
+confianza con un solo recorrido del modelo (predict_proba); la etiqueta es
+la misma que daría model.predict, así que no hace falta llamar a los dos.
+
+A partir de P(potable) (predict_proba, calculada una sola vez) y del pH de
+cada fila deriva, en una pasada de numpy y sin bucles por fila:
+
+- Confianza (%): la de la clase predicha, igual que en la muestra individual
+- Riesgo: ALTO / MEDIO / BAJO según P(potable) (RISK_BANDS); MEDIO agrupa las
+  predicciones cercanas al umbral, las que conviene revisar a mano
+- pH fuera de la norma (PH_RANGE, 6.5 - 8.5)
+- Alerta y su motivo, con los mismos criterios que la muestra individual:
+  el modelo predice NO POTABLE o el pH está fuera de norma
+
+Las filas sin probabilidad (NaN, p. ej. inválidas en validation.py) quedan
+sin confianza ni banda; el criterio de pH se evalúa igual si el pH es válido.
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+PH_RANGE = (6.5, 8.5)
+THRESHOLD = 0.5
+
+# (banda, límite superior de P(potable)); la última cubre el resto
+RISK_BANDS = (('ALTO', 0.35), ('MEDIO', 0.65), ('BAJO', 1.0))
+BAND_NAMES = np.array([name for name, _ in RISK_BANDS] + [''])
+
+CONFIDENCE_COLUMN = 'Confianza'
+RISK_COLUMN = 'Riesgo'
+PH_FLAG_COLUMN = 'pH_Fuera_Norma'
+ALERT_COLUMN = 'Alerta'
+REASON_COLUMN = 'Motivo_Alerta'
+
+AI_REASON = 'IA detectó riesgo'
+PH_REASON = 'pH fuera de norma'
+
+
+def positive_probability(model, X) -> np.ndarray:
+    """P(potable) de cada fila con un solo recorrido del modelo"""
+    return model.predict_proba(X)[:, list(model.classes_).index(1)]
+
+
+def predict_scores(model, X) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (predicción 0/1, P(potable), confianza %) de cada fila de X ya escalada.
+    La predicción es la de model.predict (argmax: un empate a 0.5 es 0).
+    """
+    proba = positive_probability(model, X)
+    return (proba > THRESHOLD).astype(np.int8), proba, confidence(proba)
+
+
+def ph_out_of_range(ph) -> np.ndarray:
+    """pH fuera de PH_RANGE (los NaN no se marcan)"""
+    ph = np.asarray(ph, dtype=np.float64)
+    return (ph < PH_RANGE[0]) | (ph > PH_RANGE[1])
+
+
+def confidence(proba) -> np.ndarray:
+    """Confianza (%) de la clase predicha: P(potable) si p > 0.5, si no 1 - p"""
+    proba = np.asarray(proba, dtype=np.float64)
+    return np.maximum(proba, 1 - proba) * 100
+
+
+def risk_codes(proba) -> np.ndarray:
+    """Índice de la banda en RISK_BANDS de cada fila (len(RISK_BANDS) si no hay probabilidad)"""
+    proba = np.asarray(proba, dtype=np.float64)
+    edges = np.array([edge for _, edge in RISK_BANDS[:-1]])
+    codes = np.searchsorted(edges, proba, side='right')
+    codes[np.isnan(proba)] = len(RISK_BANDS)
+    return codes
+
+
+def assess(proba, ph) -> pd.DataFrame:
+    """
+    Columnas de postprocesado para un lote.
+
+    Args:
+        proba: P(potable) por fila (NaN si la fila no se puntuó)
+        ph: pH por fila
+
+    Returns:
+        DataFrame con Confianza, Riesgo, pH_Fuera_Norma, Alerta y Motivo_Alerta
+    """
+    proba = np.asarray(proba, dtype=np.float64)
+    ai_risk = ~np.isnan(proba) & (proba <= THRESHOLD)
+    ph_flag = ph_out_of_range(ph)
+    reason = np.select(
+        [ai_risk & ph_flag, ai_risk, ph_flag],
+        [f'{AI_REASON}; {PH_REASON}', AI_REASON, PH_REASON],
+        default='',
+    )
+    return pd.DataFrame({
+        CONFIDENCE_COLUMN: confidence(proba).round(1),
+        RISK_COLUMN: BAND_NAMES[risk_codes(proba)],
+        PH_FLAG_COLUMN: ph_flag,
+        ALERT_COLUMN: ai_risk | ph_flag,
+        REASON_COLUMN: reason,
+    })
+
+
+def summarize(proba, assessment: pd.DataFrame) -> Dict:
+    """Agregados del lote (conteos por clase, banda y motivo de alerta) sin recorrer filas"""
+    proba = np.asarray(proba, dtype=np.float64)
+    scored = ~np.isnan(proba)
+    bands = np.bincount(risk_codes(proba), minlength=len(RISK_BANDS) + 1)
+    conf = assessment[CONFIDENCE_COLUMN].to_numpy()
+    return {
+        "rows": int(len(proba)),
+        "scored": int(scored.sum()),
+        "potable": int((proba > THRESHOLD).sum()),
+        "not_potable": int((scored & (proba <= THRESHOLD)).sum()),
+        "alerts": int(assessment[ALERT_COLUMN].sum()),
+        "ph_out_of_range": int(assessment[PH_FLAG_COLUMN].sum()),
+        "mean_confidence": float(conf[scored].mean()) if scored.any() else None,
+        "bands": {name: int(n) for (name, _), n in zip(RISK_BANDS, bands)},
+    }
@@ -0,0 +1,330 @@
+"""
+Puntuación por lotes fuera de Streamlit (trabajos programados)
+Aplica el modelo activo (los mismos artefactos que carga el dashboard, ver
+artifacts.py) a uno o más CSV/Parquet y escribe un archivo con las columnas
+originales, Potability_Prediction (POTABLE / NO POTABLE, como en el
+dashboard), Potability_Probability (P(potable)) y las columnas de risk.py
+(confianza, banda de riesgo, pH fuera de norma y alerta). Las filas con valores
+vacíos, no numéricos o fuera de rango no detienen el trabajo: quedan como
+SIN PREDICCIÓN con el motivo en la columna Validacion (ver validation.py).
+
+- Los archivos se dividen en bloques (rangos de bytes del CSV cortados en
+  saltos de línea, o row groups del Parquet) que puntúan varios procesos;
+  cada proceso carga el modelo una sola vez
+- Cada bloque terminado se escribe como parte y se anota en un checkpoint
+  (<salida>.checkpoint.json) con su archivo y desplazamiento: si el trabajo
+  se interrumpe, al relanzarlo con los mismos argumentos solo se puntúan los
+  bloques pendientes, con la misma versión del modelo
+- Al final las partes se unen en orden en la salida y se reportan filas/s
+
+Uso: python src/score.py "entradas/*.csv" -o resultados.csv [--workers 4] [--chunk-mb 32]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import artifacts
+import etl
+import risk
+import validation
+
+LABELS = np.array(['NO POTABLE', 'POTABLE'])
+INVALID_LABEL = 'SIN PREDICCIÓN'
+PREDICTION_COLUMN = 'Potability_Prediction'
+PROBABILITY_COLUMN = 'Potability_Probability'
+FACTOR_COLUMN = 'Factor_Principal'
+SOURCE_COLUMN = 'Source_File'
+CHUNK_BYTES = etl.CHUNK_BYTES
+
+
+def label_predictions(predictions) -> np.ndarray:
+    """Etiquetas del dashboard: 1 -> POTABLE, 0 -> NO POTABLE"""
+    return LABELS[(np.asarray(predictions) == 1).astype(np.intp)]
+
+
+def prediction_labels(proba) -> np.ndarray:
+    """Etiquetas a partir de P(potable); SIN PREDICCIÓN donde la probabilidad es NaN"""
+    proba = np.asarray(proba, dtype=np.float64)
+    return np.where(np.isnan(proba), INVALID_LABEL, label_predictions(proba > risk.THRESHOLD))
+
+
+def feature_names(scaler, default: Sequence[str] = etl.FEATURES) -> List[str]:
+    """Orden de variables con el que se entrenó el escalador (y el modelo)"""
+    return list(getattr(scaler, 'feature_names_in_', default))
+
+
+# ---------------------------------------------------------
+# Bloques de trabajo
+# ---------------------------------------------------------
+def expand_inputs(patterns: Sequence[str]) -> List[str]:
+    """Archivos CSV/Parquet que coinciden con los patrones, sin repetir y en orden"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or ([pattern] if os.path.exists(pattern) else [])
+        paths += [p for p in matches if p.endswith(('.csv', '.parquet')) and p not in paths]
+    return paths
+
+
+def plan_chunks(paths: Sequence[str], chunk_bytes: int = CHUNK_BYTES) -> List[Dict]:
+    """Bloques de todos los archivos: {id, path, kind, start, end} (end = row group para Parquet)"""
+    chunks = []
+    for path in paths:
+        if path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            units = [('parquet', i, i) for i in range(pq.ParquetFile(path).num_row_groups)]
+            names = None
+        else:
+            names, ranges = etl.byte_ranges(path, chunk_bytes)
+            units = [('csv', start, end) for start, end in ranges]
+        for kind, start, end in units:
+            chunks.append({"id": f"{len(chunks):06d}", "path": os.path.abspath(path), "kind": kind,
+                           "start": start, "end": end, "names": names})
+    return chunks
+
+
+def _fingerprint(paths: Sequence[str], chunk_bytes: int) -> str:
+    """Identifica el trabajo: archivos (tamaño y fecha) y tamaño de bloque"""
+    digest = hashlib.sha256(str(chunk_bytes).encode('utf-8'))
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+# ---------------------------------------------------------
+# Procesos de puntuación
+# ---------------------------------------------------------
+_worker = {}
+
+
+def _init_worker(version: str, models_dir: str, explain: bool):
+    """Carga el modelo de la versión fijada una sola vez por proceso"""
+    bundle = artifacts.load_bundle(version, models_dir)
+    _worker.update(bundle=bundle, features=feature_names(bundle.scaler), explainer=None)
+    if explain:
+        from explain import ForestExplainer
+        _worker['explainer'] = ForestExplainer(bundle.model, _worker['features'])
+
+
+def score_frame(df: pd.DataFrame, model, scaler, features: Sequence[str], explainer=None) -> pd.DataFrame:
+    """
+    Agrega predicción, probabilidad y postprocesado (risk.py) a un bloque.
+    Las columnas se validan y alinean por nombre (validation.py); las filas
+    inválidas quedan sin predicción y con el motivo en la columna Validacion.
+    """
+    batch = validation.validate(df, features)
+    out = df.copy()
+    proba = np.full(len(df), np.nan)
+    factors = None
+    if batch.valid.any():
+        X = scaler.transform(batch.frame())
+        proba = batch.expand(risk.positive_probability(model, X), np.nan)
+        if explainer is not None:
+            factors = batch.expand(explainer.top_factors(explainer.explain(X)), '')
+    out[PREDICTION_COLUMN] = prediction_labels(proba)
+    out[PROBABILITY_COLUMN] = proba
+    if explainer is not None:
+        out[FACTOR_COLUMN] = factors if factors is not None else ''
+    assessment = risk.assess(proba, batch.X[:, batch.features.index('ph')])
+    for column in assessment.columns:
+        out[column] = assessment[column].to_numpy()
+    out[validation.ISSUE_COLUMN] = batch.issues()
+    return out
+
+
+def _read_chunk(chunk: Dict) -> pd.DataFrame:
+    if chunk['kind'] == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(chunk['path']).read_row_group(chunk['start']).to_pandas()
+    return etl.read_block(chunk['path'], chunk['start'], chunk['end'], chunk['names'])
+
+
+def _score_chunk(chunk: Dict, part_path: str, tag_source: bool):
+    """Puntúa un bloque y lo guarda en part_path; devuelve (filas, filas inválidas, columnas)"""
+    bundle = _worker['bundle']
+    df = score_frame(_read_chunk(chunk), bundle.model, bundle.scaler, _worker['features'], _worker['explainer'])
+    if tag_source:
+        df[SOURCE_COLUMN] = os.path.basename(chunk['path'])
+    tmp = part_path + '.tmp'
+    if part_path.endswith('.parquet'):
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_csv(tmp, index=False, header=False)
+    os.replace(tmp, part_path)
+    return len(df), int((df[validation.ISSUE_COLUMN] != '').sum()), list(df.columns)
+
+
+# ---------------------------------------------------------
+# Checkpoint y salida
+# ---------------------------------------------------------
+def _checkpoint_path(output: str) -> str:
+    return output + '.checkpoint.json'
+
+
+def _load_checkpoint(output: str, fingerprint: str) -> Optional[Dict]:
+    try:
+        with open(_checkpoint_path(output), "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return None
+    if checkpoint.get('fingerprint') != fingerprint:
+        raise ValueError(f"El checkpoint {_checkpoint_path(output)} corresponde a otras entradas o a otro "
+                         f"tamaño de bloque; bórralo o usa --restart para empezar de nuevo.")
+    return checkpoint
+
+
+def _save_checkpoint(output: str, checkpoint: Dict):
+    tmp = _checkpoint_path(output) + '.tmp'
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, _checkpoint_path(output))
+
+
+def _assemble(output: str, parts: List[str], columns: List[str]):
+    """Une las partes en orden sin cargar más de una en memoria"""
+    tmp = output + '.tmp'
+    if output.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for part in parts:
+                table = pq.read_table(part)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema)
+                elif not table.schema.equals(writer.schema, check_metadata=False):
+                    # Entradas con tipos distintos (p. ej. int8 del ETL e int64 de un CSV)
+                    try:
+                        table = table.cast(writer.schema)
+                    except (TypeError, ValueError) as e:
+                        raise ValueError(f"El bloque {part} no es compatible con el esquema de salida: {e}") from e
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(tmp, 'wb') as out:
+            out.write((','.join(columns) + '\n').encode('utf-8'))
+            for part in parts:
+                with open(part, 'rb') as f:
+                    shutil.copyfileobj(f, out)
+    os.replace(tmp, output)
+
+
+def run(patterns: Sequence[str], output: str, workers: Optional[int] = None, chunk_bytes: int = CHUNK_BYTES,
+        version: Optional[str] = None, models_dir: str = artifacts.MODELS_DIR, explain: bool = False,
+        restart: bool = False) -> Dict:
+    """
+    Puntúa las entradas y escribe `output` (.csv o .parquet).
+
+    Returns:
+        Resumen: filas (y cuántas quedaron sin predicción), bloques (puntuados y
+        retomados del checkpoint), versión, segundos y filas/s
+    """
+    started = time.perf_counter()
+    paths = expand_inputs(patterns)
+    if not paths:
+        raise FileNotFoundError(f"Ningún archivo CSV/Parquet coincide con {list(patterns)}")
+    fingerprint = _fingerprint(paths, chunk_bytes)
+    parts_dir = output + '.parts'
+    if restart:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        if os.path.exists(_checkpoint_path(output)):
+            os.remove(_checkpoint_path(output))
+
+    checkpoint = _load_checkpoint(output, fingerprint)
+    if checkpoint is None:
+        version = version or artifacts.current_version(models_dir) or artifacts.LEGACY_VERSION
+        checkpoint = {"fingerprint": fingerprint, "version": version, "chunk_bytes": chunk_bytes,
+                      "inputs": [os.path.abspath(p) for p in paths], "done": {}}
+    elif version and version != checkpoint['version']:
+        raise ValueError(f"El trabajo se empezó con la versión {checkpoint['version']} del modelo")
+    version = checkpoint['version']
+    os.makedirs(parts_dir, exist_ok=True)
+
+    chunks = plan_chunks(paths, chunk_bytes)
+    suffix = '.parquet' if output.endswith('.parquet') else '.csv'
+    part_of = {c['id']: os.path.join(parts_dir, f"part-{c['id']}{suffix}") for c in chunks}
+    pending = [c for c in chunks if not (c['id'] in checkpoint['done'] and os.path.exists(part_of[c['id']]))]
+    resumed = len(chunks) - len(pending)
+    tag_source = len(paths) > 1
+    print(f"-> {len(paths)} archivo(s), {len(chunks)} bloques ({resumed} ya puntuados), modelo {version}")
+
+    scored_rows = 0
+    if pending:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(pending)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(version, models_dir, explain)) as pool:
+            futures = {pool.submit(_score_chunk, c, part_of[c['id']], tag_source): c for c in pending}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    rows, invalid, columns = future.result()
+                except Exception as e:
+                    # Los bloques ya terminados quedan en el checkpoint
+                    raise RuntimeError(f"Error al puntuar {chunk['path']} (bloque {chunk['start']}-{chunk['end']}): "
+                                       f"{type(e).__name__}: {e}") from e
+                scored_rows += rows
+                checkpoint['done'][chunk['id']] = {"path": chunk['path'], "start": chunk['start'],
+                                                   "end": chunk['end'], "rows": rows, "invalid": invalid,
+                                                   "columns": columns}
+                _save_checkpoint(output, checkpoint)
+                print(f"   bloque {len(checkpoint['done'])}/{len(chunks)}: {rows:,} filas")
+    scoring_s = time.perf_counter() - started
+
+    # Las partes CSV no tienen encabezado: todas deben tener las columnas del primer bloque
+    columns = checkpoint['done'][chunks[0]['id']]['columns']
+    different = [d['path'] for d in checkpoint['done'].values() if d['columns'] != columns]
+    if different:
+        raise ValueError(f"Las entradas no tienen las mismas columnas (en el mismo orden): {sorted(set(different))}")
+    _assemble(output, [part_of[c['id']] for c in chunks], columns)
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    os.remove(_checkpoint_path(output))
+
+    total_rows = sum(d['rows'] for d in checkpoint['done'].values())
+    invalid_rows = sum(d.get('invalid', 0) for d in checkpoint['done'].values())
+    elapsed = time.perf_counter() - started
+    return {
+        "output": output,
+        "version": version,
+        "rows": total_rows,
+        "scored_rows": scored_rows,
+        "invalid_rows": invalid_rows,
+        "chunks": len(chunks),
+        "resumed_chunks": resumed,
+        "workers": workers if pending else 0,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(scored_rows / scoring_s, 1) if scoring_s > 0 and scored_rows else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Puntuación por lotes con el modelo activo")
+    parser.add_argument("inputs", nargs="+", help="Archivos o patrones (glob) CSV/Parquet")
+    parser.add_argument("-o", "--output", required=True, help="Archivo de salida (.csv o .parquet)")
+    parser.add_argument("--workers", type=int, help="Procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_BYTES / 2 ** 20, help="Tamaño de bloque de CSV en MB")
+    parser.add_argument("--version", help="Versión del modelo (por defecto la activa en models/CURRENT)")
+    parser.add_argument("--explain", action="store_true", help="Agregar la variable que más pesó en cada predicción")
+    parser.add_argument("--restart", action="store_true", help="Ignorar el checkpoint y empezar de nuevo")
+    args = parser.parse_args()
+
+    summary = run(args.inputs, args.output, args.workers, int(args.chunk_mb * 2 ** 20), args.version,
+                  explain=args.explain, restart=args.restart)
+    print(f"-> {summary['rows']:,} filas en {summary['output']} (modelo {summary['version']}; "
+          f"{summary['resumed_chunks']} de {summary['chunks']} bloques retomados del checkpoint)")
+    if summary['invalid_rows']:
+        print(f"-> {summary['invalid_rows']:,} filas sin predicción por valores inválidos "
+              f"(motivo en la columna {validation.ISSUE_COLUMN})")
+    if summary['rows_per_second']:
+        print(f"-> {summary['scored_rows']:,} filas puntuadas en {summary['seconds']:.2f} s "
+              f"({summary['rows_per_second']:,.0f} filas/s, {summary['workers']} procesos)")
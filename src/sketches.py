@@ -0,0 +1,285 @@
+"""
+Resúmenes en streaming de memoria acotada para variables numéricas
+- TDigest: cuantiles y CDF aproximados (variante "merging", función de escala k2)
+- BinnedHistogram: conteos en cortes fijos (p. ej. deciles del entrenamiento)
+- Moments: conteo, media, varianza, mínimo y máximo (Welford por lotes)
+
+Todos se actualizan con arreglos completos (vectorizado), se pueden combinar
+entre sí y serializar a dict/JSON. La memoria no depende de las filas vistas.
+"""
+
+import math
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+# Valores acumulados en el búfer antes de comprimir, como múltiplo de la compresión
+BUFFER_FACTOR = 20
+
+
+def _finite(values) -> np.ndarray:
+    v = np.asarray(values, dtype=np.float64).ravel()
+    return v[np.isfinite(v)]
+
+
+def _merge_centroids(means: np.ndarray, weights: np.ndarray, compression: float):
+    """
+    Agrupa centroides ordenados de modo que cada grupo ocupe como máximo una
+    unidad de la escala k2(q) = δ/Z·log(q/(1-q)), con Z = 4·log(n/δ) + 24:
+    grupos muy pequeños en las colas (precisión en p99/p99.9) y grandes en el
+    centro. Vectorizado con reduceat en lugar de un bucle por centroide.
+    """
+    order = np.argsort(means, kind='mergesort')
+    means, weights = means[order], weights[order]
+    total = weights.sum()
+    q_center = np.clip((np.cumsum(weights) - weights / 2) / total, 1e-12, 1 - 1e-12)
+    normalizer = 4 * math.log(max(total / compression, 1.0)) + 24
+    k = compression / normalizer * np.log(q_center / (1 - q_center))
+    group = np.floor(k - k[0]).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    merged_w = np.add.reduceat(weights, starts)
+    merged_m = np.add.reduceat(means * weights, starts) / merged_w
+    return merged_m, merged_w
+
+
+class TDigest:
+    """Cuantiles aproximados con error relativo pequeño en las colas"""
+
+    def __init__(self, compression: float = 100.0):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []
+        self._buffered = 0
+
+    def update(self, values):
+        v = _finite(values)
+        if not v.size:
+            return
+        self.count += v.size
+        self.min = min(self.min, float(v.min()))
+        self.max = max(self.max, float(v.max()))
+        self._buffer.append(v)
+        self._buffered += v.size
+        if self._buffered >= BUFFER_FACTOR * self.compression:
+            self._compress()
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        means = np.concatenate([self.means] + self._buffer)
+        weights = np.concatenate([self.weights] + [np.ones(b.size) for b in self._buffer])
+        self._buffer, self._buffered = [], 0
+        self.means, self.weights = _merge_centroids(means, weights, self.compression)
+
+    def merge(self, other: "TDigest"):
+        """Incorpora otro digest (p. ej. el de otro proceso o ventana)"""
+        other._compress()
+        self._compress()
+        if not other.count:
+            return
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.means, self.weights = _merge_centroids(
+            np.concatenate([self.means, other.means]),
+            np.concatenate([self.weights, other.weights]),
+            self.compression
+        )
+
+    def _support(self):
+        """Puntos (posición acumulada, valor) para interpolar cuantiles y CDF"""
+        self._compress()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        positions = np.r_[0.0, centers, float(self.count)]
+        values = np.r_[self.min, self.means, self.max]
+        return positions, values
+
+    def quantile(self, q):
+        """Cuantil(es) q en [0, 1]; NaN si no hay datos"""
+        if not self.count:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else math.nan
+        positions, values = self._support()
+        result = np.interp(np.asarray(q, dtype=np.float64) * self.count, positions, values)
+        return result if np.ndim(q) else float(result)
+
+    def cdf(self, x):
+        """Fracción de valores <= x (aproximada)"""
+        if not self.count:
+            return np.full(np.shape(x), np.nan) if np.ndim(x) else math.nan
+        positions, values = self._support()
+        result = np.interp(np.asarray(x, dtype=np.float64), values, positions) / self.count
+        return result if np.ndim(x) else float(result)
+
+    def to_dict(self) -> Dict:
+        self._compress()
+        return {
+            "compression": self.compression,
+            "count": int(self.count),
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "means": self.means.tolist(),
+            "weights": self.weights.tolist(),
+        }
+
+    @classmethod
+    def from_sorted(cls, values: np.ndarray, compression: float = 100.0) -> "TDigest":
+        """
+        Digest de valores finitos ya ordenados (p. ej. una columna de np.sort
+        sobre un bloque completo): se agrupan en centroides de igual tamaño con
+        reduceat y solo esos se reordenan al comprimir.
+        """
+        digest = cls(compression)
+        if not values.size:
+            return digest
+        size = max(1, values.size // int(BUFFER_FACTOR * compression))
+        starts = np.arange(0, values.size, size)
+        weights = np.diff(np.r_[starts, values.size]).astype(np.float64)
+        digest.count = int(values.size)
+        digest.min, digest.max = float(values[0]), float(values[-1])
+        digest.means, digest.weights = _merge_centroids(np.add.reduceat(values, starts) / weights,
+                                                        weights, compression)
+        return digest
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TDigest":
+        digest = cls(data.get("compression", 100.0))
+        digest.count = data["count"]
+        if digest.count:
+            digest.min, digest.max = data["min"], data["max"]
+        digest.means = np.asarray(data["means"], dtype=np.float64)
+        digest.weights = np.asarray(data["weights"], dtype=np.float64)
+        return digest
+
+
+class BinnedHistogram:
+    """
+    Conteos por intervalo con cortes fijos: (-inf, c0), [c0, c1), ..., [c_n, inf).
+    Las colas abiertas capturan valores fuera del rango de entrenamiento.
+    """
+
+    def __init__(self, cuts: Sequence[float]):
+        self.cuts = np.asarray(cuts, dtype=np.float64)
+        self.counts = np.zeros(len(self.cuts) + 1, dtype=np.int64)
+
+    def update(self, values):
+        v = _finite(values)
+        if v.size:
+            self.counts += np.bincount(np.searchsorted(self.cuts, v, side='right'),
+                                       minlength=len(self.counts))
+
+    def merge(self, other: "BinnedHistogram"):
+        self.counts += other.counts
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def proportions(self) -> np.ndarray:
+        total = self.total
+        return self.counts / total if total else np.zeros(len(self.counts))
+
+    def to_dict(self) -> Dict:
+        return {"cuts": self.cuts.tolist(), "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BinnedHistogram":
+        hist = cls(data["cuts"])
+        hist.counts = np.asarray(data["counts"], dtype=np.int64)
+        return hist
+
+
+class Moments:
+    """Conteo, media, varianza, mínimo y máximo combinables (Chan et al.)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        v = _finite(values)
+        if v.size:
+            self._combine(v.size, float(v.mean()), float(((v - v.mean()) ** 2).sum()),
+                          float(v.min()), float(v.max()))
+
+    def merge(self, other: "Moments"):
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    def _combine(self, n, mean, m2, low, high):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2,
+                "min": self.min if self.count else None, "max": self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Moments":
+        moments = cls()
+        moments.count, moments.mean, moments.m2 = data["count"], data["mean"], data["m2"]
+        if moments.count:
+            moments.min, moments.max = data["min"], data["max"]
+        return moments
+
+
+class FeatureSketch:
+    """Resumen completo de una variable: t-digest, histograma por cortes y momentos"""
+
+    def __init__(self, cuts: Sequence[float], compression: float = 100.0):
+        self.digest = TDigest(compression)
+        self.histogram = BinnedHistogram(cuts)
+        self.moments = Moments()
+
+    def update(self, values):
+        v = _finite(values)
+        self.digest.update(v)
+        self.histogram.update(v)
+        self.moments.update(v)
+
+    def merge(self, other: "FeatureSketch"):
+        self.digest.merge(other.digest)
+        self.histogram.merge(other.histogram)
+        self.moments.merge(other.moments)
+
+    @property
+    def count(self) -> int:
+        return self.moments.count
+
+    def to_dict(self) -> Dict:
+        return {"digest": self.digest.to_dict(), "histogram": self.histogram.to_dict(),
+                "moments": self.moments.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FeatureSketch":
+        sketch = cls(data["histogram"]["cuts"])
+        sketch.digest = TDigest.from_dict(data["digest"])
+        sketch.histogram = BinnedHistogram.from_dict(data["histogram"])
+        sketch.moments = Moments.from_dict(data["moments"])
+        return sketch
+
+    @classmethod
+    def from_values(cls, values, bins: int = 10, compression: float = 100.0,
+                    cuts: Optional[Sequence[float]] = None) -> "FeatureSketch":
+        """Resumen de una muestra completa; por defecto los cortes son sus cuantiles"""
+        v = _finite(values)
+        if cuts is None:
+            cuts = np.unique(np.quantile(v, np.linspace(0, 1, bins + 1)[1:-1])) if v.size else []
+        sketch = cls(cuts, compression)
+        sketch.update(v)
+        return sketch
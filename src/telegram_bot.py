@@ -1,14 +1,25 @@
+from __future__ import annotations
+
 import os
 import json
 import requests
 import asyncio
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
-from telegram import Update
-from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler
 from datetime import datetime
+
+import metrics
+
+# python-telegram-bot solo se importa al iniciar el listener (run_listener);
+# el Dashboard importa este módulo solo para enviar alertas con requests
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import ContextTypes
 # Cargar entorno
 load_dotenv()
 TOKEN = os.getenv('TELEGRAM_TOKEN')
+# URL base de la Bot API (configurable para apuntar a un servidor de pruebas)
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org').rstrip('/')
 
 # Archivos compartidos (Base de datos simple)
 CONNECTION_FILE = "telegram_connection.json" # Para guardar quién es el usuario
@@ -31,14 +42,20 @@ def send_telegram_alert(message, chat_id):
     """Envía un mensaje de alerta (Unidireccional: App -> Telegram)"""
     if not TOKEN: return False, "No hay TOKEN"
     
-    url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
+    url = f"{TELEGRAM_API_URL}/bot{TOKEN}/sendMessage"
     payload = {"chat_id": chat_id, "text": message, "parse_mode": "Markdown"}
     
-    try:
-        response = requests.post(url, json=payload)
-        return (True, "Enviado") if response.status_code == 200 else (False, response.text)
-    except Exception as e:
-        return False, str(e)
+    with metrics.timer("telegram_send") as stage:
+        try:
+            response = requests.post(url, json=payload)
+        except Exception as e:
+            stage.fail(type(e).__name__)
+            return False, str(e)
+        if response.status_code != 200:
+            stage.fail(f"HTTP {response.status_code}")
+            return False, response.text
+    metrics.inc("alerts_sent")
+    return True, "Enviado"
 
 # ==========================================
 # PARTE B: COMANDOS DEL BOT (Bidireccional: Telegram <-> Usuario)
@@ -119,6 +136,8 @@ def run_listener():
         print("❌ Error: No Token")
         return
 
+    from telegram.ext import ApplicationBuilder, CommandHandler
+
     app = ApplicationBuilder().token(TOKEN).build()
     
     # Registro de Comandos
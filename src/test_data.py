@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import os
 
 # Definir las columnas exactas que espera el dashboard
@@ -19,18 +20,57 @@ data = [
     [7.0, 196.0, 22014.0, 7.1, 333.0, 426.0, 14.3, 66.4, 3.9]
 ]
 
-# Crear DataFrame
-df_test = pd.DataFrame(data, columns=columns)
+# Media, desviación estándar y rango (mín, máx) de cada variable en el dataset original
+FEATURE_STATS = {
+    'ph': (7.08, 1.59, 0.0, 14.0),
+    'Hardness': (196.4, 32.9, 47.4, 323.1),
+    'Solids': (22014.0, 8768.0, 320.9, 61227.2),
+    'Chloramines': (7.12, 1.58, 0.35, 13.13),
+    'Sulfate': (333.8, 41.4, 129.0, 481.0),
+    'Conductivity': (426.2, 80.8, 181.5, 753.3),
+    'Organic_carbon': (14.28, 3.31, 2.2, 28.3),
+    'Trihalomethanes': (66.4, 16.2, 0.74, 124.0),
+    'Turbidity': (3.97, 0.78, 1.45, 6.74),
+}
 
 # Configurar rutas absolutas
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.join(BASE_DIR, '../data/test')
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, 'test_samples.csv')
 
-# Crear directorio si no existe
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+def generate_samples(n_rows, seed=42, with_target=False):
+    """
+    Genera n_rows muestras sintéticas con la distribución aproximada del dataset.
+    Si with_target es True añade una columna Potability (~39% potable) que
+    depende del pH, las cloraminas y la turbidez, para que un modelo tenga señal.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        col: np.clip(rng.normal(mean, std, n_rows), low, high).astype(np.float64)
+        for col, (mean, std, low, high) in FEATURE_STATS.items()
+    })[columns]
+    
+    if with_target:
+        risk = (
+            np.abs(df['ph'].to_numpy() - 7.5) / 1.59
+            + np.abs(df['Chloramines'].to_numpy() - 7.12) / 1.58
+            + (df['Turbidity'].to_numpy() - 3.97) / 0.78
+            + rng.normal(0, 1, n_rows)
+        )
+        df['Potability'] = (risk < np.quantile(risk, 0.39)).astype(np.int64)
+    return df
 
-# Guardar como CSV
-df_test.to_csv(OUTPUT_FILE, index=False)
+def main():
+    # Crear DataFrame
+    df_test = pd.DataFrame(data, columns=columns)
+    
+    # Crear directorio si no existe
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    
+    # Guardar como CSV
+    df_test.to_csv(OUTPUT_FILE, index=False)
+    
+    print(f"Archivo creado exitosamente en: {OUTPUT_FILE}")
 
-print(f"Archivo creado exitosamente en: {OUTPUT_FILE}")
+if __name__ == "__main__":
+    main()
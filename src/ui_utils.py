@@ -0,0 +1,61 @@
+"""
+Utilidades de la interfaz Streamlit
+- CSS estático leído del disco una sola vez por proceso
+- Medición del tiempo de renderizado por pestaña y por fragmento
+"""
+
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets')
+
+# Renderizados recientes que se conservan por sección
+TIMING_WINDOW = 50
+
+
+@st.cache_resource
+def load_css(name: str) -> str:
+    """Lee una hoja de estilos de assets/css (cacheada para todo el proceso)"""
+    with open(os.path.join(ASSETS_DIR, 'css', name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def inject_css(name: str):
+    """Inserta una hoja de estilos de assets/css en la página"""
+    st.markdown(f"<style>{load_css(name)}</style>", unsafe_allow_html=True)
+
+
+@contextmanager
+def timed_render(section: str):
+    """
+    Mide el tiempo de pared de un bloque de renderizado y lo guarda en la sesión
+
+    Usar alrededor de cada pestaña y dentro de cada fragmento, para distinguir
+    los reruns completos del script de los reruns parciales de un fragmento.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        timings = st.session_state.setdefault('render_timings', {})
+        timings.setdefault(section, deque(maxlen=TIMING_WINDOW)).append(elapsed_ms)
+
+
+def render_timing_rows():
+    """Resumen por sección: renderizados, último, mediana y máximo (ms)"""
+    rows = []
+    for section, samples in st.session_state.get('render_timings', {}).items():
+        ordered = sorted(samples)
+        rows.append({
+            'Sección': section,
+            'Reruns': len(samples),
+            'Último (ms)': round(samples[-1], 1),
+            'Mediana (ms)': round(ordered[len(ordered) // 2], 1),
+            'Máx (ms)': round(ordered[-1], 1),
+        })
+    return rows
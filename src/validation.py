@@ -0,0 +1,167 @@
+"""
+Validación de lotes de entrada (esquema de 9 variables de test_data.py)
+Convierte un DataFrame subido o leído por bloques en la matriz que espera
+el escalador, sin copias intermedias:
+
+- Las columnas se toman por nombre (también si difieren en mayúsculas o
+  espacios, p. ej. "pH" o " Sulfate"); el orden del archivo y las columnas
+  extra no importan
+- Las variables se escriben una sola vez en un bloque contiguo (float64 por
+  defecto) en el orden del modelo; las columnas de texto se convierten con
+  coma decimal como en etl.py
+- Los valores vacíos, no numéricos o fuera de rango (etl.VALID_RANGES) no
+  abortan el lote: se marcan por fila con comparaciones vectorizadas y solo
+  esas filas quedan sin predicción
+
+Solo la falta de una columna del esquema es un error del lote (SchemaError).
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from etl import VALID_RANGES
+from test_data import columns as FEATURES
+
+ISSUE_COLUMN = 'Validacion'
+
+# Código por celda: 0 válido; el resto, motivo del descarte
+MISSING, NON_NUMERIC, OUT_OF_RANGE = 1, 2, 3
+REASONS = {MISSING: 'vacío', NON_NUMERIC: 'no numérico', OUT_OF_RANGE: 'fuera de rango'}
+
+
+class SchemaError(ValueError):
+    """El lote no tiene las columnas del esquema"""
+
+
+def _normalize(name) -> str:
+    return str(name).strip().lower()
+
+
+def match_columns(columns: Sequence, features: Sequence[str] = FEATURES) -> Dict[str, object]:
+    """
+    Columna del DataFrame que corresponde a cada variable: primero por nombre
+    exacto y luego ignorando mayúsculas y espacios (si no es ambiguo).
+
+    Raises:
+        SchemaError: Si falta alguna variable
+    """
+    exact = set(columns)
+    loose: Dict[str, List] = {}
+    for col in columns:
+        loose.setdefault(_normalize(col), []).append(col)
+    mapping, missing = {}, []
+    for feature in features:
+        candidates = loose.get(_normalize(feature), [])
+        if feature in exact:
+            mapping[feature] = feature
+        elif len(candidates) == 1:
+            mapping[feature] = candidates[0]
+        else:
+            missing.append(feature)
+    if missing:
+        raise SchemaError(f"Faltan columnas del esquema: {missing}. Se esperan: {list(features)}")
+    return mapping
+
+
+def _to_float(values: pd.Series) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Columna como arreglo float y, si era texto, la máscara de valores no convertibles"""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=np.float64, na_value=np.nan), None
+    text = values.astype(str).str.strip().str.replace(',', '.', regex=False).where(values.notna())
+    numbers = pd.to_numeric(text, errors='coerce')
+    return numbers.to_numpy(dtype=np.float64, na_value=np.nan), (text.notna() & numbers.isna()).to_numpy()
+
+
+class ValidatedBatch:
+    """Matriz alineada al esquema y el resultado de la validación por fila"""
+
+    __slots__ = ('X', 'codes', 'valid', 'features', 'extra_columns')
+
+    def __init__(self, X: np.ndarray, codes: np.ndarray, features: Sequence[str], extra_columns: List):
+        self.X = X
+        self.codes = codes
+        self.valid = ~codes.any(axis=1)
+        self.features = list(features)
+        self.extra_columns = extra_columns
+
+    @property
+    def n_invalid(self) -> int:
+        return int(len(self.valid) - self.valid.sum())
+
+    @property
+    def all_valid(self) -> bool:
+        return bool(self.valid.all())
+
+    def valid_X(self) -> np.ndarray:
+        """Filas válidas (sin copia si lo son todas)"""
+        return self.X if self.all_valid else self.X[self.valid]
+
+    def frame(self) -> pd.DataFrame:
+        """Filas válidas como DataFrame con los nombres del esquema, sobre el mismo bloque"""
+        return pd.DataFrame(self.valid_X(), columns=self.features, copy=False)
+
+    def expand(self, values, fill) -> np.ndarray:
+        """Resultados calculados sobre las filas válidas, llevados a todas las filas del lote"""
+        values = np.asarray(values)
+        if self.all_valid:
+            return values
+        out = np.full(len(self.valid), fill, dtype=np.result_type(values, np.asarray(fill)))
+        out[self.valid] = values
+        return out
+
+    def issues(self) -> np.ndarray:
+        """Descripción por fila ('' si es válida), p. ej. 'ph: fuera de rango; Sulfate: vacío'"""
+        out = np.full(len(self.valid), '', dtype=object)
+        for j, feature in enumerate(self.features):
+            for code, reason in REASONS.items():
+                rows = np.flatnonzero(self.codes[:, j] == code)
+                if len(rows):
+                    message = f"{feature}: {reason}"
+                    current = out[rows]
+                    out[rows] = np.where(current == '', message, current + '; ' + message)
+        return out
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """Celdas descartadas por variable y motivo (solo las que tienen alguna)"""
+        counts = {}
+        for code, reason in REASONS.items():
+            per_feature = (self.codes == code).sum(axis=0)
+            found = {f: int(n) for f, n in zip(self.features, per_feature) if n}
+            if found:
+                counts[reason] = found
+        return counts
+
+
+def validate(df: pd.DataFrame, features: Sequence[str] = FEATURES, dtype=np.float64,
+             ranges: Optional[Dict[str, Tuple[float, float]]] = None) -> ValidatedBatch:
+    """
+    Alinea `df` al esquema y marca las filas inválidas.
+
+    Args:
+        features: Orden de variables del modelo (feature_names_in_ del escalador)
+        dtype: np.float64 o np.float32 para el bloque resultante
+        ranges: Rango válido por variable (por defecto etl.VALID_RANGES)
+
+    Raises:
+        SchemaError: Si falta alguna variable del esquema
+    """
+    ranges = ranges or VALID_RANGES
+    mapping = match_columns(df.columns, features)
+    used = set(mapping.values())
+    X = np.empty((len(df), len(features)), dtype=dtype)
+    codes = np.zeros(X.shape, dtype=np.int8)
+    for j, feature in enumerate(features):
+        values, non_numeric = _to_float(df[mapping[feature]])
+        X[:, j] = values
+        if non_numeric is not None:
+            codes[non_numeric, j] = NON_NUMERIC
+
+    low = np.array([ranges.get(f, (-np.inf, np.inf))[0] for f in features], dtype=dtype)
+    high = np.array([ranges.get(f, (-np.inf, np.inf))[1] for f in features], dtype=dtype)
+    missing = np.isnan(X)
+    codes[(codes == 0) & missing] = MISSING
+    # Los NaN nunca cumplen las comparaciones; ±inf sí quedan fuera de [low, high] finitos
+    codes[~missing & ((X < low) | (X > high) | np.isinf(X))] = OUT_OF_RANGE
+    return ValidatedBatch(X, codes, features, [c for c in df.columns if c not in used])
@@ -1,14 +1,24 @@
 import base64
 import json
 import os
-from openai import OpenAI
 from dotenv import load_dotenv
 
+import metrics
+
 # Cargar variables de entorno
 load_dotenv()
 
-# Inicializar cliente OpenAI
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Cliente OpenAI: se crea en el primer análisis (importar el SDK es costoso)
+_client = None
+
+
+def get_client():
+    """Retorna el cliente OpenAI, importando el SDK y creándolo en el primer uso"""
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    return _client
 
 # ---------------------------------------------------------
 # Prompts del sistema
@@ -101,31 +111,32 @@ def analyze_water_turbidity(image_bytes):
         image_base64 = base64.b64encode(image_bytes).decode('utf-8')
         
         # Llamada a OpenAI Vision API
-        response = client.chat.completions.create(
-            #model="gpt-4o",  # o "gpt-4-vision-preview" según disponibilidad
-            model="gpt-5.2",
-            messages=[
-                {
-                    "role": "system",
-                    "content": SYSTEM_PROMPT
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": USER_PROMPT},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_base64}",
-                                "detail": "high"
+        with metrics.timer("vision_api"):
+            response = get_client().chat.completions.create(
+                #model="gpt-4o",  # o "gpt-4-vision-preview" según disponibilidad
+                model="gpt-5.2",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": SYSTEM_PROMPT
+                    },
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": USER_PROMPT},
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": f"data:image/jpeg;base64,{image_base64}",
+                                    "detail": "high"
+                                }
                             }
-                        }
-                    ]
-                }
-            ],
-            #max_tokens=800,
-            temperature=0.3  # Baja temperatura para respuestas más consistentes
-        )
+                        ]
+                    }
+                ],
+                #max_tokens=800,
+                temperature=0.3  # Baja temperatura para respuestas más consistentes
+            )
         
         # Extraer respuesta
         raw_output = response.choices[0].message.content.strip()
@@ -221,6 +232,7 @@ def analyze_water_turbidity(image_bytes):
         }
         
     except json.JSONDecodeError as e:
+        metrics.record_error("vision_api", "invalid_json")
         # Mejor manejo de errores JSON con preview de respuesta
         preview = raw_output[:300] if len(raw_output) > 300 else raw_output
         return {
@@ -0,0 +1,195 @@
+"""
+Motor what-if para los sliders del dashboard
+Para la muestra actual calcula, en un único lote vectorizado, la curva ICE
+de cada parámetro: P(potable) al barrer ese parámetro por todo su rango con
+los demás fijos.
+
+Los barridos se guardan en un LRU indexado por la muestra cuantizada al paso
+de los sliders. Como la curva de un parámetro es la misma para todas las
+muestras que solo difieren en ese parámetro, mover un slider se responde
+leyendo la curva ya calculada, sin invocar el modelo.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import metrics
+import risk
+
+# Puntos máximos por curva: cubre cada paso de los sliders actuales (el mayor
+# tiene 1251) para que cualquier posición se lea de la caché. Con más pasos
+# se usa un múltiplo del paso y las posiciones intermedias recalculan el barrido.
+MAX_GRID_POINTS = 2001
+# Muestras cuantizadas cuyos barridos se conservan
+CACHE_SIZE = 256
+
+Key = Tuple[int, ...]
+
+
+class Sweep:
+    """Curvas ICE de una muestra: por parámetro, índices de la grilla y P(potable)"""
+
+    __slots__ = ('key', 'probability', 'curves')
+
+    def __init__(self, key: Key, probability: float, curves: Dict[int, Tuple[np.ndarray, np.ndarray]]):
+        self.key = key
+        self.probability = probability
+        self.curves = curves
+
+    def lookup(self, feature: int, index: int) -> Optional[float]:
+        """P(potable) al mover `feature` al índice cuantizado `index`, si cae en la grilla"""
+        grid, proba = self.curves[feature]
+        pos = np.searchsorted(grid, index)
+        if pos < len(grid) and grid[pos] == index:
+            return float(proba[pos])
+        return None
+
+
+class WhatIfEngine:
+    """
+    Predicciones y curvas what-if con caché por muestra cuantizada
+
+    Args:
+        model: Clasificador con predict_proba (clase 1 = potable)
+        scaler: Escalador ajustado con las mismas variables
+        specs: {variable: (mínimo, máximo, paso)} en el orden que espera el modelo
+    """
+
+    def __init__(self, model, scaler, specs: Dict[str, Tuple[float, float, float]],
+                 max_grid_points: int = MAX_GRID_POINTS, cache_size: int = CACHE_SIZE):
+        self.model = model
+        self.scaler = scaler
+        self.features = list(specs)
+        self.mins = np.array([specs[f][0] for f in self.features], dtype=np.float64)
+        self.steps = np.array([specs[f][2] for f in self.features], dtype=np.float64)
+        self.max_index = np.rint((np.array([specs[f][1] for f in self.features]) - self.mins) / self.steps).astype(np.int64)
+        self.cache_size = cache_size
+
+        # Índices de la grilla de cada parámetro (múltiplos del paso del slider)
+        self.grids = []
+        for top in self.max_index:
+            stride = max(1, int(np.ceil((top + 1) / max_grid_points)))
+            grid = np.arange(0, top + 1, stride)
+            if grid[-1] != top:
+                grid = np.append(grid, top)
+            self.grids.append(grid)
+
+        self._lock = threading.Lock()
+        self._sweeps: "OrderedDict[Key, Sweep]" = OrderedDict()
+        # (parámetro, clave sin ese parámetro) -> clave del barrido que contiene esa curva
+        self._by_partial: Dict[Tuple[int, Key], Key] = {}
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    def quantize(self, values: Sequence[float]) -> Key:
+        """Muestra -> índices enteros del paso de cada slider"""
+        idx = np.rint((np.asarray(values, dtype=np.float64) - self.mins) / self.steps).astype(np.int64)
+        return tuple(np.clip(idx, 0, self.max_index).tolist())
+
+    def values_of(self, key: Key) -> np.ndarray:
+        return self.mins + np.asarray(key) * self.steps
+
+    @staticmethod
+    def _partial(key: Key, feature: int) -> Key:
+        return key[:feature] + key[feature + 1:]
+
+    def _score(self, X: np.ndarray) -> np.ndarray:
+        X_scaled = self.scaler.transform(pd.DataFrame(X, columns=self.features))
+        return risk.positive_probability(self.model, X_scaled)
+
+    def _compute_sweep(self, key: Key) -> Sweep:
+        """Muestra + todas las curvas ICE en un solo lote"""
+        base = self.values_of(key)
+        sizes = [len(g) for g in self.grids]
+        X = np.tile(base, (1 + sum(sizes), 1))
+        row = 1
+        for f, grid in enumerate(self.grids):
+            X[row:row + len(grid), f] = self.mins[f] + grid * self.steps[f]
+            row += len(grid)
+
+        with metrics.timer("whatif_sweep"):
+            proba = self._score(X)
+
+        curves, row = {}, 1
+        for f, grid in enumerate(self.grids):
+            curves[f] = (grid, proba[row:row + len(grid)])
+            row += len(grid)
+        return Sweep(key, float(proba[0]), curves)
+
+    def _store(self, sweep: Sweep):
+        self._sweeps[sweep.key] = sweep
+        for f in range(len(self.features)):
+            self._by_partial[(f, self._partial(sweep.key, f))] = sweep.key
+        while len(self._sweeps) > self.cache_size:
+            old_key, _ = self._sweeps.popitem(last=False)
+            for f in range(len(self.features)):
+                partial = (f, self._partial(old_key, f))
+                if self._by_partial.get(partial) == old_key:
+                    del self._by_partial[partial]
+
+    def _find(self, key: Key, feature: int) -> Optional[Sweep]:
+        """Barrido cacheado que coincide con `key` en todo salvo `feature`"""
+        owner = self._by_partial.get((feature, self._partial(key, feature)))
+        return self._sweeps.get(owner) if owner is not None else None
+
+    # ------------------------------------------------------------------
+    def sweep(self, values: Sequence[float]) -> Sweep:
+        """Barrido completo de la muestra (calculado o desde la caché)"""
+        key = self.quantize(values)
+        with self._lock:
+            cached = self._sweeps.get(key)
+            if cached is not None:
+                self._sweeps.move_to_end(key)
+                self.hits += 1
+                return cached
+        sweep = self._compute_sweep(key)
+        with self._lock:
+            self.misses += 1
+            self._store(sweep)
+        return sweep
+
+    def probability(self, values: Sequence[float]) -> float:
+        """
+        P(potable) de la muestra. Si una curva cacheada pasa por ella (muestra
+        vecina que solo difiere en un parámetro) se lee de ahí sin usar el modelo.
+        """
+        key = self.quantize(values)
+        with self._lock:
+            cached = self._sweeps.get(key)
+            if cached is not None:
+                self._sweeps.move_to_end(key)
+                self.hits += 1
+                return cached.probability
+            for f in range(len(self.features)):
+                neighbour = self._find(key, f)
+                if neighbour is not None:
+                    proba = neighbour.lookup(f, key[f])
+                    if proba is not None:
+                        self.hits += 1
+                        metrics.inc("whatif_cache_hits")
+                        return proba
+        return self.sweep(values).probability
+
+    def predict(self, values: Sequence[float]) -> Tuple[int, float]:
+        """(predicción, confianza %) con el mismo criterio que model.predict (argmax)"""
+        proba = self.probability(values)
+        return int(proba > risk.THRESHOLD), float(risk.confidence(proba))
+
+    def curve(self, values: Sequence[float], feature: str) -> pd.DataFrame:
+        """Curva ICE de un parámetro alrededor de la muestra: columnas valor y P(potable)"""
+        f = self.features.index(feature)
+        key = self.quantize(values)
+        with self._lock:
+            source = self._sweeps.get(key) or self._find(key, f)
+        if source is None:
+            source = self.sweep(values)
+        grid, proba = source.curves[f]
+        return pd.DataFrame({
+            'valor': self.mins[f] + grid * self.steps[f],
+            'probabilidad': proba,
+        })